@@ -12,6 +12,38 @@ class Settings(BaseSettings):
     
     # Gemini
     gemini_api_key: str
+    gemini_batch_token_budget: int = 2000  # Estimated comment tokens per batch prompt
+    gemini_max_concurrency: int = 4  # Batch prompts in flight at once
+    
+    # Chat
+    chat_context_token_budget: int = 3000  # Estimated comment tokens per chat prompt
+    retrieval_max_channels: int = 20  # Channel search indexes kept in memory
+    chat_cache_ttl_seconds: int = 3600
+    chat_cache_max_entries: int = 1000
+    chat_memory_recent_turns: int = 4  # Turns kept verbatim after compaction
+    chat_memory_compact_after: int = 8  # Unsummarized turns that trigger compaction
+    chat_memory_summary_chars: int = 1500
+    
+    # Analytics
+    columnar_memory_budget_mb: int = 256  # In-process column cache for hot channels
+    columnar_hot_threshold: int = 3  # Analytics requests before a channel is loaded
+    analytics_cache_max_entries: int = 2000
+    analytics_cache_now_bucket_seconds: int = 3600  # Results ending at "now" roll forward this often
+    anomaly_ewma_alpha: float = 0.1  # Weight of the newest hour in the moving baseline
+    anomaly_z_threshold: float = 4.0
+    anomaly_min_count: int = 10  # Hourly count below which nothing is flagged
+    anomaly_warmup_hours: int = 24  # Hours observed before a series can alert
+    
+    # Reports
+    report_generation_timeout_seconds: int = 600  # Older "generating" reports are treated as abandoned
+    
+    # Scheduled reports
+    report_offpeak_start_hour: int = 2  # UTC hour the off-peak window opens
+    report_offpeak_end_hour: int = 6  # UTC hour the off-peak window closes
+    report_scheduler_interval_seconds: int = 300
+    report_scheduler_batch_size: int = 500  # Due schedules claimed per tick
+    report_scheduler_in_process: bool = False  # Run the loop in long-lived deploys; serverless uses cron
+    cron_secret: str = ""  # Bearer token external cron (Vercel Cron's CRON_SECRET) sends
     
     # Google OAuth
     google_client_id: str = ""
@@ -84,6 +84,64 @@ async def create_indexes():
     await db.comments.create_index("tags")
     await db.comments.create_index("is_bookmarked")
     await db.comments.create_index("published_at")
+    # Keyset pagination over (published_at, _id); also serves export order
+    await db.comments.create_index(
+        [("channel_id", 1), ("user_id", 1), ("published_at", -1), ("_id", -1)]
+    )
+    await db.comments.create_index(
+        [("channel_id", 1), ("user_id", 1), ("is_bookmarked", 1), ("published_at", -1), ("_id", -1)]
+    )
+    await db.comments.create_index(
+        [("video_id", 1), ("user_id", 1), ("published_at", -1), ("_id", -1)]
+    )
+    # Full-text search, prefixed by channel so a search only reads that channel's entries.
+    # language_override points at an unused field: comments have no per-document language.
+    await db.comments.create_index(
+        [("channel_id", 1), ("text", "text")],
+        name="comments_text",
+        default_language="english",
+        language_override="search_language"
+    )
+
+    # Daily rollups collection
+    await db.daily_rollups.create_index(
+        [("user_id", 1), ("channel_id", 1), ("video_id", 1), ("day", 1)],
+        unique=True
+    )
+    await db.daily_rollups.create_index(
+        [("channel_id", 1), ("user_id", 1), ("day", 1)]
+    )
+    
+    # Hourly rollups collection
+    await db.hourly_rollups.create_index(
+        [("user_id", 1), ("channel_id", 1), ("video_id", 1), ("hour", 1)],
+        unique=True
+    )
+    await db.hourly_rollups.create_index(
+        [("channel_id", 1), ("user_id", 1), ("hour", 1)]
+    )
+    
+    # Anomaly detection collections
+    await db.anomalies.create_index(
+        [("user_id", 1), ("channel_id", 1), ("video_id", 1), ("metric", 1), ("hour", 1)],
+        unique=True
+    )
+    await db.anomalies.create_index(
+        [("channel_id", 1), ("user_id", 1), ("hour", -1)]
+    )
+    await db.detector_state.create_index(
+        [("user_id", 1), ("channel_id", 1), ("video_id", 1), ("metric", 1)],
+        unique=True
+    )
+    
+    # Commenter sketches collection
+    await db.commenter_sketches.create_index(
+        [("user_id", 1), ("channel_id", 1), ("day", 1)],
+        unique=True
+    )
+    await db.commenter_sketches.create_index(
+        [("channel_id", 1), ("user_id", 1), ("day", 1)]
+    )
     
     # Commenters collection
     try:
@@ -108,14 +166,21 @@ async def create_indexes():
     # Reports collection
     await db.reports.create_index("channel_id")
     await db.reports.create_index("created_at")
+    await db.reports.create_index(
+        [("channel_id", 1), ("user_id", 1), ("date_from", 1), ("date_to", 1), ("data_version", 1)]
+    )
     
-    # Chat history collection
-    await db.chat_history.create_index("channel_id")
-    await db.chat_history.create_index("created_at")
+    # Report schedules collection
+    await db.report_schedules.create_index([("active", 1), ("next_run_at", 1)])
+    await db.report_schedules.create_index([("channel_id", 1), ("user_id", 1)])
     
     # Chat history collection
     await db.chat_history.create_index("channel_id")
     await db.chat_history.create_index("created_at")
+    # Conversation memory: unsummarized turns and the rolling summary per user/channel
+    await db.chat_history.create_index(
+        [("channel_id", 1), ("user_id", 1), ("type", 1), ("created_at", -1)]
+    )
     
     # Channel Logs collection
     await db.channel_logs.create_index(
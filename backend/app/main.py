@@ -4,6 +4,8 @@ from contextlib import asynccontextmanager
 
 from app.config import get_settings
 from app.database import connect_to_mongo, close_mongo_connection
+from app.responses import FastJSONResponse
+from app.services import scheduler_service
 
 # Import routes
 from app.routes import channels, videos, comments, analytics, community, tags, reports, chat, auth, payments
@@ -16,8 +18,11 @@ async def lifespan(app: FastAPI):
     """Manage application lifecycle."""
     # Startup
     await connect_to_mongo()
+    if settings.report_scheduler_in_process:
+        scheduler_service.start()
     yield
     # Shutdown
+    await scheduler_service.stop()
     await close_mongo_connection()
 
 
@@ -26,7 +31,8 @@ app = FastAPI(
     title="YouTube Comment Analyzer API",
     description="API for analyzing YouTube comments with AI-powered sentiment analysis and insights",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -15,10 +15,14 @@ from app.models.comment import (
     CommentBase,
     CommentInDB,
     CommentResponse,
+    CommentCompact,
     CommentFilter,
     CommentBookmark,
     CommentTags,
-    CommentsPaginated
+    CommentsPaginated,
+    VideoFacet,
+    CommentFacets,
+    CommentsFaceted
 )
 from app.models.commenter import (
     CommenterBase,
@@ -33,7 +37,9 @@ from app.models.report import (
     ReportData,
     ReportInDB,
     ReportResponse,
-    ReportList
+    ReportList,
+    ReportScheduleCreate,
+    ReportScheduleResponse
 )
 from app.models.tag import (
     TagBase,
@@ -50,12 +56,14 @@ __all__ = [
     # Video
     "VideoBase", "VideoInDB", "VideoResponse", "VideoWithStats",
     # Comment
-    "CommentBase", "CommentInDB", "CommentResponse", "CommentFilter", 
+    "CommentBase", "CommentInDB", "CommentResponse", "CommentCompact", "CommentFilter", 
     "CommentBookmark", "CommentTags", "CommentsPaginated",
+    "VideoFacet", "CommentFacets", "CommentsFaceted",
     # Commenter
     "CommenterBase", "CommenterInDB", "CommenterResponse", "TopCommenter", "CommunityStats",
     # Report
     "ReportBase", "ReportCreate", "ReportData", "ReportInDB", "ReportResponse", "ReportList",
+    "ReportScheduleCreate", "ReportScheduleResponse",
     # Tag
     "TagBase", "TagCreate", "TagUpdate", "TagInDB", "TagResponse", "DEFAULT_TAGS",
 ]
@@ -25,6 +25,8 @@ class ChannelInDB(ChannelBase):
     sync_status: str = "pending"  # pending, syncing, completed, error
     total_comments: int = 0
     total_videos_analyzed: int = 0
+    data_version: int = 0  # Bumped whenever synced data changes
+    annotation_version: int = 0  # Bumped whenever bookmarks or tags change
 
 
 class ChannelResponse(ChannelInDB):
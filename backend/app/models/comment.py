@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 
 
@@ -33,6 +33,26 @@ class CommentResponse(CommentInDB):
     """Response model for comment."""
     id: Optional[str] = Field(None, alias="_id")
     video_title: Optional[str] = None  # Populated from video lookup
+    search_score: Optional[float] = None  # Text relevance, set on search results
+    highlights: Optional[List[Tuple[int, int]]] = None  # [start, end) offsets of matches in text
+
+    class Config:
+        populate_by_name = True
+
+
+class CommentCompact(BaseModel):
+    """Slim comment for table views."""
+    id: Optional[str] = Field(None, alias="_id")
+    comment_id: str
+    video_id: str
+    author_name: str
+    text: str
+    like_count: int = 0
+    reply_count: int = 0
+    published_at: datetime
+    sentiment: Optional[str] = None
+    tags: List[str] = []
+    is_bookmarked: bool = False
     
     class Config:
         populate_by_name = True
@@ -64,7 +84,28 @@ class CommentTags(BaseModel):
 class CommentsPaginated(BaseModel):
     """Paginated comments response."""
     items: List[CommentResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # None when total_mode is "none"
+    total_is_lower_bound: bool = False  # Approximate totals stop counting at a cap
+    page: Optional[int] = None  # None for cursor pages
     limit: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class VideoFacet(BaseModel):
+    """Comment count of one video within a filter."""
+    video_id: str
+    title: Optional[str] = None
+    count: int
+
+
+class CommentFacets(BaseModel):
+    """Counts per sentiment, tag and video for a filter."""
+    sentiment: Dict[str, int] = {}
+    tags: Dict[str, int] = {}
+    videos: List[VideoFacet] = []
+
+
+class CommentsFaceted(CommentsPaginated):
+    """A page of comments with facet counts for the same filter."""
+    facets: CommentFacets = CommentFacets()
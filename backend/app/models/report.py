@@ -46,6 +46,8 @@ class ReportInDB(ReportBase):
     """Report model stored in database."""
     data: ReportData
     status: str = "generating"  # generating, completed, error
+    error: Optional[str] = None
+    data_version: int = 0  # Channel data version the report was generated from
     created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
 
@@ -58,6 +60,26 @@ class ReportResponse(ReportInDB):
         populate_by_name = True
 
 
+class ReportScheduleCreate(BaseModel):
+    """Request to schedule a recurring report."""
+    channel_id: str
+    frequency: str = Field(..., pattern="^(weekly|monthly)$")
+
+
+class ReportScheduleResponse(BaseModel):
+    """Response model for a report schedule."""
+    id: Optional[str] = Field(None, alias="_id")
+    channel_id: str
+    frequency: str
+    active: bool = True
+    next_run_at: datetime
+    last_run_at: Optional[datetime] = None
+    created_at: datetime
+    
+    class Config:
+        populate_by_name = True
+
+
 class ReportList(BaseModel):
     """List of reports."""
     items: List[ReportResponse]
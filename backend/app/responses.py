@@ -0,0 +1,65 @@
+"""
+Fast JSON responses for large payloads.
+
+FastJSONResponse renders with orjson, which encodes datetimes and numpy
+values natively and BSON ObjectIds through a small default hook, so
+documents read from Mongo need no per-field conversion first.
+
+trusted_dump shapes a database document the way a response model would
+serialize it (aliases, defaults, unknown keys dropped) without running
+validation. It is only for documents this app wrote itself.
+"""
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Type
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+@lru_cache(maxsize=None)
+def _layout(model: Type[BaseModel]) -> List[Tuple[str, str, FieldInfo]]:
+    """(field name, output key, field info) for each field of a model."""
+    return [(name, info.alias or name, info) for name, info in model.model_fields.items()]
+
+
+def trusted_dump(model: Type[BaseModel], doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    What model(**doc).model_dump(by_alias=True) would return for a trusted
+    document, without validating it. Raises ValueError when a required
+    field is missing.
+    """
+    item = {}
+    for name, key, info in _layout(model):
+        if key in doc:
+            item[key] = doc[key]
+        elif name in doc:
+            item[key] = doc[name]
+        elif info.is_required():
+            raise ValueError(f"{model.__name__} is missing required field {name}")
+        else:
+            item[key] = info.get_default(call_default_factory=True)
+    return item
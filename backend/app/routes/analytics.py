@@ -2,12 +2,14 @@ from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import Optional
 from datetime import datetime
 
-from app.services import analytics_service
-from app.routes.auth import get_current_user
+from app.services import analytics_service, analytics_cache_service, series_service
+from app.routes.auth import get_current_user, require_auth
 from app.models.user import User
 
 router = APIRouter()
 
+MAX_COMPARE_CHANNELS = 10
+
 
 @router.get("/channel/{channel_id}/summary")
 async def get_channel_summary(
@@ -16,7 +18,11 @@ async def get_channel_summary(
 ):
     """Get overall channel summary statistics."""
     user_id = user.google_id if user else None
-    return await analytics_service.get_channel_summary(channel_id, user_id)
+    return await analytics_cache_service.get_or_compute(
+        "summary", channel_id, user_id, {},
+        lambda: analytics_service.get_channel_summary(channel_id, user_id),
+        annotations=True, now_relative=True
+    )
 
 
 @router.get("/channel/{channel_id}/sentiment")
@@ -28,8 +34,9 @@ async def get_sentiment_breakdown(
 ):
     """Get sentiment distribution for a channel."""
     user_id = user.google_id if user else None
-    return await analytics_service.get_sentiment_breakdown(
-        channel_id, user_id, date_from, date_to
+    return await analytics_cache_service.get_or_compute(
+        "sentiment", channel_id, user_id, {"date_from": date_from, "date_to": date_to},
+        lambda: analytics_service.get_sentiment_breakdown(channel_id, user_id, date_from, date_to)
     )
 
 
@@ -42,8 +49,10 @@ async def get_tag_breakdown(
 ):
     """Get tag distribution for a channel."""
     user_id = user.google_id if user else None
-    return await analytics_service.get_tag_breakdown(
-        channel_id, user_id, date_from, date_to
+    return await analytics_cache_service.get_or_compute(
+        "tags", channel_id, user_id, {"date_from": date_from, "date_to": date_to},
+        lambda: analytics_service.get_tag_breakdown(channel_id, user_id, date_from, date_to),
+        annotations=True
     )
 
 
@@ -55,7 +64,67 @@ async def get_sentiment_trends(
 ):
     """Get sentiment trends over time."""
     user_id = user.google_id if user else None
-    return await analytics_service.get_sentiment_over_time(channel_id, days, user_id)
+    return await analytics_cache_service.get_or_compute(
+        "trends", channel_id, user_id, {"days": days},
+        lambda: analytics_service.get_sentiment_over_time(channel_id, days, user_id),
+        now_relative=True
+    )
+
+
+@router.get("/channel/{channel_id}/commenters")
+async def get_commenter_trends(
+    channel_id: str,
+    user: Optional[User] = Depends(get_current_user),
+    days: int = Query(30, ge=1, le=365)
+):
+    """Get unique commenters per day and over the window."""
+    user_id = user.google_id if user else None
+    return await analytics_cache_service.get_or_compute(
+        "commenters", channel_id, user_id, {"days": days},
+        lambda: analytics_service.get_commenter_trend(channel_id, days, user_id),
+        now_relative=True
+    )
+
+
+@router.get("/channel/{channel_id}/series")
+async def get_sentiment_series(
+    channel_id: str,
+    user: Optional[User] = Depends(get_current_user),
+    bucket: str = Query("day", pattern="^(hour|day|week|month)$"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    tz: str = Query("UTC", description="IANA timezone of the creator, e.g. America/New_York"),
+    compare: bool = Query(False, description="Include the previous period of equal length")
+):
+    """Get a gap-filled sentiment series in hour/day/week/month buckets."""
+    user_id = user.google_id if user else None
+    params = {"bucket": bucket, "date_from": date_from, "date_to": date_to, "tz": tz, "compare": compare}
+    
+    try:
+        return await analytics_cache_service.get_or_compute(
+            "series", channel_id, user_id, params,
+            lambda: series_service.get_series(channel_id, user_id, bucket, date_from, date_to, tz, compare),
+            now_relative=date_to is None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/channel/{channel_id}/engagement")
+async def get_engagement_distribution(
+    channel_id: str,
+    user: Optional[User] = Depends(get_current_user),
+    days: int = Query(30, ge=1, le=365),
+    bucket: str = Query("week", pattern="^(day|week|month)$"),
+    video_id: Optional[str] = None
+):
+    """Get like and reply quantiles per comment, overall and per bucket."""
+    user_id = user.google_id if user else None
+    return await analytics_cache_service.get_or_compute(
+        "engagement", channel_id, user_id, {"days": days, "bucket": bucket, "video_id": video_id},
+        lambda: analytics_service.get_engagement_distribution(channel_id, days, user_id, video_id, bucket),
+        now_relative=True
+    )
 
 
 @router.get("/channel/{channel_id}/top-videos")
@@ -66,4 +135,31 @@ async def get_top_videos(
 ):
     """Get top videos by comment count."""
     user_id = user.google_id if user else None
-    return await analytics_service.get_top_videos(channel_id, limit, user_id)
+    return await analytics_cache_service.get_or_compute(
+        "top-videos", channel_id, user_id, {"limit": limit},
+        lambda: analytics_service.get_top_videos(channel_id, limit, user_id)
+    )
+
+
+@router.get("/compare")
+async def compare_channels(
+    channel_ids: str = Query(..., description="Comma-separated channel IDs"),
+    user: Optional[User] = Depends(get_current_user),
+    days: int = Query(30, ge=1, le=365)
+):
+    """Compare summary, sentiment, tags and trends across channels in one request."""
+    user_id = user.google_id if user else None
+    
+    ids = list(dict.fromkeys(cid.strip() for cid in channel_ids.split(",") if cid.strip()))
+    if not ids:
+        raise HTTPException(status_code=400, detail="channel_ids is required")
+    if len(ids) > MAX_COMPARE_CHANNELS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_COMPARE_CHANNELS} channels can be compared")
+    
+    return await analytics_service.compare_channels(ids, user_id, days)
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(user: User = Depends(require_auth)):
+    """Get analytics response cache metrics."""
+    return analytics_cache_service.stats()
@@ -3,6 +3,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from typing import Optional
+import hmac
 import httpx
 
 from app.config import get_settings
@@ -48,6 +49,23 @@ async def get_current_user(
         return None
 
 
+async def require_cron(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """Dependency for endpoints called by an external cron with the shared CRON_SECRET."""
+    settings = get_settings()
+    if (
+        not settings.cron_secret
+        or not credentials
+        or not hmac.compare_digest(credentials.credentials, settings.cron_secret)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
 async def require_auth(
     user: Optional[User] = Depends(get_current_user)
 ) -> User:
@@ -4,7 +4,11 @@ from datetime import datetime
 
 from app.database import get_database
 from app.models import ChannelCreate, ChannelResponse, ChannelSyncStatus
-from app.services import youtube_service, sync_service
+from app.services import (
+    youtube_service, sync_service, retrieval_service, chat_cache_service,
+    columnar_service, analytics_cache_service, anomaly_service
+)
+from app.responses import FastJSONResponse, trusted_dump
 from app.routes.auth import get_current_user, require_auth
 from app.models.user import User
 
@@ -108,14 +112,12 @@ async def list_channels(user: Optional[User] = Depends(get_current_user)):
     valid_channels = []
     for channel in channels:
         try:
-            if "_id" in channel:
-                channel['_id'] = str(channel['_id'])
-            valid_channels.append(ChannelResponse(**channel))
+            valid_channels.append(trusted_dump(ChannelResponse, channel))
         except Exception as e:
             print(f"Error processing channel {channel.get('channel_id', 'unknown')}: {e}")
             continue
     
-    return valid_channels
+    return FastJSONResponse(valid_channels)
 
 
 @router.get("/{channel_id}", response_model=ChannelResponse)
@@ -156,7 +158,17 @@ async def delete_channel(channel_id: str, user: Optional[User] = Depends(get_cur
     await db.comments.delete_many({"channel_id": channel_id, "user_id": user_id})
     await db.commenters.delete_many({"channel_id": channel_id, "user_id": user_id})
     await db.reports.delete_many({"channel_id": channel_id, "user_id": user_id})
+    await db.report_schedules.delete_many({"channel_id": channel_id, "user_id": user_id})
     await db.chat_history.delete_many({"channel_id": channel_id, "user_id": user_id})
+    await db.daily_rollups.delete_many({"channel_id": channel_id, "user_id": user_id})
+    await db.commenter_sketches.delete_many({"channel_id": channel_id, "user_id": user_id})
+    await db.hourly_rollups.delete_many({"channel_id": channel_id, "user_id": user_id})
+    await db.anomalies.delete_many({"channel_id": channel_id, "user_id": user_id})
+    await db.detector_state.delete_many({"channel_id": channel_id, "user_id": user_id})
+    retrieval_service.invalidate(channel_id, user_id)
+    chat_cache_service.invalidate(channel_id, user_id)
+    columnar_service.invalidate(channel_id, user_id)
+    analytics_cache_service.invalidate(channel_id, user_id)
     
     return {"message": "Channel and all related data deleted"}
 
@@ -247,6 +259,32 @@ async def get_channel_logs(channel_id: str, user: Optional[User] = Depends(get_c
     return logs
 
 
+@router.get("/{channel_id}/alerts")
+async def get_channel_alerts(
+    channel_id: str,
+    user: Optional[User] = Depends(get_current_user),
+    video_id: Optional[str] = None,
+    limit: int = 50
+):
+    """Get comment and negative-sentiment spikes detected for a channel."""
+    db = get_database()
+    
+    query = {"channel_id": channel_id}
+    if user:
+        query["user_id"] = user.google_id
+    
+    channel = await db.channels.find_one(query)
+    if not channel:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    
+    return await anomaly_service.get_alerts(
+        channel_id,
+        user.google_id if user else None,
+        video_id,
+        min(limit, 200)
+    )
+
+
 @router.get("/{channel_id}/logs/stream")
 async def stream_channel_logs(
     channel_id: str, 
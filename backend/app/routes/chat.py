@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime
+import json
 from pydantic import BaseModel
 
 from app.database import get_database
-from app.services import gemini_service
+from app.services import gemini_service, retrieval_service, chat_cache_service, intent_service, memory_service
+from app.services.gemini_service import CHAT_ERROR_MESSAGE
+from app.services.memory_service import is_follow_up
 from app.routes.auth import get_current_user, require_auth
 from app.models.user import User
 
@@ -22,16 +26,13 @@ class ChatResponse(BaseModel):
     timestamp: datetime
 
 
-@router.post("/channel/{channel_id}", response_model=ChatResponse)
-async def chat_with_comments(
-    channel_id: str, 
-    chat: ChatMessage,
-    user: Optional[User] = Depends(get_current_user)
-):
-    """Chat with AI about channel comments."""
+NO_COMMENTS_MESSAGE = "No comments found for this channel. Please sync the channel first."
+
+
+async def _get_channel(channel_id: str, user: Optional[User]) -> dict:
+    """Get channel info (filtered by user)."""
     db = get_database()
     
-    # Get channel info (filtered by user)
     query = {"channel_id": channel_id}
     if user:
         query["user_id"] = user.google_id
@@ -40,32 +41,35 @@ async def chat_with_comments(
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
     
-    # Get recent comments for context
-    comments_query = {"channel_id": channel_id}
-    if user:
-        comments_query["user_id"] = user.google_id
-    
-    comments = await db.comments.find(
-        comments_query
-    ).sort("published_at", -1).limit(100).to_list(100)
-    
-    if not comments:
-        return ChatResponse(
-            response="No comments found for this channel. Please sync the channel first.",
-            timestamp=datetime.utcnow()
-        )
+    return channel
+
+
+async def _select_comments(
+    channel_id: str,
+    message: str,
+    user: Optional[User],
+    memory: Optional[dict] = None
+) -> List[dict]:
+    """Get the comments most relevant to the message."""
+    # Follow-ups like "what about the negative ones?" need the previous question's terms
+    query = message
+    if memory and memory['recent'] and is_follow_up(message):
+        query = f"{memory['recent'][-1]['user_message']} {message}"
     
-    # Get AI response
-    response = await gemini_service.chat_with_comments(
-        question=chat.message,
-        comments_context=comments,
-        channel_name=channel['name']
+    return await retrieval_service.select_context(
+        query,
+        channel_id,
+        user.google_id if user else None
     )
+
+
+async def _save_chat_entry(channel_id: str, message: str, response: str, user: Optional[User]):
+    """Save a chat exchange to history with user_id."""
+    db = get_database()
     
-    # Save to chat history with user_id
     chat_entry = {
         "channel_id": channel_id,
-        "user_message": chat.message,
+        "user_message": message,
         "ai_response": response,
         "created_at": datetime.utcnow()
     }
@@ -73,6 +77,53 @@ async def chat_with_comments(
         chat_entry["user_id"] = user.google_id
     
     await db.chat_history.insert_one(chat_entry)
+
+
+@router.post("/channel/{channel_id}", response_model=ChatResponse)
+async def chat_with_comments(
+    channel_id: str, 
+    chat: ChatMessage,
+    background_tasks: BackgroundTasks,
+    user: Optional[User] = Depends(get_current_user)
+):
+    """Chat with AI about channel comments."""
+    channel = await _get_channel(channel_id, user)
+    user_id = user.google_id if user else None
+    data_version = channel.get('data_version', 0)
+    # Follow-ups depend on the conversation, so they bypass the answer cache
+    cacheable = not is_follow_up(chat.message)
+    
+    # Analytic questions are answered exactly from aggregates; repeated
+    # questions against unchanged data come from the cache
+    response = await intent_service.answer(chat.message, channel_id, user_id)
+    if response is None and cacheable:
+        response = chat_cache_service.get(channel_id, user_id, data_version, chat.message)
+    
+    if response is None:
+        memory = await memory_service.get_memory(channel_id, user_id)
+        comments = await _select_comments(channel_id, chat.message, user, memory)
+        
+        if not comments:
+            return ChatResponse(
+                response=NO_COMMENTS_MESSAGE,
+                timestamp=datetime.utcnow()
+            )
+        
+        # Get AI response
+        response = await gemini_service.chat_with_comments(
+            question=chat.message,
+            comments_context=comments,
+            channel_name=channel['name'],
+            memory=memory
+        )
+        
+        if cacheable and response != CHAT_ERROR_MESSAGE:
+            chat_cache_service.set(channel_id, user_id, data_version, chat.message, response)
+    
+    # Failed answers stay out of history, and so out of memory
+    if response != CHAT_ERROR_MESSAGE:
+        await _save_chat_entry(channel_id, chat.message, response, user)
+        background_tasks.add_task(memory_service.compact, channel_id, user_id)
     
     return ChatResponse(
         response=response,
@@ -80,6 +131,79 @@ async def chat_with_comments(
     )
 
 
+@router.post("/channel/{channel_id}/stream")
+async def stream_chat_with_comments(
+    channel_id: str,
+    chat: ChatMessage,
+    background_tasks: BackgroundTasks,
+    user: Optional[User] = Depends(get_current_user)
+):
+    """
+    Chat with AI about channel comments, streaming the answer via SSE.
+    Emits {"type": "token", "text": ...} events followed by a final
+    {"type": "done", "response": ..., "timestamp": ...} event.
+    """
+    channel = await _get_channel(channel_id, user)
+    user_id = user.google_id if user else None
+    data_version = channel.get('data_version', 0)
+    cacheable = not is_follow_up(chat.message)
+    
+    # Answers from aggregates or the cache are sent as a single event
+    instant = await intent_service.answer(chat.message, channel_id, user_id)
+    if instant is None and cacheable:
+        instant = chat_cache_service.get(channel_id, user_id, data_version, chat.message)
+    
+    memory = None
+    comments = []
+    if instant is None:
+        memory = await memory_service.get_memory(channel_id, user_id)
+        comments = await _select_comments(channel_id, chat.message, user, memory)
+    
+    def sse(payload: dict) -> str:
+        return f"data: {json.dumps(payload)}\n\n"
+    
+    async def event_generator():
+        if instant is not None:
+            yield sse({"type": "token", "text": instant})
+            await _save_chat_entry(channel_id, chat.message, instant, user)
+            yield sse({"type": "done", "response": instant, "timestamp": datetime.utcnow().isoformat()})
+            return
+        
+        if not comments:
+            yield sse({"type": "token", "text": NO_COMMENTS_MESSAGE})
+            yield sse({"type": "done", "response": NO_COMMENTS_MESSAGE, "timestamp": datetime.utcnow().isoformat()})
+            return
+        
+        chunks = []
+        async for text in gemini_service.stream_chat_with_comments(
+            question=chat.message,
+            comments_context=comments,
+            channel_name=channel['name'],
+            memory=memory
+        ):
+            chunks.append(text)
+            yield sse({"type": "token", "text": text})
+        
+        # Persist only once the full answer has been streamed. A failed stream
+        # ends with the error message; keep it out of history, memory and the cache
+        response = "".join(chunks).strip()
+        if chunks and chunks[-1] != CHAT_ERROR_MESSAGE:
+            if cacheable:
+                chat_cache_service.set(channel_id, user_id, data_version, chat.message, response)
+            await _save_chat_entry(channel_id, chat.message, response, user)
+        
+        yield sse({"type": "done", "response": response, "timestamp": datetime.utcnow().isoformat()})
+    
+    # Runs after the stream completes
+    background_tasks.add_task(memory_service.compact, channel_id, user_id)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/channel/{channel_id}/history")
 async def get_chat_history(
     channel_id: str, 
@@ -89,7 +213,8 @@ async def get_chat_history(
     """Get chat history for a channel."""
     db = get_database()
     
-    query = {"channel_id": channel_id}
+    # Exclude the rolling summary kept alongside the turns
+    query = {"channel_id": channel_id, "type": {"$ne": "summary"}}
     if user:
         query["user_id"] = user.google_id
     
@@ -124,3 +249,9 @@ async def clear_chat_history(
     })
     
     return {"message": f"Deleted {result.deleted_count} messages"}
+
+
+@router.get("/cache/stats")
+async def get_chat_cache_stats(user: User = Depends(require_auth)):
+    """Get chat answer cache hit statistics."""
+    return chat_cache_service.stats()
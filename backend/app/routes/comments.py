@@ -1,33 +1,50 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple
 from datetime import datetime
+import asyncio
 import math
 
 from app.database import get_database
-from app.models import CommentResponse, CommentBookmark, CommentTags, CommentsPaginated
+from app.models import (
+    CommentResponse, CommentCompact, CommentBookmark, CommentTags, CommentsPaginated, CommentsFaceted
+)
+from app.responses import FastJSONResponse, trusted_dump
+from app.services import (
+    rollup_service, columnar_service, analytics_cache_service, export_service, pagination_service,
+    projection_service, search_service
+)
+from app.services.pagination_service import InvalidCursor
+from app.services.projection_service import InvalidFields
 from app.routes.auth import get_current_user
 from app.models.user import User
 
 router = APIRouter()
 
 
-@router.get("/channel/{channel_id}", response_model=CommentsPaginated)
-async def list_channel_comments(
+def _projection_or_400(
+    view: str,
+    fields: Optional[str]
+) -> Tuple[Optional[List[str]], Optional[dict]]:
+    """projection_service.comment_projection, with unknown fields reported as a 400."""
+    try:
+        return projection_service.comment_projection(view, fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _build_comment_query(
     channel_id: str,
-    user: Optional[User] = Depends(get_current_user),
-    sentiment: Optional[str] = Query(None, description="Filter by sentiment (positive, neutral, negative)"),
-    tags: Optional[str] = Query(None, description="Comma-separated tags to filter"),
+    user: Optional[User],
+    sentiment: Optional[str] = None,
+    tags: Optional[str] = None,
     video_id: Optional[str] = None,
     is_bookmarked: Optional[bool] = None,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
-    search: Optional[str] = None,
-    page: int = Query(1, ge=1),
-    limit: int = Query(50, ge=1, le=100)
-):
-    """List comments for a channel with filters."""
-    db = get_database()
-    
+    text_search: Optional[dict] = None
+) -> dict:
+    """Build a comments query from list filters, scoped to the user."""
     # Build query with user_id filtering
     query = {"channel_id": channel_id}
     
@@ -53,43 +70,228 @@ async def list_channel_comments(
     if date_to:
         query.setdefault("published_at", {})["$lte"] = date_to
     
-    if search:
-        query["text"] = {"$regex": search, "$options": "i"}
+    if text_search:
+        query["$text"] = text_search
     
-    # Get total count
-    total = await db.comments.count_documents(query)
+    return query
+
+
+@router.get("/channel/{channel_id}", response_model=CommentsPaginated)
+async def list_channel_comments(
+    channel_id: str,
+    user: Optional[User] = Depends(get_current_user),
+    sentiment: Optional[str] = Query(None, description="Filter by sentiment (positive, neutral, negative)"),
+    tags: Optional[str] = Query(None, description="Comma-separated tags to filter"),
+    video_id: Optional[str] = None,
+    is_bookmarked: Optional[bool] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    search: Optional[str] = Query(None, max_length=200, description='Words, "exact phrases", prefix* and -excluded terms'),
+    sort: Optional[str] = Query(None, pattern="^(recent|relevance)$", description="Defaults to relevance when searching"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from the previous page; empty for the first page"),
+    total_mode: str = Query("exact", pattern="^(exact|approximate|none)$"),
+    view: str = Query("full", pattern="^(full|compact)$", description="compact returns the table-view columns only"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; overrides view")
+):
+    """
+    List comments for a channel with filters, newest first. Passing cursor
+    switches from page numbers to keyset pagination, which costs the same
+    at any depth. Searches use the text index and rank by relevance unless
+    sort=recent; results carry highlight offsets into the comment text.
+    view=compact and fields= read and return only the requested fields.
+    """
+    db = get_database()
+    selected, projection = _projection_or_400(view, fields)
+    
+    text_search, parsed_search = None, None
+    if search and search.strip():
+        text_search, parsed_search = await search_service.text_filter(
+            search, channel_id, user.google_id if user else None
+        )
+        if text_search is None:
+            # Nothing searchable, e.g. a prefix matching no indexed term
+            return CommentsPaginated(items=[], total=0, page=page, limit=limit, pages=1)
+    
+    ranked = text_search is not None and sort != "recent"
+    if ranked and cursor is not None:
+        raise HTTPException(status_code=400, detail="Cursors are not supported with relevance sorting; use page or sort=recent")
+    
+    query = _build_comment_query(
+        channel_id, user, sentiment, tags, video_id, is_bookmarked, date_from, date_to, text_search
+    )
     
-    # Calculate pagination
-    skip = (page - 1) * limit
-    pages = math.ceil(total / limit) if total > 0 else 1
+    # Keyset pages seek past the cursor; legacy page numbers and ranked searches skip
+    skip = 0 if cursor is not None else (page - 1) * limit
+    if ranked:
+        comments, (total, total_is_lower_bound) = await asyncio.gather(
+            search_service.fetch_ranked_page(db.comments, query, limit, skip, projection),
+            pagination_service.count(db.comments, query, total_mode)
+        )
+        next_cursor = None
+    else:
+        try:
+            (comments, next_cursor), (total, total_is_lower_bound) = await asyncio.gather(
+                pagination_service.fetch_page(db.comments, query, limit, cursor, skip, projection),
+                pagination_service.count(db.comments, query, total_mode)
+            )
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    pages = math.ceil(total / limit) if total else (None if total is None else 1)
+    
+    if parsed_search is not None and (selected is None or "highlights" in selected):
+        search_service.annotate(comments, parsed_search)
+    
+    if selected is None or "video_title" in selected:
+        # Get unique video IDs from these comments
+        video_ids = list(set(c.get("video_id") for c in comments if c.get("video_id")))
+        
+        # Fetch video titles in bulk
+        video_query = {"video_id": {"$in": video_ids}}
+        if user:
+            video_query["user_id"] = user.google_id
+        
+        videos = await db.videos.find(video_query, {"video_id": 1, "title": 1}).to_list(None)
+        video_titles = {v["video_id"]: v.get("title", "Unknown Video") for v in videos}
+        
+        # Enrich comments with video titles
+        for comment in comments:
+            comment['video_title'] = video_titles.get(comment.get("video_id"), "Unknown Video")
+    
+    if fields:
+        items = [projection_service.select(c, selected) for c in comments]
+    elif selected is not None:
+        items = [trusted_dump(CommentCompact, c) for c in comments]
+    else:
+        items = [trusted_dump(CommentResponse, c) for c in comments]
+    
+    # Documents come straight from the database: shape them like the response
+    # model without re-validating, and let orjson encode ObjectIds and datetimes
+    return FastJSONResponse({
+        "items": items,
+        "total": total,
+        "page": page if cursor is None else None,
+        "limit": limit,
+        "pages": pages,
+        "next_cursor": next_cursor,
+        "total_is_lower_bound": total_is_lower_bound
+    })
+
+
+@router.get("/channel/{channel_id}/search", response_model=CommentsFaceted)
+async def search_channel_comments(
+    channel_id: str,
+    user: Optional[User] = Depends(get_current_user),
+    sentiment: Optional[str] = Query(None, description="Filter by sentiment (positive, neutral, negative)"),
+    tags: Optional[str] = Query(None, description="Comma-separated tags to filter"),
+    video_id: Optional[str] = None,
+    is_bookmarked: Optional[bool] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    search: Optional[str] = Query(None, max_length=200, description='Words, "exact phrases", prefix* and -excluded terms'),
+    sort: Optional[str] = Query(None, pattern="^(recent|relevance)$", description="Defaults to relevance when searching"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=100)
+):
+    """
+    A page of comments plus counts per sentiment, tag and video for the same
+    filter. Results are cached per filter and data version.
+    """
+    db = get_database()
+    user_id = user.google_id if user else None
+    
+    async def compute():
+        text_search, parsed_search = None, None
+        if search and search.strip():
+            text_search, parsed_search = await search_service.text_filter(search, channel_id, user_id)
+            if text_search is None:
+                return {
+                    "items": [], "total": 0, "total_is_lower_bound": False, "page": page, "limit": limit,
+                    "pages": 1, "next_cursor": None, "facets": {"sentiment": {}, "tags": {}, "videos": []}
+                }
+        
+        query = _build_comment_query(
+            channel_id, user, sentiment, tags, video_id, is_bookmarked, date_from, date_to, text_search
+        )
+        ranked = text_search is not None and sort != "recent"
+        result = await search_service.faceted_page(db.comments, query, limit, (page - 1) * limit, ranked)
+        
+        comments = result['items']
+        if parsed_search is not None:
+            search_service.annotate(comments, parsed_search)
+        
+        # Titles for the page's videos and the video facet in one lookup
+        facet_videos = result['facets']['videos']
+        video_ids = list({c.get("video_id") for c in comments if c.get("video_id")} | {v['video_id'] for v in facet_videos})
+        video_query = {"video_id": {"$in": video_ids}}
+        if user:
+            video_query["user_id"] = user.google_id
+        videos = await db.videos.find(video_query, {"video_id": 1, "title": 1}).to_list(None)
+        video_titles = {v["video_id"]: v.get("title", "Unknown Video") for v in videos}
+        
+        for comment in comments:
+            comment['video_title'] = video_titles.get(comment.get("video_id"), "Unknown Video")
+        for video in facet_videos:
+            video['title'] = video_titles.get(video['video_id'], "Unknown Video")
+        
+        return {
+            "items": [trusted_dump(CommentResponse, c) for c in comments],
+            "total": result['total'],
+            "total_is_lower_bound": False,
+            "page": page,
+            "limit": limit,
+            "pages": math.ceil(result['total'] / limit) if result['total'] else 1,
+            "next_cursor": None,
+            "facets": result['facets']
+        }
+    
+    params = {
+        "sentiment": sentiment, "tags": tags, "video_id": video_id, "is_bookmarked": is_bookmarked,
+        "date_from": date_from, "date_to": date_to, "search": search, "sort": sort,
+        "page": page, "limit": limit
+    }
+    result = await analytics_cache_service.get_or_compute(
+        "comment_search", channel_id, user_id, params, compute, annotations=True
+    )
+    return FastJSONResponse(result)
+
+
+@router.get("/channel/{channel_id}/export")
+async def export_channel_comments(
+    channel_id: str,
+    user: Optional[User] = Depends(get_current_user),
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    gzip: bool = False,
+    sentiment: Optional[str] = None,
+    tags: Optional[str] = None,
+    video_id: Optional[str] = None,
+    is_bookmarked: Optional[bool] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
+):
+    """Stream a channel's comments as CSV, NDJSON or Parquet, optionally gzipped."""
+    db = get_database()
     
-    # Get comments
-    comments = await db.comments.find(query).sort(
-        "published_at", -1
-    ).skip(skip).limit(limit).to_list(limit)
+    channel_query = {"channel_id": channel_id}
+    if user:
+        channel_query["user_id"] = user.google_id
+    if not await db.channels.find_one(channel_query, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Channel not found")
     
-    # Get unique video IDs from these comments
-    video_ids = list(set(c.get("video_id") for c in comments if c.get("video_id")))
+    if format == "parquet" and not export_service.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export is not available on this server")
     
-    # Fetch video titles in bulk
-    video_query = {"video_id": {"$in": video_ids}}
-    if user:
-        video_query["user_id"] = user.google_id
-    
-    videos = await db.videos.find(video_query, {"video_id": 1, "title": 1}).to_list(None)
-    video_titles = {v["video_id"]: v.get("title", "Unknown Video") for v in videos}
-    
-    # Enrich comments with video titles
-    for comment in comments:
-        comment['_id'] = str(comment['_id'])
-        comment['video_title'] = video_titles.get(comment.get("video_id"), "Unknown Video")
-    
-    return CommentsPaginated(
-        items=[CommentResponse(**c) for c in comments],
-        total=total,
-        page=page,
-        limit=limit,
-        pages=pages
+    query = _build_comment_query(
+        channel_id, user, sentiment, tags, video_id, is_bookmarked, date_from, date_to
+    )
+    filename = export_service.filename(f"comments_{channel_id}", format, gzip)
+    
+    return StreamingResponse(
+        export_service.stream_comments(query, format, gzip),
+        media_type=export_service.media_type(format, gzip),
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
@@ -123,14 +325,18 @@ async def toggle_bookmark(
     if user:
         query["user_id"] = user.google_id
     
-    result = await db.comments.update_one(
+    comment = await db.comments.find_one_and_update(
         query,
-        {"$set": {"is_bookmarked": bookmark.is_bookmarked}}
+        {"$set": {"is_bookmarked": bookmark.is_bookmarked}},
+        projection={"channel_id": 1, "user_id": 1}
     )
     
-    if result.matched_count == 0:
+    if comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
     
+    # Bookmark counts are part of cached analytics
+    await analytics_cache_service.bump_annotation_version(comment['channel_id'], comment['user_id'])
+    
     return {"message": "Bookmark updated", "is_bookmarked": bookmark.is_bookmarked}
 
 
@@ -147,14 +353,20 @@ async def update_tags(
     if user:
         query["user_id"] = user.google_id
     
-    result = await db.comments.update_one(
+    comment = await db.comments.find_one_and_update(
         query,
-        {"$set": {"tags": tags.tags}}
+        {"$set": {"tags": tags.tags}},
+        projection={"channel_id": 1, "user_id": 1, "video_id": 1}
     )
     
-    if result.matched_count == 0:
+    if comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
     
+    # Tag counts are part of the daily rollups
+    await rollup_service.rebuild_video(comment['channel_id'], comment['user_id'], comment['video_id'])
+    await analytics_cache_service.bump_annotation_version(comment['channel_id'], comment['user_id'])
+    columnar_service.invalidate(comment['channel_id'], comment['user_id'])
+    
     return {"message": "Tags updated", "tags": tags.tags}
 
 
@@ -163,28 +375,37 @@ async def get_bookmarked_comments(
     channel_id: str,
     user: Optional[User] = Depends(get_current_user),
     page: int = Query(1, ge=1),
-    limit: int = Query(50, ge=1, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from the previous page; empty for the first page"),
+    total_mode: str = Query("exact", pattern="^(exact|approximate|none)$"),
+    view: str = Query("full", pattern="^(full|compact)$", description="compact returns the table-view columns only"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; overrides view")
 ):
-    """Get all bookmarked comments for a channel."""
+    """Get all bookmarked comments for a channel, newest first."""
     db = get_database()
+    selected, projection = _projection_or_400(view, fields)
     
     query = {"channel_id": channel_id, "is_bookmarked": True}
     if user:
         query["user_id"] = user.google_id
     
-    total = await db.comments.count_documents(query)
-    skip = (page - 1) * limit
-    
-    comments = await db.comments.find(query).sort(
-        "published_at", -1
-    ).skip(skip).limit(limit).to_list(limit)
+    skip = 0 if cursor is not None else (page - 1) * limit
+    try:
+        (comments, next_cursor), (total, total_is_lower_bound) = await asyncio.gather(
+            pagination_service.fetch_page(db.comments, query, limit, cursor, skip, projection),
+            pagination_service.count(db.comments, query, total_mode)
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    for comment in comments:
-        comment['_id'] = str(comment['_id'])
+    if selected is not None:
+        comments = [projection_service.select(c, selected) for c in comments]
     
-    return {
+    return FastJSONResponse({
         "items": comments,
         "total": total,
-        "page": page,
-        "limit": limit
-    }
+        "total_is_lower_bound": total_is_lower_bound,
+        "page": page if cursor is None else None,
+        "limit": limit,
+        "next_cursor": next_cursor
+    })
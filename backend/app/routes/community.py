@@ -3,6 +3,7 @@ from typing import List, Optional
 
 from app.database import get_database
 from app.models import CommunityStats, TopCommenter
+from app.services import columnar_service
 from app.routes.auth import get_current_user
 from app.models.user import User
 
@@ -21,13 +22,19 @@ async def get_community_stats(
     if user:
         base_query["user_id"] = user.google_id
     
-    # Total and unique commenters
-    total_comments = await db.comments.count_documents(base_query)
-    unique_commenters = await db.commenters.count_documents(base_query)
-    repeat_commenters = await db.commenters.count_documents({
-        **base_query,
-        "is_repeat": True
-    })
+    # Total, unique and repeat (more than one comment) commenters
+    columns = await columnar_service.get_columns(channel_id, user.google_id if user else None)
+    if columns is not None:
+        total_comments = columns.count()
+        unique_commenters = columns.unique_commenters()
+        repeat_commenters = columns.repeat_commenters()
+    else:
+        total_comments = await db.comments.count_documents(base_query)
+        unique_commenters = await db.commenters.count_documents(base_query)
+        repeat_commenters = await db.commenters.count_documents({
+            **base_query,
+            "comment_count": {"$gt": 1}
+        })
     
     repeat_percentage = round(
         (repeat_commenters / unique_commenters * 100) if unique_commenters > 0 else 0, 1
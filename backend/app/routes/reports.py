@@ -1,83 +1,21 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse
+import json
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
 
 from app.database import get_database
-from app.models import ReportCreate, ReportResponse, ReportData
-from app.services import analytics_service
-from app.routes.auth import get_current_user, require_auth
+from app.models import ReportCreate, ReportResponse, ReportScheduleCreate, ReportScheduleResponse
+from app.services import report_service, export_service, scheduler_service
+from app.services.scheduler_service import first_run_at
+from app.routes.auth import get_current_user, require_auth, require_cron
 from app.models.user import User
 
 router = APIRouter()
 
-
-async def generate_report_data(
-    channel_id: str, 
-    date_from: datetime, 
-    date_to: datetime,
-    user_id: Optional[str] = None
-) -> ReportData:
-    """Generate report data for a channel."""
-    db = get_database()
-    
-    base_query = {"channel_id": channel_id}
-    if user_id:
-        base_query["user_id"] = user_id
-    
-    # Get sentiment breakdown
-    sentiment = await analytics_service.get_sentiment_breakdown(channel_id, user_id, date_from, date_to)
-    
-    # Get tag breakdown
-    tags = await analytics_service.get_tag_breakdown(channel_id, user_id, date_from, date_to)
-    
-    # Get top videos
-    top_videos = await analytics_service.get_top_videos(channel_id, 10, user_id)
-    
-    # Get trends
-    days = (date_to - date_from).days
-    trends = await analytics_service.get_sentiment_over_time(channel_id, days, user_id)
-    
-    # Get top commenters
-    commenters = await db.commenters.find(
-        base_query
-    ).sort("comment_count", -1).limit(10).to_list(10)
-    
-    top_commenters = [
-        {
-            "author_name": c['author_name'],
-            "comment_count": c['comment_count'],
-            "is_repeat": c.get('is_repeat', False)
-        }
-        for c in commenters
-    ]
-    
-    # Count totals
-    total_comments = await db.comments.count_documents({
-        **base_query,
-        "published_at": {"$gte": date_from, "$lte": date_to}
-    })
-    
-    total_videos = await db.videos.count_documents({
-        **base_query,
-        "published_at": {"$gte": date_from, "$lte": date_to}
-    })
-    
-    unique_commenters = await db.commenters.count_documents(base_query)
-    
-    return ReportData(
-        total_comments=total_comments,
-        total_videos=total_videos,
-        unique_commenters=unique_commenters,
-        sentiment_breakdown=sentiment['breakdown'],
-        sentiment_percentage=sentiment['percentages'],
-        tag_breakdown=tags,
-        top_videos=top_videos,
-        top_commenters=top_commenters,
-        comments_over_time=trends,
-        sentiment_over_time=trends
-    )
+# Status re-check interval for subscribers of reports generated by other workers
+REPORT_POLL_SECONDS = 2.0
 
 
 @router.post("", response_model=ReportResponse)
@@ -86,7 +24,7 @@ async def create_report(
     background_tasks: BackgroundTasks,
     user: User = Depends(require_auth)
 ):
-    """Create a new report."""
+    """Create a report and generate its data in the background. Poll or subscribe for completion."""
     db = get_database()
     
     # Get channel name for title (ensure user owns it)
@@ -97,32 +35,125 @@ async def create_report(
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
     
-    title = report.title or f"{channel['name']} Report - {report.date_from.strftime('%Y-%m-%d')} to {report.date_to.strftime('%Y-%m-%d')}"
+    # Identical range over unchanged data: hand back the existing report
+    data_version = channel.get('data_version', 0)
+    existing = await report_service.find_reusable(
+        report.channel_id, user.google_id, report.date_from, report.date_to, data_version
+    )
+    if existing:
+        existing['_id'] = str(existing['_id'])
+        return ReportResponse(**existing)
+    
+    report_doc = await report_service.create_pending(
+        channel, user.google_id, report.date_from, report.date_to, report.title
+    )
     
-    # Generate report data
-    report_data = await generate_report_data(
+    background_tasks.add_task(
+        report_service.run,
+        report_doc['id'],
         report.channel_id,
         report.date_from,
         report.date_to,
         user.google_id
     )
     
-    report_doc = {
-        "channel_id": report.channel_id,
-        "user_id": user.google_id,  # Link to user
-        "title": title,
-        "date_from": report.date_from,
-        "date_to": report.date_to,
-        "data": report_data.model_dump(),
-        "status": "completed",
-        "created_at": datetime.utcnow(),
-        "completed_at": datetime.utcnow()
+    report_doc['_id'] = report_doc['id']  # insert_one added the ObjectId
+    return ReportResponse(**report_doc)
+
+
+@router.post("/schedules", response_model=ReportScheduleResponse)
+async def create_report_schedule(
+    schedule: ReportScheduleCreate,
+    user: User = Depends(require_auth)
+):
+    """Schedule a weekly or monthly report, generated off-peak."""
+    db = get_database()
+    
+    channel = await db.channels.find_one({
+        "channel_id": schedule.channel_id,
+        "user_id": user.google_id
+    })
+    if not channel:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    
+    # One schedule per channel and frequency
+    existing = await db.report_schedules.find_one({
+        "channel_id": schedule.channel_id,
+        "user_id": user.google_id,
+        "frequency": schedule.frequency,
+        "active": True
+    })
+    if existing:
+        existing['_id'] = str(existing['_id'])
+        return ReportScheduleResponse(**existing)
+    
+    now = datetime.utcnow()
+    schedule_doc = {
+        "channel_id": schedule.channel_id,
+        "user_id": user.google_id,
+        "frequency": schedule.frequency,
+        "active": True,
+        "next_run_at": first_run_at(schedule.frequency, now),
+        "last_run_at": None,
+        "created_at": now
     }
+    result = await db.report_schedules.insert_one(schedule_doc)
+    schedule_doc['_id'] = str(result.inserted_id)
     
-    result = await db.reports.insert_one(report_doc)
-    report_doc['id'] = str(result.inserted_id)
+    return ReportScheduleResponse(**schedule_doc)
+
+
+@router.get("/schedules/run-due", dependencies=[Depends(require_cron)])
+async def run_due_schedules():
+    """
+    Generate due scheduled reports. Called by an external cron (Vercel Cron
+    sends GET with the CRON_SECRET bearer token); does nothing outside the
+    off-peak window.
+    """
+    created = await scheduler_service.tick()
+    return {"ran": created is not None, "created": created or 0}
+
+
+@router.get("/schedules/channel/{channel_id}", response_model=List[ReportScheduleResponse])
+async def list_report_schedules(
+    channel_id: str,
+    user: User = Depends(require_auth)
+):
+    """List active report schedules for a channel."""
+    db = get_database()
     
-    return ReportResponse(**report_doc)
+    schedules = await db.report_schedules.find({
+        "channel_id": channel_id,
+        "user_id": user.google_id,
+        "active": True
+    }).sort("created_at", -1).to_list(None)
+    
+    for schedule in schedules:
+        schedule['_id'] = str(schedule['_id'])
+    
+    return [ReportScheduleResponse(**s) for s in schedules]
+
+
+@router.delete("/schedules/{schedule_id}")
+async def delete_report_schedule(
+    schedule_id: str,
+    user: User = Depends(require_auth)
+):
+    """Stop a recurring report."""
+    db = get_database()
+    
+    try:
+        result = await db.report_schedules.delete_one({
+            "_id": ObjectId(schedule_id),
+            "user_id": user.google_id
+        })
+    except:
+        raise HTTPException(status_code=400, detail="Invalid schedule ID")
+    
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    
+    return {"message": "Schedule deleted"}
 
 
 @router.get("/channel/{channel_id}", response_model=List[ReportResponse])
@@ -168,6 +199,43 @@ async def get_report(
     return ReportResponse(**report)
 
 
+@router.get("/{report_id}/events")
+async def stream_report_status(
+    report_id: str,
+    user: Optional[User] = Depends(get_current_user)
+):
+    """Stream the report status via SSE until generation finishes."""
+    db = get_database()
+    
+    try:
+        query = {"_id": ObjectId(report_id)}
+        if user:
+            query["user_id"] = user.google_id
+    except:
+        raise HTTPException(status_code=400, detail="Invalid report ID")
+    
+    if not await db.reports.find_one(query, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    async def event_generator():
+        while True:
+            report = await db.reports.find_one(query, {"status": 1, "error": 1, "completed_at": 1})
+            if not report:
+                return
+            event = {
+                "status": report['status'],
+                "error": report.get('error'),
+                "completed_at": report['completed_at'].isoformat() if report.get('completed_at') else None
+            }
+            yield f"data: {json.dumps(event)}\n\n"
+            if report['status'] != "generating":
+                return
+            # Wake on completion in this process; re-check periodically otherwise
+            await report_service.wait_for_completion(report_id, REPORT_POLL_SECONDS)
+    
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
 @router.get("/{report_id}/download")
 async def download_report(
     report_id: str,
@@ -203,6 +271,45 @@ async def download_report(
     )
 
 
+@router.get("/{report_id}/export")
+async def export_report_comments(
+    report_id: str,
+    user: Optional[User] = Depends(get_current_user),
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    gzip: bool = False
+):
+    """Stream the comments behind a report as CSV, NDJSON or Parquet, optionally gzipped."""
+    db = get_database()
+    
+    try:
+        query = {"_id": ObjectId(report_id)}
+        if user:
+            query["user_id"] = user.google_id
+        report = await db.reports.find_one(query, {"channel_id": 1, "user_id": 1, "date_from": 1, "date_to": 1})
+    except:
+        raise HTTPException(status_code=400, detail="Invalid report ID")
+    
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    if format == "parquet" and not export_service.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export is not available on this server")
+    
+    comment_query = {
+        "channel_id": report['channel_id'],
+        "published_at": {"$gte": report['date_from'], "$lte": report['date_to']}
+    }
+    if report.get('user_id'):
+        comment_query["user_id"] = report['user_id']
+    filename = export_service.filename(f"report_{report_id}_comments", format, gzip)
+    
+    return StreamingResponse(
+        export_service.stream_comments(comment_query, format, gzip),
+        media_type=export_service.media_type(format, gzip),
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 @router.delete("/{report_id}")
 async def delete_report(
     report_id: str,
@@ -1,9 +1,13 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Optional
 
 from app.database import get_database
 from app.models import VideoResponse, VideoWithStats
-from app.services import analytics_service
+from app.services import analytics_service, pagination_service, projection_service
+from app.services.pagination_service import InvalidCursor
+from app.services.projection_service import InvalidFields
+from app.responses import FastJSONResponse
 from app.routes.auth import get_current_user
 from app.models.user import User
 
@@ -97,10 +101,18 @@ async def get_video_comments(
     user: Optional[User] = Depends(get_current_user),
     sentiment: Optional[str] = None,
     limit: int = Query(50, ge=1, le=100),
-    skip: int = Query(0, ge=0)
+    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from the previous page; empty for the first page"),
+    total_mode: str = Query("exact", pattern="^(exact|approximate|none)$"),
+    view: str = Query("full", pattern="^(full|compact)$", description="compact returns the table-view columns only"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; overrides view")
 ):
-    """Get comments for a specific video."""
+    """Get comments for a specific video, newest first."""
     db = get_database()
+    try:
+        selected, projection = projection_service.comment_projection(view, fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     query = {"video_id": video_id}
     if user:
@@ -108,17 +120,26 @@ async def get_video_comments(
     if sentiment:
         query["sentiment"] = sentiment
     
-    comments = await db.comments.find(query).sort(
-        "published_at", -1
-    ).skip(skip).limit(limit).to_list(limit)
-    
-    total = await db.comments.count_documents(query)
-    
+    try:
+        (comments, next_cursor), (total, total_is_lower_bound) = await asyncio.gather(
+            pagination_service.fetch_page(
+                db.comments, query, limit, cursor, 0 if cursor is not None else skip, projection
+            ),
+            pagination_service.count(db.comments, query, total_mode)
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if selected is not None:
+        comments = [projection_service.select(c, selected) for c in comments]
     for comment in comments:
-        comment['id'] = str(comment['_id'])
+        comment['id'] = comment['_id']
     
-    return {
+    # Raw documents: orjson encodes the ObjectIds and datetimes directly
+    return FastJSONResponse({
         "items": comments,
         "total": total,
+        "total_is_lower_bound": total_is_lower_bound,
+        "next_cursor": next_cursor,
         "video_id": video_id
-    }
+    })
@@ -1,11 +1,43 @@
 from app.services.youtube_service import youtube_service, YouTubeService
 from app.services.gemini_service import gemini_service, GeminiService
 from app.services.sync_service import sync_service, SyncService
+from app.services.rollup_service import rollup_service, RollupService
+from app.services.sketch_service import sketch_service, SketchService
+from app.services.columnar_service import columnar_service, ColumnarService
 from app.services.analytics_service import analytics_service, AnalyticsService
+from app.services.analytics_cache_service import analytics_cache_service, AnalyticsCacheService
+from app.services.series_service import series_service, SeriesService
+from app.services.anomaly_service import anomaly_service, AnomalyService
+from app.services.report_service import report_service, ReportService
+from app.services.export_service import export_service, ExportService
+from app.services.scheduler_service import scheduler_service, SchedulerService
+from app.services.pagination_service import pagination_service, PaginationService
+from app.services.projection_service import projection_service, ProjectionService
+from app.services.search_service import search_service, SearchService
+from app.services.retrieval_service import retrieval_service, RetrievalService
+from app.services.chat_cache_service import chat_cache_service, ChatCacheService
+from app.services.intent_service import intent_service, IntentService
+from app.services.memory_service import memory_service, MemoryService
 
 __all__ = [
     "youtube_service", "YouTubeService",
     "gemini_service", "GeminiService",
     "sync_service", "SyncService",
+    "rollup_service", "RollupService",
+    "sketch_service", "SketchService",
+    "columnar_service", "ColumnarService",
     "analytics_service", "AnalyticsService",
+    "analytics_cache_service", "AnalyticsCacheService",
+    "series_service", "SeriesService",
+    "anomaly_service", "AnomalyService",
+    "report_service", "ReportService",
+    "export_service", "ExportService",
+    "scheduler_service", "SchedulerService",
+    "pagination_service", "PaginationService",
+    "projection_service", "ProjectionService",
+    "search_service", "SearchService",
+    "retrieval_service", "RetrievalService",
+    "chat_cache_service", "ChatCacheService",
+    "intent_service", "IntentService",
+    "memory_service", "MemoryService",
 ]
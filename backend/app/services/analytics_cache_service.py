@@ -0,0 +1,148 @@
+"""
+Read-through cache for analytics responses.
+
+Entries are keyed by (endpoint, user_id, channel_id, params, data_version).
+Sync bumps a channel's data_version, so stale entries are never served
+and age out of the LRU. Bookmark and tag edits bump a separate
+annotation_version that only endpoints reading those fields include in
+their key. Endpoints whose window ends at "now" also key on the current
+time bucket, so their results roll forward. Concurrent misses for the
+same key share a single computation.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
+
+from app.config import get_settings
+from app.database import get_database
+
+settings = get_settings()
+
+
+def _freeze_params(params: Dict[str, Any]) -> Tuple:
+    return tuple(sorted(
+        (k, v.isoformat() if isinstance(v, datetime) else v)
+        for k, v in params.items()
+    ))
+
+
+class AnalyticsCacheService:
+    """LRU response cache with single-flight misses and hit/miss metrics."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.analytics_cache_max_entries
+        self.entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self.in_flight: Dict[Tuple, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_versions(self, channel_id: str, user_id: str) -> Optional[Tuple[int, int]]:
+        """(data_version, annotation_version) of a channel, or None when it doesn't exist."""
+        db = get_database()
+        channel = await db.channels.find_one(
+            {"channel_id": channel_id, "user_id": user_id},
+            {"data_version": 1, "annotation_version": 1}
+        )
+        if not channel:
+            return None
+        return channel.get('data_version', 0), channel.get('annotation_version', 0)
+
+    async def get_or_compute(
+        self,
+        endpoint: str,
+        channel_id: str,
+        user_id: Optional[str],
+        params: Dict[str, Any],
+        compute: Callable[[], Awaitable[Any]],
+        annotations: bool = False,
+        now_relative: bool = False
+    ) -> Any:
+        """
+        Return the cached result for the current data version, computing it on
+        a miss. Set annotations when the result reads bookmarks or tags, and
+        now_relative when its date window ends at the current time.
+        """
+        if not user_id:
+            return await compute()  # Versions are tracked per tenant
+
+        versions = await self.get_versions(channel_id, user_id)
+        if versions is None:
+            return await compute()
+
+        data_version, annotation_version = versions
+        key = (
+            endpoint, user_id, channel_id, _freeze_params(params), data_version,
+            annotation_version if annotations else None,
+            int(time.time() // settings.analytics_cache_now_bucket_seconds) if now_relative else None
+        )
+
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        # Another request is already computing this key
+        if key in self.in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(self.in_flight[key])
+
+        # The computation runs in its own task, so a leader that disconnects
+        # doesn't cancel it for the requests waiting on the same key
+        self.misses += 1
+        task = asyncio.ensure_future(self._compute_and_store(key, compute))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())  # Retrieve errors nobody awaited
+        self.in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute_and_store(self, key: Tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await compute()
+        finally:
+            self.in_flight.pop(key, None)
+
+        self.entries[key] = result
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+        return result
+
+    async def bump_annotation_version(self, channel_id: str, user_id: str):
+        """Mark a channel's bookmarks or tags as changed, invalidating results that read them."""
+        db = get_database()
+        await db.channels.update_one(
+            {"channel_id": channel_id, "user_id": user_id},
+            {"$inc": {"annotation_version": 1}}
+        )
+        self.invalidate(channel_id, user_id, annotations_only=True)
+
+    def invalidate(self, channel_id: str, user_id: Optional[str] = None, annotations_only: bool = False):
+        """Drop cached responses for a channel."""
+        stale = [
+            key for key in self.entries
+            if key[2] == channel_id and (user_id is None or key[1] == user_id)
+            and (not annotations_only or key[5] is not None)
+        ]
+        for key in stale:
+            del self.entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss metrics."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups * 100, 1) if lookups > 0 else 0,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "max_entries": self.max_entries
+        }
+
+
+# Singleton instance
+analytics_cache_service = AnalyticsCacheService()
@@ -1,7 +1,48 @@
+import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
+from zoneinfo import ZoneInfo
 
 from app.database import get_database
+from app.services.rollup_service import rollup_service
+from app.services.series_service import bucket_start
+from app.services.columnar_service import columnar_service
+from app.services.sketch_service import sketch_service, TDigest
+
+
+ENGAGEMENT_QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+ENGAGEMENT_EXECUTOR_DAYS = 90  # Longer ranges merge digests off the event loop
+SENTIMENTS = ("positive", "neutral", "negative")
+UTC = ZoneInfo("UTC")
+
+
+def _describe_digest(digest: TDigest) -> Dict[str, Any]:
+    """Count, quantiles and max of a digest."""
+    summary = {"count": digest.count}
+    for name, q in ENGAGEMENT_QUANTILES.items():
+        value = digest.quantile(q)
+        summary[name] = round(value, 1) if value is not None else None
+    summary["max"] = digest.max
+    return summary
+
+
+def _merge_engagement(daily: Dict[datetime, Dict[str, TDigest]], bucket: str):
+    """Merge daily digests into (overall, per bucket) digests, compressing each once."""
+    by_bucket: Dict[datetime, Dict[str, List[TDigest]]] = {}
+    for day, digests in daily.items():
+        bucket_digests = by_bucket.setdefault(bucket_start(day, bucket, UTC), {"likes": [], "replies": []})
+        for metric, digest in digests.items():
+            bucket_digests[metric].append(digest)
+    
+    merged = {
+        start: {metric: TDigest.merge_all(digests) for metric, digests in metrics.items()}
+        for start, metrics in by_bucket.items()
+    }
+    overall = {
+        metric: TDigest.merge_all(digests[metric] for digests in daily.values())
+        for metric in ("likes", "replies")
+    }
+    return overall, merged
 
 
 class AnalyticsService:
@@ -15,6 +56,18 @@ class AnalyticsService:
         date_to: Optional[datetime] = None
     ) -> Dict[str, Any]:
         """Get sentiment distribution for a channel."""
+        columns = await columnar_service.get_columns(channel_id, user_id)
+        if columns is not None:
+            return self._format_sentiment(columns.sentiment_counts(columns.date_mask(date_from, date_to)))
+        
+        if await rollup_service.is_ready(channel_id, user_id):
+            days = await rollup_service.get_daily(channel_id, user_id, date_from, date_to)
+            breakdown = {"positive": 0, "neutral": 0, "negative": 0}
+            for day in days:
+                for sentiment, count in day['sentiment'].items():
+                    breakdown[sentiment] = breakdown.get(sentiment, 0) + count
+            return self._format_sentiment(breakdown)
+        
         db = get_database()
         
         match_stage = {"channel_id": channel_id}
@@ -38,13 +91,16 @@ class AnalyticsService:
         results = await db.comments.aggregate(pipeline).to_list(None)
         
         breakdown = {"positive": 0, "neutral": 0, "negative": 0}
-        total = 0
         
         for result in results:
             sentiment = result['_id'] or 'neutral'
-            count = result['count']
-            breakdown[sentiment] = count
-            total += count
+            breakdown[sentiment] = breakdown.get(sentiment, 0) + result['count']
+        
+        return self._format_sentiment(breakdown)
+    
+    def _format_sentiment(self, breakdown: Dict[str, int]) -> Dict[str, Any]:
+        """Add totals and percentages to sentiment counts."""
+        total = sum(breakdown.values())
         
         # Calculate percentages
         percentages = {
@@ -66,6 +122,18 @@ class AnalyticsService:
         date_to: Optional[datetime] = None
     ) -> Dict[str, int]:
         """Get tag distribution for a channel."""
+        columns = await columnar_service.get_columns(channel_id, user_id)
+        if columns is not None:
+            return columns.tag_counts(columns.date_mask(date_from, date_to))
+        
+        if await rollup_service.is_ready(channel_id, user_id):
+            days = await rollup_service.get_daily(channel_id, user_id, date_from, date_to)
+            tag_counts: Dict[str, int] = {}
+            for day in days:
+                for tag, count in day['tags'].items():
+                    tag_counts[tag] = tag_counts.get(tag, 0) + count
+            return dict(sorted(tag_counts.items(), key=lambda item: item[1], reverse=True))
+        
         db = get_database()
         
         match_stage = {"channel_id": channel_id, "tags": {"$ne": []}}
@@ -96,17 +164,38 @@ class AnalyticsService:
         self,
         channel_id: str,
         days: int = 30,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
     ) -> List[Dict[str, Any]]:
-        """Get sentiment trends over time."""
-        db = get_database()
+        """Get sentiment trends over the last days, or over [date_from, date_to] when given."""
+        if date_from is None:
+            date_from = datetime.utcnow() - timedelta(days=days)
         
-        date_from = datetime.utcnow() - timedelta(days=days)
+        columns = await columnar_service.get_columns(channel_id, user_id)
+        if columns is not None:
+            return columns.daily_sentiment(columns.date_mask(date_from, date_to))
+        
+        if await rollup_service.is_ready(channel_id, user_id):
+            daily = await rollup_service.get_daily(channel_id, user_id, date_from, date_to)
+            return [
+                {
+                    "date": d['day'].strftime("%Y-%m-%d"),
+                    **{sentiment: d['sentiment'].get(sentiment, 0) for sentiment in ("positive", "neutral", "negative")},
+                    "total": d['comment_count']
+                }
+                for d in daily
+                if d['comment_count'] > 0
+            ]
+        
+        db = get_database()
         
         match_stage = {
             "channel_id": channel_id,
             "published_at": {"$gte": date_from}
         }
+        if date_to:
+            match_stage["published_at"]["$lte"] = date_to
         if user_id:
             match_stage["user_id"] = user_id
         
@@ -140,6 +229,131 @@ class AnalyticsService:
         
         return list(by_date.values())
     
+    async def get_unique_commenters(
+        self,
+        channel_id: str,
+        user_id: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> int:
+        """
+        Get distinct commenters in a date range. Exact from columns, otherwise
+        estimated from daily HyperLogLog sketches at day granularity.
+        """
+        columns = await columnar_service.get_columns(channel_id, user_id)
+        if columns is not None:
+            return columns.unique_commenters(columns.date_mask(date_from, date_to))
+        
+        if await sketch_service.is_ready(channel_id, user_id):
+            return await sketch_service.unique_commenters(channel_id, user_id, date_from, date_to)
+        
+        db = get_database()
+        
+        match_stage = {"channel_id": channel_id, "author_channel_id": {"$ne": None}}
+        if user_id:
+            match_stage["user_id"] = user_id
+        if date_from or date_to:
+            match_stage["published_at"] = {}
+            if date_from:
+                match_stage["published_at"]["$gte"] = date_from
+            if date_to:
+                match_stage["published_at"]["$lte"] = date_to
+        
+        pipeline = [
+            {"$match": match_stage},
+            {"$group": {"_id": "$author_channel_id"}},
+            {"$count": "count"}
+        ]
+        result = await db.comments.aggregate(pipeline, allowDiskUse=True).to_list(1)
+        return result[0]['count'] if result else 0
+    
+    async def get_commenter_trend(
+        self,
+        channel_id: str,
+        days: int = 30,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get estimated unique commenters per day and over the whole window."""
+        date_from = datetime.utcnow() - timedelta(days=days)
+        
+        if await sketch_service.is_ready(channel_id, user_id):
+            daily, total = await asyncio.gather(
+                sketch_service.daily_unique_commenters(channel_id, user_id, days),
+                sketch_service.unique_commenters(channel_id, user_id, date_from)
+            )
+            return {"days": days, "unique_commenters": total, "daily": daily}
+        
+        db = get_database()
+        
+        match_stage = {
+            "channel_id": channel_id,
+            "published_at": {"$gte": date_from},
+            "author_channel_id": {"$ne": None}
+        }
+        if user_id:
+            match_stage["user_id"] = user_id
+        
+        pipeline = [
+            {"$match": match_stage},
+            {
+                "$group": {
+                    "_id": {
+                        "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$published_at"}},
+                        "author": "$author_channel_id"
+                    }
+                }
+            },
+            {"$group": {"_id": "$_id.date", "unique_commenters": {"$sum": 1}}},
+            {"$sort": {"_id": 1}}
+        ]
+        
+        daily, total = await asyncio.gather(
+            db.comments.aggregate(pipeline, allowDiskUse=True).to_list(None),
+            self.get_unique_commenters(channel_id, user_id, date_from)
+        )
+        return {
+            "days": days,
+            "unique_commenters": total,
+            "daily": [{"date": d['_id'], "unique_commenters": d['unique_commenters']} for d in daily]
+        }
+    
+    async def get_engagement_distribution(
+        self,
+        channel_id: str,
+        days: int = 30,
+        user_id: Optional[str] = None,
+        video_id: Optional[str] = None,
+        bucket: str = "week"
+    ) -> Dict[str, Any]:
+        """
+        Get p50/p90/p99 of likes and replies per comment over the window and
+        per day/week/month bucket, merged from per (video, day) t-digests.
+        """
+        date_from = datetime.utcnow() - timedelta(days=days)
+        daily = await rollup_service.get_daily_digests(channel_id, user_id, date_from, video_id)
+        
+        if len(daily) > ENGAGEMENT_EXECUTOR_DAYS:
+            loop = asyncio.get_event_loop()
+            overall, by_bucket = await loop.run_in_executor(None, _merge_engagement, daily, bucket)
+        else:
+            overall, by_bucket = _merge_engagement(daily, bucket)
+        
+        return {
+            "days": days,
+            "bucket": bucket,
+            "video_id": video_id,
+            "likes": _describe_digest(overall["likes"]),
+            "replies": _describe_digest(overall["replies"]),
+            "series": [
+                {
+                    "date": start.strftime("%Y-%m-%d"),
+                    "likes": _describe_digest(digests["likes"]),
+                    "replies": _describe_digest(digests["replies"])
+                }
+                for start, digests in sorted(by_bucket.items())
+            ]
+        }
+    
     async def get_top_videos(
         self,
         channel_id: str,
@@ -147,6 +361,10 @@ class AnalyticsService:
         user_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Get top videos by comment count."""
+        columns = await columnar_service.get_columns(channel_id, user_id)
+        if columns is not None:
+            return await self._attach_video_details(columns.top_videos(limit), user_id)
+        
         db = get_database()
         
         match_stage = {"channel_id": channel_id}
@@ -172,17 +390,36 @@ class AnalyticsService:
         ]
         
         comment_stats = await db.comments.aggregate(pipeline).to_list(None)
+        for stat in comment_stats:
+            stat['video_id'] = stat.pop('_id')
+        
+        return await self._attach_video_details(comment_stats, user_id)
+    
+    async def _attach_video_details(
+        self,
+        comment_stats: List[Dict[str, Any]],
+        user_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Join per-video comment stats with video details, keeping their order."""
+        db = get_database()
+        
+        # Get video details in one query
+        video_query = {"video_id": {"$in": [stat['video_id'] for stat in comment_stats]}}
+        if user_id:
+            video_query["user_id"] = user_id
+        
+        videos = await db.videos.find(
+            video_query,
+            {"video_id": 1, "title": 1, "thumbnail_url": 1, "published_at": 1}
+        ).to_list(None)
+        videos_by_id = {v['video_id']: v for v in videos}
         
-        # Get video details
         result = []
         for stat in comment_stats:
-            video_query = {"video_id": stat['_id']}
-            if user_id:
-                video_query["user_id"] = user_id
-            video = await db.videos.find_one(video_query)
+            video = videos_by_id.get(stat['video_id'])
             if video:
                 result.append({
-                    "video_id": stat['_id'],
+                    "video_id": stat['video_id'],
                     "title": video.get('title'),
                     "thumbnail_url": video.get('thumbnail_url'),
                     "published_at": video.get('published_at'),
@@ -209,38 +446,212 @@ class AnalyticsService:
         if user_id:
             base_query["user_id"] = user_id
         
-        # Total comments
-        total_comments = await db.comments.count_documents(base_query)
+        week_ago = datetime.utcnow() - timedelta(days=7)
         
-        # Total videos
-        total_videos = await db.videos.count_documents(base_query)
+        columns = await columnar_service.get_columns(channel_id, user_id)
+        if columns is not None:
+            total_videos, bookmarked = await asyncio.gather(
+                db.videos.count_documents(base_query),
+                db.comments.count_documents({**base_query, "is_bookmarked": True})
+            )
+            return {
+                "total_comments": columns.count(),
+                "total_videos": total_videos,
+                "unique_commenters": columns.unique_commenters(),
+                "unique_commenters_7d": columns.unique_commenters(columns.date_mask(week_ago)),
+                "bookmarked_comments": bookmarked,
+                "sentiment": self._format_sentiment(columns.sentiment_counts()),
+                "recent_comments_7d": columns.count(columns.date_mask(week_ago))
+            }
         
-        # Unique commenters
-        unique_commenters = await db.commenters.count_documents(base_query)
+        # One pass over comments for every comment-derived figure
+        pipeline = [
+            {"$match": base_query},
+            {
+                "$facet": {
+                    "sentiment": [
+                        {"$group": {"_id": "$sentiment", "count": {"$sum": 1}}}
+                    ],
+                    "bookmarked": [
+                        {"$match": {"is_bookmarked": True}},
+                        {"$count": "count"}
+                    ],
+                    "recent": [
+                        {"$match": {"published_at": {"$gte": week_ago}}},
+                        {"$count": "count"}
+                    ]
+                }
+            }
+        ]
         
-        # Bookmarked comments
-        bookmarked = await db.comments.count_documents({
-            **base_query,
-            "is_bookmarked": True
-        })
+        facets, total_videos, unique_commenters, unique_commenters_7d = await asyncio.gather(
+            db.comments.aggregate(pipeline).to_list(1),
+            db.videos.count_documents(base_query),
+            db.commenters.count_documents(base_query),
+            self.get_unique_commenters(channel_id, user_id, week_ago)
+        )
+        facet = facets[0] if facets else {}
         
-        # Sentiment breakdown
-        sentiment = await self.get_sentiment_breakdown(channel_id, user_id)
+        breakdown = {"positive": 0, "neutral": 0, "negative": 0}
+        for result in facet.get('sentiment', []):
+            sentiment = result['_id'] or 'neutral'
+            breakdown[sentiment] = breakdown.get(sentiment, 0) + result['count']
+        sentiment = self._format_sentiment(breakdown)
         
-        # Recent activity (last 7 days)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_comments = await db.comments.count_documents({
-            **base_query,
-            "published_at": {"$gte": week_ago}
-        })
+        def facet_count(name: str) -> int:
+            return facet[name][0]['count'] if facet.get(name) else 0
         
         return {
-            "total_comments": total_comments,
+            "total_comments": sentiment['total'],
             "total_videos": total_videos,
             "unique_commenters": unique_commenters,
-            "bookmarked_comments": bookmarked,
+            "unique_commenters_7d": unique_commenters_7d,
+            "bookmarked_comments": facet_count('bookmarked'),
             "sentiment": sentiment,
-            "recent_comments_7d": recent_comments
+            "recent_comments_7d": facet_count('recent')
+        }
+    
+    async def compare_channels(
+        self,
+        channel_ids: List[str],
+        user_id: Optional[str] = None,
+        days: int = 30
+    ) -> Dict[str, Any]:
+        """
+        Get summary, sentiment, tags and a daily trend for several channels,
+        aligned on the same dates. Comment-derived figures come from one
+        grouped $facet over rollups (or comments while any channel lacks
+        rollups), alongside one grouped count each for videos and commenters.
+        Windowed figures cover whole UTC days.
+        """
+        db = get_database()
+        
+        channel_query = {"channel_id": {"$in": channel_ids}}
+        if user_id:
+            channel_query["user_id"] = user_id
+        channels = await db.channels.find(
+            channel_query,
+            {"channel_id": 1, "name": 1, "thumbnail_url": 1, "rollups_ready": 1}
+        ).to_list(None)
+        channels_by_id = {c['channel_id']: c for c in channels}
+        found_ids = [cid for cid in channel_ids if cid in channels_by_id]
+        
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        first_day = today - timedelta(days=days - 1)
+        base_query = {**channel_query, "channel_id": {"$in": found_ids}}
+        
+        # Normalize rollups or comments to rows of (channel, day, counts, tags)
+        if channels and all(c.get('rollups_ready') for c in channels):
+            collection = db.daily_rollups
+            rows = {
+                "channel_id": 1,
+                "day": 1,
+                **{s: f"$sentiment.{s}" for s in SENTIMENTS},
+                "tags": {"$objectToArray": {"$ifNull": ["$tags", {}]}}
+            }
+        else:
+            collection = db.comments
+            rows = {
+                "channel_id": 1,
+                "day": {
+                    "$dateFromParts": {
+                        "year": {"$year": "$published_at"},
+                        "month": {"$month": "$published_at"},
+                        "day": {"$dayOfMonth": "$published_at"}
+                    }
+                },
+                "positive": {"$cond": [{"$eq": ["$sentiment", "positive"]}, 1, 0]},
+                "neutral": {"$cond": [{"$in": ["$sentiment", ["positive", "negative"]]}, 0, 1]},
+                "negative": {"$cond": [{"$eq": ["$sentiment", "negative"]}, 1, 0]},
+                "tags": {
+                    "$map": {"input": {"$ifNull": ["$tags", []]}, "as": "tag", "in": {"k": "$$tag", "v": 1}}
+                }
+            }
+        
+        sentiment_sums = {s: {"$sum": f"${s}"} for s in SENTIMENTS}
+        in_window = {"$match": {"day": {"$gte": first_day}}}
+        pipeline = [
+            {"$match": base_query},
+            {"$project": rows},
+            {
+                "$facet": {
+                    "totals": [
+                        {"$group": {"_id": "$channel_id", **sentiment_sums}}
+                    ],
+                    "window": [
+                        in_window,
+                        {"$group": {"_id": {"channel_id": "$channel_id", "day": "$day"}, **sentiment_sums}}
+                    ],
+                    "tags": [
+                        in_window,
+                        {"$unwind": "$tags"},
+                        {"$group": {"_id": {"channel_id": "$channel_id", "tag": "$tags.k"}, "count": {"$sum": "$tags.v"}}}
+                    ]
+                }
+            }
+        ]
+        
+        def count_by_channel(collection_name: str):
+            return db[collection_name].aggregate([
+                {"$match": base_query},
+                {"$group": {"_id": "$channel_id", "count": {"$sum": 1}}}
+            ]).to_list(None)
+        
+        facets, video_counts, commenter_counts = await asyncio.gather(
+            collection.aggregate(pipeline, allowDiskUse=True).to_list(1),
+            count_by_channel("videos"),
+            count_by_channel("commenters")
+        )
+        facet = facets[0] if facets else {}
+        videos = {r['_id']: r['count'] for r in video_counts}
+        commenters = {r['_id']: r['count'] for r in commenter_counts}
+        totals = {r['_id']: {s: r[s] for s in SENTIMENTS} for r in facet.get('totals', [])}
+        
+        window: Dict[str, Dict[datetime, Dict[str, int]]] = {}
+        for r in facet.get('window', []):
+            window.setdefault(r['_id']['channel_id'], {})[r['_id']['day']] = {s: r[s] for s in SENTIMENTS}
+        
+        tags: Dict[str, Dict[str, int]] = {}
+        for r in facet.get('tags', []):
+            tags.setdefault(r['_id']['channel_id'], {})[r['_id']['tag']] = r['count']
+        
+        dates = [first_day + timedelta(days=i) for i in range(days)]
+        empty = {s: 0 for s in SENTIMENTS}
+        
+        result = []
+        for channel_id in found_ids:
+            channel = channels_by_id[channel_id]
+            all_time = self._format_sentiment(totals.get(channel_id, dict(empty)))
+            by_day = window.get(channel_id, {})
+            
+            windowed = dict(empty)
+            trend = []
+            for day in dates:
+                counts = by_day.get(day, empty)
+                for s in SENTIMENTS:
+                    windowed[s] += counts[s]
+                trend.append({"date": day.strftime("%Y-%m-%d"), **counts, "total": sum(counts.values())})
+            
+            result.append({
+                "channel_id": channel_id,
+                "name": channel.get('name'),
+                "thumbnail_url": channel.get('thumbnail_url'),
+                "summary": {
+                    "total_comments": all_time['total'],
+                    "total_videos": videos.get(channel_id, 0),
+                    "unique_commenters": commenters.get(channel_id, 0),
+                    "sentiment": all_time
+                },
+                "sentiment": self._format_sentiment(windowed),
+                "tags": dict(sorted(tags.get(channel_id, {}).items(), key=lambda item: item[1], reverse=True)),
+                "trend": trend
+            })
+        
+        return {
+            "days": days,
+            "dates": [day.strftime("%Y-%m-%d") for day in dates],
+            "channels": result,
+            "missing": [cid for cid in channel_ids if cid not in channels_by_id]
         }
 
 
@@ -0,0 +1,176 @@
+"""
+Streaming spike detection over hourly comment rollups.
+
+Every series (a channel, or one of its videos, for comment volume and
+negative comments) keeps an exponentially weighted mean and variance and
+the last hour it consumed, so detector state is O(1) per series. After a
+sync, each series folds in the complete hours since its last run, and
+hours whose z-score against the baseline crosses the threshold are stored
+as anomalies.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.config import get_settings
+from app.database import get_database
+from app.services.rollup_service import rollup_service
+
+settings = get_settings()
+
+METRICS = {"comments": "comment_count", "negative": "negative"}
+WARMUP_LOOKBACK_HOURS = 24 * 7  # History replayed for a series seen for the first time
+MAX_GAP_HOURS = 24 * 14  # After this long the baseline has decayed anyway
+
+
+def score_and_update(state: Dict[str, Any], value: float, alpha: float) -> float:
+    """Return the z-score of value against the state, then fold it in."""
+    # A Poisson floor on the deviation keeps sparse series from alerting on noise
+    deviation = math.sqrt(max(state['var'], state['mean'], 1.0))
+    z = (value - state['mean']) / deviation
+
+    diff = value - state['mean']
+    increment = alpha * diff
+    state['mean'] += increment
+    state['var'] = (1 - alpha) * (state['var'] + diff * increment)
+    state['n'] += 1
+    return z
+
+
+class AnomalyService:
+    """Service for detecting comment and negative-sentiment spikes."""
+
+    async def detect(
+        self,
+        channel_id: str,
+        user_id: str,
+        video_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Advance the channel series and the series of the given (and already
+        tracked) videos through the last complete hour. Returns anomalies
+        that were not recorded before.
+        """
+        db = get_database()
+        alpha = settings.anomaly_ewma_alpha
+
+        current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        earliest = current_hour - timedelta(hours=MAX_GAP_HOURS)
+
+        states: Dict[Tuple[Optional[str], str], Dict[str, Any]] = {}
+        async for doc in db.detector_state.find({"channel_id": channel_id, "user_id": user_id}):
+            states[(doc.get('video_id'), doc['metric'])] = doc
+
+        for video_id in [None, *(video_ids or [])]:
+            for metric in METRICS:
+                states.setdefault((video_id, metric), {
+                    "video_id": video_id,
+                    "metric": metric,
+                    "mean": 0.0,
+                    "var": 0.0,
+                    "n": 0,
+                    "last_hour": current_hour - timedelta(hours=WARMUP_LOOKBACK_HOURS + 1)
+                })
+
+        def next_hour(state: Dict[str, Any]) -> datetime:
+            return max(state['last_hour'] + timedelta(hours=1), earliest)
+
+        hour_from = min(next_hour(state) for state in states.values())
+        if hour_from >= current_hour:
+            return []
+
+        # One read of every hourly rollup needed by any series
+        values: Dict[Tuple[Optional[str], datetime], Dict[str, int]] = {}
+        for rollup in await rollup_service.get_hourly(channel_id, user_id, hour_from, current_hour):
+            for video_id in (rollup['video_id'], None):
+                counts = values.setdefault((video_id, rollup['hour']), {field: 0 for field in METRICS.values()})
+                for field in METRICS.values():
+                    counts[field] += rollup.get(field, 0)
+
+        anomalies = []
+        for (video_id, metric), state in states.items():
+            field = METRICS[metric]
+            hour = next_hour(state)
+            while hour < current_hour:
+                value = values.get((video_id, hour), {}).get(field, 0)
+                baseline = state['mean']
+                warmed_up = state['n'] >= settings.anomaly_warmup_hours
+                z = score_and_update(state, value, alpha)
+
+                if warmed_up and z >= settings.anomaly_z_threshold and value >= settings.anomaly_min_count:
+                    anomalies.append({
+                        "user_id": user_id,
+                        "channel_id": channel_id,
+                        "video_id": video_id,
+                        "metric": metric,
+                        "hour": hour,
+                        "value": value,
+                        "expected": round(baseline, 2),
+                        "zscore": round(z, 2)
+                    })
+                hour += timedelta(hours=1)
+            state['last_hour'] = current_hour - timedelta(hours=1)
+
+        await db.detector_state.bulk_write([
+            UpdateOne(
+                {"user_id": user_id, "channel_id": channel_id, "video_id": video_id, "metric": metric},
+                {"$set": {k: state[k] for k in ("mean", "var", "n", "last_hour")}},
+                upsert=True
+            )
+            for (video_id, metric), state in states.items()
+        ], ordered=False)
+
+        if not anomalies:
+            return []
+
+        now = datetime.utcnow()
+        result = await db.anomalies.bulk_write([
+            UpdateOne(
+                {k: a[k] for k in ("user_id", "channel_id", "video_id", "metric", "hour")},
+                {"$setOnInsert": {**a, "created_at": now}},
+                upsert=True
+            )
+            for a in anomalies
+        ], ordered=False)
+        new_anomalies = [anomalies[i] for i in sorted(result.upserted_ids)]
+
+        # Attach titles for alert messages
+        titled_ids = [a['video_id'] for a in new_anomalies if a['video_id']]
+        if titled_ids:
+            videos = await db.videos.find(
+                {"video_id": {"$in": titled_ids}, "user_id": user_id},
+                {"video_id": 1, "title": 1}
+            ).to_list(None)
+            titles = {v['video_id']: v.get('title') for v in videos}
+            for a in new_anomalies:
+                if a['video_id']:
+                    a['title'] = titles.get(a['video_id'])
+
+        return new_anomalies
+
+    async def get_alerts(
+        self,
+        channel_id: str,
+        user_id: Optional[str] = None,
+        video_id: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Get recorded anomalies for a channel, newest first."""
+        db = get_database()
+
+        query = {"channel_id": channel_id}
+        if user_id:
+            query["user_id"] = user_id
+        if video_id:
+            query["video_id"] = video_id
+
+        alerts = await db.anomalies.find(query).sort("hour", -1).limit(limit).to_list(limit)
+        for alert in alerts:
+            alert['_id'] = str(alert['_id'])
+        return alerts
+
+
+# Singleton instance
+anomaly_service = AnomalyService()
@@ -0,0 +1,95 @@
+"""
+In-memory cache of chat answers keyed by normalized question and the
+channel's data version, so repeated questions skip the LLM.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Words that never change what is being asked
+FILLER_WORDS = {"please", "pls", "hey", "hi", "hello", "um", "uh", "kindly"}
+TRAILING_PUNCTUATION = "?!.,;: "
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize spelling-level variation only: case, whitespace, trailing
+    punctuation and filler words. Word order and interrogatives are kept,
+    since "why do viewers like X" and "what do viewers like about X" differ.
+    """
+    words = question.lower().strip().rstrip(TRAILING_PUNCTUATION).split()
+    return " ".join(w for w in words if w.strip(",") not in FILLER_WORDS)
+
+
+class ChatCacheService:
+    """TTL + LRU cache for chat answers with hit statistics."""
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or settings.chat_cache_ttl_seconds
+        self.max_entries = max_entries or settings.chat_cache_max_entries
+        # (user_id, channel_id, data_version, question) -> (expires_at, answer)
+        self.entries: "OrderedDict[Tuple[str, str, Any, str], Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, channel_id: str, user_id: Optional[str], data_version: Any, question: str):
+        return (user_id or "", channel_id, data_version, normalize_question(question))
+
+    def get(self, channel_id: str, user_id: Optional[str], data_version: Any, question: str) -> Optional[str]:
+        """Return a cached answer, or None on a miss or expired entry."""
+        key = self._key(channel_id, user_id, data_version, question)
+        entry = self.entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, channel_id: str, user_id: Optional[str], data_version: Any, question: str, answer: str):
+        """Cache an answer, evicting the least recently used entries."""
+        if not normalize_question(question):
+            return  # Nothing meaningful to key on
+
+        key = self._key(channel_id, user_id, data_version, question)
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, answer)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, channel_id: str, user_id: Optional[str] = None):
+        """Drop all cached answers for a channel."""
+        stale = [
+            key for key in self.entries
+            if key[1] == channel_id and (user_id is None or key[0] == user_id)
+        ]
+        for key in stale:
+            del self.entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache hit statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups > 0 else 0,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+# Singleton instance
+chat_cache_service = ChatCacheService()
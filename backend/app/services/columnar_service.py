@@ -0,0 +1,288 @@
+"""
+In-process columnar cache of channel comments for hot channels.
+
+Comments are loaded lazily into NumPy arrays (published epoch, sentiment
+code, tag bitmask, likes, replies, video and author indexes) and kept
+under an LRU memory budget. Analytics answer from vectorized filters and
+bincounts instead of Mongo aggregations. Columns are tied to the channel
+data_version and annotation_version, so a sync or a tag edit makes them
+stale. Channels the columns can't represent (too many distinct tags,
+comments without a publish time) are remembered per version and keep
+using the rollup and aggregation paths.
+"""
+import asyncio
+import calendar
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+from app.database import get_database
+
+settings = get_settings()
+
+SENTIMENT_CODES = {"positive": 0, "neutral": 1, "negative": 2}
+SENTIMENT_NAMES = ["positive", "neutral", "negative"]
+MAX_TAGS = 64  # Width of the tag bitmask
+SECONDS_PER_DAY = 86400
+
+LOAD_FIELDS = ["published_at", "sentiment", "tags", "like_count", "reply_count", "video_id", "author_channel_id"]
+
+
+class UnsupportedChannel(ValueError):
+    """Raised for channels whose comments don't fit the column layout."""
+
+
+def to_epoch(dt: datetime) -> int:
+    """Convert a datetime (naive UTC or aware) to epoch seconds."""
+    return calendar.timegm(dt.utctimetuple())
+
+
+class ChannelColumns:
+    """Columnar snapshot of one channel's comments."""
+
+    def __init__(self, comments: List[Dict[str, Any]], version: Tuple[int, int]):
+        self.version = version  # (data_version, annotation_version)
+
+        video_index: Dict[str, int] = {}
+        author_index: Dict[str, int] = {}
+        tag_index: Dict[str, int] = {}
+
+        n = len(comments)
+        published = np.empty(n, dtype=np.int64)
+        sentiment = np.empty(n, dtype=np.int8)
+        tag_mask = np.zeros(n, dtype=np.uint64)
+        like_count = np.empty(n, dtype=np.int64)
+        reply_count = np.empty(n, dtype=np.int64)
+        video_idx = np.empty(n, dtype=np.int32)
+        author_idx = np.empty(n, dtype=np.int32)
+
+        for i, c in enumerate(comments):
+            if c.get('published_at') is None:
+                raise UnsupportedChannel("Comment without published_at")
+            published[i] = to_epoch(c['published_at'])
+            sentiment[i] = SENTIMENT_CODES.get(c.get('sentiment') or 'neutral', 1)
+            like_count[i] = c.get('like_count') or 0
+            reply_count[i] = c.get('reply_count') or 0
+            video_idx[i] = video_index.setdefault(c.get('video_id'), len(video_index))
+            author = c.get('author_channel_id')
+            author_idx[i] = author_index.setdefault(author, len(author_index)) if author else -1
+
+            mask = 0
+            for tag in c.get('tags') or []:
+                bit = tag_index.setdefault(tag, len(tag_index))
+                if bit >= MAX_TAGS:
+                    raise UnsupportedChannel(f"More than {MAX_TAGS} distinct tags")
+                mask |= 1 << bit
+            tag_mask[i] = mask
+
+        self.published = published
+        self.sentiment = sentiment
+        self.tag_mask = tag_mask
+        self.like_count = like_count
+        self.reply_count = reply_count
+        self.video_idx = video_idx
+        self.author_idx = author_idx
+        self.video_ids = list(video_index)
+        self.author_ids = list(author_index)
+        self.tag_names = list(tag_index)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.published, self.sentiment, self.tag_mask, self.like_count,
+                  self.reply_count, self.video_idx, self.author_idx)
+        # Rough allowance for the id vocabularies
+        return sum(a.nbytes for a in arrays) + 80 * (len(self.video_ids) + len(self.author_ids))
+
+    def __len__(self) -> int:
+        return len(self.published)
+
+    def date_mask(self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> Optional[np.ndarray]:
+        """Boolean row filter for published_at in [date_from, date_to], or None for all rows."""
+        mask = None
+        if date_from:
+            mask = self.published >= to_epoch(date_from)
+        if date_to:
+            upper = self.published <= to_epoch(date_to)
+            mask = upper if mask is None else mask & upper
+        return mask
+
+    def sentiment_counts(self, mask: Optional[np.ndarray] = None) -> Dict[str, int]:
+        codes = self.sentiment if mask is None else self.sentiment[mask]
+        counts = np.bincount(codes, minlength=3)
+        return {name: int(counts[i]) for i, name in enumerate(SENTIMENT_NAMES)}
+
+    def tag_counts(self, mask: Optional[np.ndarray] = None) -> Dict[str, int]:
+        masks = self.tag_mask if mask is None else self.tag_mask[mask]
+        counts = {}
+        for bit, name in enumerate(self.tag_names):
+            count = int(np.count_nonzero(masks & np.uint64(1 << bit)))
+            if count:
+                counts[name] = count
+        return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+    def daily_sentiment(self, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Per-UTC-day sentiment counts for days with comments."""
+        published = self.published if mask is None else self.published[mask]
+        codes = self.sentiment if mask is None else self.sentiment[mask]
+        if len(published) == 0:
+            return []
+
+        days = published // SECONDS_PER_DAY
+        first = days.min()
+        offsets = days - first
+        size = int(offsets.max()) + 1
+        # One bincount over (day, sentiment) pairs
+        counts = np.bincount(offsets * 3 + codes, minlength=size * 3).reshape(size, 3)
+
+        series = []
+        for offset in np.nonzero(counts.sum(axis=1))[0]:
+            row = counts[offset]
+            date = datetime.utcfromtimestamp(int(first + offset) * SECONDS_PER_DAY).strftime("%Y-%m-%d")
+            series.append({
+                "date": date,
+                "positive": int(row[0]),
+                "neutral": int(row[1]),
+                "negative": int(row[2]),
+                "total": int(row.sum())
+            })
+        return series
+
+    def top_videos(self, limit: int, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Videos with the most comments and their positive/negative counts."""
+        video_idx = self.video_idx if mask is None else self.video_idx[mask]
+        codes = self.sentiment if mask is None else self.sentiment[mask]
+        size = len(self.video_ids)
+
+        totals = np.bincount(video_idx, minlength=size)
+        positive = np.bincount(video_idx, weights=codes == 0, minlength=size)
+        negative = np.bincount(video_idx, weights=codes == 2, minlength=size)
+
+        top = np.argsort(-totals, kind="stable")[:limit]
+        return [
+            {
+                "video_id": self.video_ids[i],
+                "comment_count": int(totals[i]),
+                "positive_count": int(positive[i]),
+                "negative_count": int(negative[i])
+            }
+            for i in top
+            if totals[i] > 0
+        ]
+
+    def author_counts(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Comment count per author index."""
+        author_idx = self.author_idx if mask is None else self.author_idx[mask]
+        return np.bincount(author_idx[author_idx >= 0], minlength=len(self.author_ids))
+
+    def unique_commenters(self, mask: Optional[np.ndarray] = None) -> int:
+        return int(np.count_nonzero(self.author_counts(mask)))
+
+    def repeat_commenters(self, mask: Optional[np.ndarray] = None) -> int:
+        return int(np.count_nonzero(self.author_counts(mask) > 1))
+
+    def count(self, mask: Optional[np.ndarray] = None) -> int:
+        return len(self) if mask is None else int(np.count_nonzero(mask))
+
+
+class ColumnarService:
+    """LRU cache of channel columns under a memory budget."""
+
+    def __init__(self, memory_budget_mb: Optional[int] = None, hot_threshold: Optional[int] = None):
+        self.memory_budget = (memory_budget_mb or settings.columnar_memory_budget_mb) * 1024 * 1024
+        self.hot_threshold = hot_threshold or settings.columnar_hot_threshold
+        self.columns: "OrderedDict[Tuple[str, str], ChannelColumns]" = OrderedDict()
+        self.access_counts: Dict[Tuple[str, str], int] = {}
+        self._loading: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.unsupported: Dict[Tuple[str, str], Tuple[int, int]] = {}  # key -> version that failed to load
+        self.memory_used = 0
+
+    async def get_columns(self, channel_id: str, user_id: Optional[str]) -> Optional[ChannelColumns]:
+        """
+        Get current columns for a channel, or None if the channel is not hot
+        yet. Channels are loaded in the background once they have been
+        requested hot_threshold times.
+        """
+        if not user_id:
+            return None  # Columns are per tenant
+
+        db = get_database()
+        key = (user_id, channel_id)
+
+        channel = await db.channels.find_one(
+            {"channel_id": channel_id, "user_id": user_id},
+            {"data_version": 1, "annotation_version": 1}
+        )
+        if not channel:
+            return None
+        version = (channel.get('data_version', 0), channel.get('annotation_version', 0))
+
+        columns = self.columns.get(key)
+        if columns is not None and columns.version == version:
+            self.columns.move_to_end(key)
+            return columns
+        if columns is not None:
+            self.invalidate(channel_id, user_id)
+        if self.unsupported.get(key) == version:
+            return None
+
+        self.access_counts[key] = self.access_counts.get(key, 0) + 1
+        if self.access_counts[key] >= self.hot_threshold and key not in self._loading:
+            self._loading[key] = asyncio.create_task(self._load(channel_id, user_id, version))
+
+        return None
+
+    async def _load(self, channel_id: str, user_id: str, version: Tuple[int, int]):
+        """Load a channel's comments into columns and cache them."""
+        key = (user_id, channel_id)
+        db = get_database()
+
+        try:
+            projection = {field: 1 for field in LOAD_FIELDS}
+            projection["_id"] = 0
+            comments = await db.comments.find(
+                {"channel_id": channel_id, "user_id": user_id},
+                projection
+            ).batch_size(10000).to_list(None)
+
+            loop = asyncio.get_event_loop()
+            columns = await loop.run_in_executor(None, ChannelColumns, comments, version)
+
+            if columns.nbytes > self.memory_budget:
+                print(f"Columnar cache: {channel_id} exceeds memory budget, not cached")
+                return
+
+            self.invalidate(channel_id, user_id)
+            self.columns[key] = columns
+            self.memory_used += columns.nbytes
+            while self.memory_used > self.memory_budget:
+                _, evicted = self.columns.popitem(last=False)
+                self.memory_used -= evicted.nbytes
+        except UnsupportedChannel as e:
+            # Not retried until the data changes; analytics use rollups meanwhile
+            self.unsupported[key] = version
+            print(f"Columnar cache: {channel_id} not cached: {e}")
+        except Exception as e:
+            print(f"Columnar cache: failed to load {channel_id}: {e}")
+        finally:
+            self._loading.pop(key, None)
+            self.access_counts.pop(key, None)
+
+    def invalidate(self, channel_id: str, user_id: Optional[str] = None):
+        """Drop cached columns for a channel."""
+        for key in [k for k in self.columns if k[1] == channel_id and (user_id is None or k[0] == user_id)]:
+            self.memory_used -= self.columns.pop(key).nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "channels": len(self.columns),
+            "memory_used_mb": round(self.memory_used / 1024 / 1024, 2),
+            "memory_budget_mb": round(self.memory_budget / 1024 / 1024, 2),
+            "loading": len(self._loading)
+        }
+
+
+# Singleton instance
+columnar_service = ColumnarService()
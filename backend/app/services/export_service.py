@@ -0,0 +1,191 @@
+"""
+Streaming exports of comments as CSV, NDJSON or Parquet.
+
+Comments are read from a Motor cursor in fixed-size batches and each batch
+is encoded and yielded before the next is fetched, so memory stays bounded
+by the batch size however many comments a channel has. Output can be
+gzip-compressed on the fly.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Dict, Any, AsyncIterator, List
+
+from app.database import get_database
+
+EXPORT_BATCH_SIZE = 5000
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+EXPORT_FIELDS = [
+    "comment_id", "video_id", "author_name", "author_channel_id", "text",
+    "like_count", "reply_count", "published_at", "sentiment", "sentiment_score",
+    "tags", "is_bookmarked", "is_reply", "parent_id",
+]
+
+
+def _to_json_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the caller."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ExportService:
+    """Service for streaming comment exports."""
+
+    def parquet_available(self) -> bool:
+        try:
+            import pyarrow  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    async def iter_comment_batches(
+        self,
+        query: Dict[str, Any],
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield matching comments in batches, oldest first."""
+        db = get_database()
+
+        projection = {field: 1 for field in EXPORT_FIELDS}
+        projection["_id"] = 0
+        cursor = db.comments.find(query, projection).sort("published_at", 1).batch_size(batch_size)
+
+        batch = []
+        async for comment in cursor:
+            batch.append(comment)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def _encode_csv(self, batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        async for batch in batches:
+            for comment in batch:
+                row = []
+                for field in EXPORT_FIELDS:
+                    value = comment.get(field)
+                    if field == "tags":
+                        value = ";".join(value or [])
+                    row.append(_to_json_value(value) if value is not None else "")
+                writer.writerow(row)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    async def _encode_ndjson(self, batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+        async for batch in batches:
+            lines = [
+                json.dumps({field: _to_json_value(comment.get(field)) for field in EXPORT_FIELDS}, ensure_ascii=False)
+                for comment in batch
+            ]
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    async def _encode_parquet(self, batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("comment_id", pa.string()),
+            ("video_id", pa.string()),
+            ("author_name", pa.string()),
+            ("author_channel_id", pa.string()),
+            ("text", pa.string()),
+            ("like_count", pa.int64()),
+            ("reply_count", pa.int64()),
+            ("published_at", pa.timestamp("ms")),
+            ("sentiment", pa.string()),
+            ("sentiment_score", pa.float64()),
+            ("tags", pa.list_(pa.string())),
+            ("is_bookmarked", pa.bool_()),
+            ("is_reply", pa.bool_()),
+            ("parent_id", pa.string()),
+        ])
+
+        # One row group per batch, drained from the sink as it is written
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="snappy")
+        try:
+            async for batch in batches:
+                columns = {field: [comment.get(field) for comment in batch] for field in EXPORT_FIELDS}
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    async def stream_comments(
+        self,
+        query: Dict[str, Any],
+        export_format: str,
+        compress: bool = False
+    ) -> AsyncIterator[bytes]:
+        """Stream comments matching a query encoded in the given format."""
+        encoders = {
+            "csv": self._encode_csv,
+            "ndjson": self._encode_ndjson,
+            "parquet": self._encode_parquet,
+        }
+        chunks = encoders[export_format](self.iter_comment_batches(query))
+
+        if not compress:
+            async for chunk in chunks:
+                if chunk:
+                    yield chunk
+            return
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+        async for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    def filename(self, name: str, export_format: str, compress: bool) -> str:
+        extension = EXPORT_FORMATS[export_format][1]
+        return f"{name}.{extension}" + (".gz" if compress else "")
+
+    def media_type(self, export_format: str, compress: bool) -> str:
+        return "application/gzip" if compress else EXPORT_FORMATS[export_format][0]
+
+
+# Singleton instance
+export_service = ExportService()
@@ -1,5 +1,6 @@
 import json
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator
 import google.generativeai as genai
 
 from app.config import get_settings
@@ -9,6 +10,34 @@ settings = get_settings()
 # Configure Gemini
 genai.configure(api_key=settings.gemini_api_key)
 
+# Rough English average; good enough for packing prompts under a budget
+CHARS_PER_TOKEN = 4
+
+CHAT_ERROR_MESSAGE = "I apologize, but I encountered an error processing your question. Please try again."
+
+# Per-turn cap when replaying conversation memory into a prompt
+MEMORY_TURN_CHARS = 500
+
+ANALYSIS_TAGS = [
+    "viral_moment", "new_opportunity", "content_goldmine", "urgent_response",
+    "collaboration", "feedback", "question", "appreciation"
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a piece of text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def parse_json_response(result_text: str) -> Any:
+    """Parse a JSON model response, stripping markdown code fences."""
+    result_text = result_text.strip()
+    if result_text.startswith('```'):
+        result_text = result_text.split('```')[1]
+        if result_text.startswith('json'):
+            result_text = result_text[4:]
+    return json.loads(result_text)
+
 
 class GeminiService:
     """Service for AI-powered comment analysis using Gemini."""
@@ -52,59 +81,14 @@ Examples:
     async def analyze_batch_sentiment(
         self,
         comments: List[Dict[str, Any]],
-        batch_size: int = 20
+        token_budget: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """Analyze sentiment for a batch of comments."""
-        results = []
-        
-        for i in range(0, len(comments), batch_size):
-            batch = comments[i:i + batch_size]
-            batch_texts = [f"{j+1}. {c['text'][:200]}" for j, c in enumerate(batch)]
-            
-            prompt = f"""Analyze the sentiment of these YouTube comments.
-
-Comments:
-{chr(10).join(batch_texts)}
-
-Respond ONLY with a JSON array (no markdown, no code blocks):
-[{{"id": 1, "sentiment": "positive/neutral/negative", "score": -1.0 to 1.0}}, ...]"""
-
-            try:
-                response = self.model.generate_content(prompt)
-                result_text = response.text.strip()
-                
-                # Clean up response
-                if result_text.startswith('```'):
-                    result_text = result_text.split('```')[1]
-                    if result_text.startswith('json'):
-                        result_text = result_text[4:]
-                
-                batch_results = json.loads(result_text)
-                
-                for j, comment in enumerate(batch):
-                    if j < len(batch_results):
-                        results.append({
-                            'comment_id': comment['comment_id'],
-                            'sentiment': batch_results[j].get('sentiment', 'neutral'),
-                            'score': float(batch_results[j].get('score', 0.0))
-                        })
-                    else:
-                        results.append({
-                            'comment_id': comment['comment_id'],
-                            'sentiment': 'neutral',
-                            'score': 0.0
-                        })
-            except Exception as e:
-                print(f"Error in batch sentiment: {e}")
-                # Fill with neutral for failed batch
-                for comment in batch:
-                    results.append({
-                        'comment_id': comment['comment_id'],
-                        'sentiment': 'neutral',
-                        'score': 0.0
-                    })
-        
-        return results
+        results = await self.analyze_batch_comments(comments, token_budget)
+        return [
+            {'comment_id': r['comment_id'], 'sentiment': r['sentiment'], 'score': r['score']}
+            for r in results
+        ]
     
     async def generate_tags(self, text: str) -> List[str]:
         """Generate relevant tags for a comment."""
@@ -146,88 +130,218 @@ If no tags apply, respond with: []"""
     async def analyze_batch_tags(
         self,
         comments: List[Dict[str, Any]],
-        batch_size: int = 10
+        token_budget: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """Generate tags for a batch of comments."""
-        results = []
+        results = await self.analyze_batch_comments(comments, token_budget)
+        return [{'comment_id': r['comment_id'], 'tags': r['tags']} for r in results]
+    
+    async def analyze_batch_comments(
+        self,
+        comments: List[Dict[str, Any]],
+        token_budget: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze sentiment and tags for comments in a single call per batch.
+        Batches are packed by estimated token length and sent concurrently;
+        results are matched back by comment_id, in input order.
+        """
+        budget = token_budget or settings.gemini_batch_token_budget
+        batches = self._pack_batches(comments, budget)
+        semaphore = asyncio.Semaphore(settings.gemini_max_concurrency)
         
-        for i in range(0, len(comments), batch_size):
-            batch = comments[i:i + batch_size]
-            batch_texts = [f"{j+1}. {c['text'][:200]}" for j, c in enumerate(batch)]
-            
-            prompt = f"""Analyze these YouTube comments and assign relevant tags to each.
+        async def run(batch: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            async with semaphore:
+                return await self._analyze_combined_batch(batch, budget)
+        
+        batch_maps = await asyncio.gather(*[run(batch) for batch in batches])
+        
+        analysis_map = {}
+        for batch_map in batch_maps:
+            analysis_map.update(batch_map)
+        
+        return [
+            {
+                'comment_id': c['comment_id'],
+                **analysis_map.get(c['comment_id'], {'sentiment': 'neutral', 'score': 0.0, 'tags': []})
+            }
+            for c in comments
+        ]
+    
+    def _pack_batches(
+        self,
+        comments: List[Dict[str, Any]],
+        token_budget: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Greedily pack comments into batches that fit the token budget."""
+        batches = []
+        current = []
+        current_tokens = 0
+        
+        for comment in comments:
+            tokens = min(estimate_tokens(comment['text']), token_budget)
+            if current and current_tokens + tokens > token_budget:
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(comment)
+            current_tokens += tokens
+        
+        if current:
+            batches.append(current)
+        
+        return batches
+    
+    async def _analyze_combined_batch(
+        self,
+        batch: List[Dict[str, Any]],
+        token_budget: int
+    ) -> Dict[str, Dict[str, Any]]:
+        """Run one combined sentiment + tags prompt. Returns comment_id -> analysis."""
+        # Only a comment that alone exceeds the budget gets cut
+        max_chars = token_budget * CHARS_PER_TOKEN
+        batch_items = [
+            json.dumps({"id": c['comment_id'], "text": c['text'][:max_chars]}, ensure_ascii=False)
+            for c in batch
+        ]
+        
+        prompt = f"""Analyze these YouTube comments. For each one, classify the sentiment and assign relevant tags.
 
-Comments:
-{chr(10).join(batch_texts)}
+Available tags: {", ".join(ANALYSIS_TAGS)}
 
-Available tags: viral_moment, new_opportunity, content_goldmine, urgent_response, collaboration, feedback, question, appreciation
+Comments (one JSON object per line):
+{chr(10).join(batch_items)}
 
-Respond ONLY with a JSON array (no markdown):
-[{{"id": 1, "tags": ["tag1", "tag2"]}}, ...]
+Respond ONLY with a JSON array (no markdown, no code blocks), one entry per comment, echoing its id:
+[{{"id": "<comment id>", "sentiment": "positive/neutral/negative", "score": -1.0 to 1.0, "tags": ["tag1"]}}, ...]
 
 Assign [] if no tags apply."""
 
+        try:
+            response = await self.model.generate_content_async(prompt)
+            batch_results = parse_json_response(response.text)
+        except Exception as e:
+            print(f"Error in combined batch analysis: {e}")
+            return {}
+        
+        if not isinstance(batch_results, list):
+            return {}
+        
+        analysis_map = {}
+        for item in batch_results:
+            if not isinstance(item, dict) or 'id' not in item:
+                continue
             try:
-                response = self.model.generate_content(prompt)
-                result_text = response.text.strip()
-                
-                # Clean up response
-                if result_text.startswith('```'):
-                    result_text = result_text.split('```')[1]
-                    if result_text.startswith('json'):
-                        result_text = result_text[4:]
-                
-                batch_results = json.loads(result_text)
-                
-                for j, comment in enumerate(batch):
-                    if j < len(batch_results):
-                        results.append({
-                            'comment_id': comment['comment_id'],
-                            'tags': batch_results[j].get('tags', [])
-                        })
-                    else:
-                        results.append({
-                            'comment_id': comment['comment_id'],
-                            'tags': []
-                        })
-            except Exception as e:
-                print(f"Error in batch tags: {e}")
-                for comment in batch:
-                    results.append({
-                        'comment_id': comment['comment_id'],
-                        'tags': []
-                    })
+                score = float(item.get('score', 0.0))
+            except (TypeError, ValueError):
+                score = 0.0
+            sentiment = item.get('sentiment', 'neutral')
+            tags = item.get('tags', [])
+            analysis_map[str(item['id'])] = {
+                'sentiment': sentiment if sentiment in ('positive', 'neutral', 'negative') else 'neutral',
+                'score': score,
+                'tags': [t for t in tags if t in ANALYSIS_TAGS] if isinstance(tags, list) else []
+            }
         
-        return results
+        return analysis_map
     
-    async def chat_with_comments(
+    def _build_chat_prompt(
         self,
         question: str,
         comments_context: List[Dict[str, Any]],
-        channel_name: str
+        channel_name: str,
+        memory: Optional[Dict[str, Any]] = None
     ) -> str:
-        """Answer questions about comments using AI."""
-        # Prepare context
+        """Build the chat prompt from the question, selected comments and conversation memory."""
+        # Context is already selected within the token budget by the caller
         comments_text = "\n".join([
-            f"- {c['text'][:150]} (sentiment: {c.get('sentiment', 'unknown')}, likes: {c.get('like_count', 0)})"
-            for c in comments_context[:50]  # Limit context
+            f"- {c['text']} (sentiment: {c.get('sentiment', 'unknown')}, likes: {c.get('like_count', 0)})"
+            for c in comments_context
         ])
         
-        prompt = f"""You are an AI assistant helping analyze YouTube comments for the channel "{channel_name}".
+        conversation_text = ""
+        if memory and (memory.get('summary') or memory.get('recent')):
+            parts = []
+            if memory.get('summary'):
+                parts.append(f"Summary of earlier conversation: {memory['summary']}")
+            for turn in memory.get('recent', []):
+                parts.append(f"User: {turn['user_message'][:MEMORY_TURN_CHARS]}")
+                parts.append(f"Assistant: {turn['ai_response'][:MEMORY_TURN_CHARS]}")
+            conversation_text = "\nConversation so far:\n" + "\n".join(parts) + "\n"
+        
+        return f"""You are an AI assistant helping analyze YouTube comments for the channel "{channel_name}".
 
-Here are some recent comments:
+Here are the comments most relevant to the question:
 {comments_text}
-
+{conversation_text}
 User question: {question}
 
 Provide a helpful, concise answer based on the comments. If the question cannot be answered from the available data, say so politely."""
+    
+    async def chat_with_comments(
+        self,
+        question: str,
+        comments_context: List[Dict[str, Any]],
+        channel_name: str,
+        memory: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Answer questions about comments using AI."""
+        prompt = self._build_chat_prompt(question, comments_context, channel_name, memory)
 
         try:
             response = self.model.generate_content(prompt)
             return response.text.strip()
         except Exception as e:
             print(f"Error in chat: {e}")
-            return "I apologize, but I encountered an error processing your question. Please try again."
+            return CHAT_ERROR_MESSAGE
+    
+    async def stream_chat_with_comments(
+        self,
+        question: str,
+        comments_context: List[Dict[str, Any]],
+        channel_name: str,
+        memory: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Answer questions about comments, yielding text chunks as they arrive."""
+        prompt = self._build_chat_prompt(question, comments_context, channel_name, memory)
+
+        try:
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            print(f"Error in streaming chat: {e}")
+            yield CHAT_ERROR_MESSAGE
+    
+    async def summarize_conversation(
+        self,
+        previous_summary: str,
+        turns: List[Dict[str, Any]],
+        max_chars: int
+    ) -> Optional[str]:
+        """Fold chat turns into a rolling summary. Returns None on failure."""
+        turns_text = "\n".join([
+            f"User: {t['user_message'][:MEMORY_TURN_CHARS]}\nAssistant: {t['ai_response'][:MEMORY_TURN_CHARS]}"
+            for t in turns
+        ])
+        
+        prompt = f"""Update the running summary of a conversation between a YouTube creator and an assistant analyzing their comments.
+
+Current summary:
+{previous_summary or "(none)"}
+
+New turns:
+{turns_text}
+
+Write the updated summary in under {max_chars // 6} words. Keep the questions asked, key findings and numbers, and anything the creator said they care about. Respond with the summary text only."""
+
+        try:
+            response = await self.model.generate_content_async(prompt)
+            return response.text.strip()[:max_chars]
+        except Exception as e:
+            print(f"Error summarizing conversation: {e}")
+            return None
 
 
 # Singleton instance
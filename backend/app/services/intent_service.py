@@ -0,0 +1,243 @@
+"""
+Local intent router for chat. Recognizes analytic questions that can be
+answered exactly from aggregates and formats the answer without the LLM.
+Open-ended questions fall through to Gemini.
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Callable, Awaitable, List, Tuple
+
+from app.services.analytics_service import analytics_service
+
+SENTIMENTS = ("positive", "neutral", "negative")
+
+# Open-ended phrasing that needs reading the comments, not counting them
+OPEN_ENDED = re.compile(r"\b(why|what do|what are people|suggest|ideas?|summar|explain|complain|think|feel about|want)\b")
+
+# Every word the intents understand. Any other word ("mention", "about", a topic or a
+# video title) qualifies the question beyond what the aggregates answer, so it falls through
+ANSWERABLE_WORDS = set("""
+    how many much what what's whats which who is are was were be been do does did have has had
+    get got receive received left posted show tell give list me us i we you my our your it its
+    the a an of in on over for by to so far all overall total altogether ever time times channel
+    comment comments commenter commenters commented viewers people unique distinct
+    positive neutral negative sentiment mood percent percentage share ratio breakdown
+    distribution split trend changed change daily per top most highest best popular common
+    tag tags video videos discussed last past previous this today yesterday hour hours day days
+    week weeks month months year years please
+""".split())
+
+WINDOW_UNITS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "thirty": 30, "few": 3,
+}
+
+
+def _parse_number(token: Optional[str], default: int) -> int:
+    if not token:
+        return default
+    if token.isdigit():
+        return int(token)
+    return NUMBER_WORDS.get(token, default)
+
+
+@dataclass
+class Window:
+    """The period a question asks about; no bounds means all time."""
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    label: str = "in total"
+
+    @property
+    def days(self) -> Optional[int]:
+        if self.date_from is None:
+            return None
+        return max(((self.date_to or datetime.utcnow()) - self.date_from).days + 1, 1)
+
+
+def parse_window(question: str, now: Optional[datetime] = None) -> Window:
+    """
+    Extract the period a question asks about. Calendar phrases (today,
+    yesterday, this week/month/year) get calendar bounds in UTC; "last N
+    days/weeks/..." is a rolling window ending now.
+    """
+    now = now or datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if re.search(r"\blast 24 hours\b", question):
+        return Window(now - timedelta(days=1), None, "in the last 24 hours")
+    if re.search(r"\btoday\b", question):
+        return Window(today, None, "today (UTC)")
+    if re.search(r"\byesterday\b", question):
+        return Window(today - timedelta(days=1), today - timedelta(microseconds=1), "yesterday (UTC)")
+
+    match = re.search(r"\b(?:last|past|previous)\s+(\d+|[a-z]+)?\s*(day|week|month|year)s?\b", question)
+    if match:
+        days = _parse_number(match.group(1), 1) * WINDOW_UNITS[match.group(2)]
+        label = "in the last 24 hours" if days == 1 else f"in the last {days} days"
+        return Window(now - timedelta(days=days), None, label)
+
+    match = re.search(r"\bthis\s+(week|month|year)\b", question)
+    if match:
+        unit = match.group(1)
+        if unit == "week":
+            start = today - timedelta(days=today.weekday())
+        elif unit == "month":
+            start = today.replace(day=1)
+        else:
+            start = today.replace(month=1, day=1)
+        return Window(start, None, f"this {unit} (UTC)")
+
+    return Window()
+
+
+def has_unanswerable_words(question: str) -> bool:
+    """Whether the question contains words beyond what the aggregate intents understand."""
+    return any(
+        word not in ANSWERABLE_WORDS and word not in NUMBER_WORDS and not word.isdigit()
+        for word in re.findall(r"[a-z0-9']+", question)
+    )
+
+
+class IntentService:
+    """Routes analytic chat questions to AnalyticsService."""
+
+    def __init__(self):
+        # (pattern, handler) pairs, tried in order
+        self.intents: List[Tuple[re.Pattern, Callable[..., Awaitable[str]]]] = [
+            (re.compile(r"\b(which|what|top|most)\b.*\bvideos?\b.*\b(most|top|highest|best)\b.*\bcomments?\b"
+                        r"|\b(most|top)\b.*\b(commented|discussed)\b.*\bvideos?\b"
+                        r"|\btop\s+(\d+\s+|[a-z]+\s+)?videos?\b"), self._top_videos),
+            (re.compile(r"\bhow many\b.*\b(positive|neutral|negative)\b.*\bcomments?\b"
+                        r"|\b(percent|percentage|share|ratio)\b.*\b(positive|neutral|negative)\b"),
+             self._sentiment_count),
+            (re.compile(r"\bsentiment\b.*\b(trend|over time|changed?|daily|per day|by day)\b"
+                        r"|\b(trend|over time)\b.*\bsentiment\b"), self._sentiment_trend),
+            (re.compile(r"\b(sentiment|mood)\b.*\b(breakdown|distribution|split|overall)\b"
+                        r"|\boverall\s+(sentiment|mood)\b"), self._sentiment_breakdown),
+            (re.compile(r"\b(most common|top|popular)\b.*\btags?\b|\btags?\b.*\b(breakdown|distribution)\b"),
+             self._tag_breakdown),
+            (re.compile(r"\bhow many\b.*\b(unique\s+)?(commenters|viewers|people)\b.*\bcommented\b"
+                        r"|\bhow many\b.*\b(unique|distinct)\s+commenters\b"), self._commenters),
+            (re.compile(r"\bhow many\b.*\bcomments?\b"), self._comment_count),
+        ]
+
+    async def answer(self, question: str, channel_id: str, user_id: Optional[str] = None) -> Optional[str]:
+        """Answer the question from aggregates, or return None to fall through to the LLM."""
+        normalized = " ".join(question.lower().split())
+        if OPEN_ENDED.search(normalized) or has_unanswerable_words(normalized):
+            return None
+
+        for pattern, handler in self.intents:
+            match = pattern.search(normalized)
+            if match:
+                try:
+                    return await handler(normalized, match, channel_id, user_id)
+                except Exception as e:
+                    print(f"Intent routing failed, falling back to LLM: {e}")
+                    return None
+
+        return None
+
+    async def _top_videos(self, question: str, match: re.Match, channel_id: str, user_id: Optional[str]) -> str:
+        limit_match = re.search(r"\btop\s+(\d+|[a-z]+)\s+videos?\b", question)
+        limit = min(_parse_number(limit_match.group(1) if limit_match else None, 1), 10)
+
+        videos = await analytics_service.get_top_videos(channel_id, limit, user_id)
+        if not videos:
+            return "There are no analyzed videos for this channel yet."
+
+        if limit == 1:
+            v = videos[0]
+            return (
+                f"\"{v['title']}\" has the most comments: {v['comment_count']} "
+                f"({v['sentiment_ratio']}% positive, {v['negative_count']} negative)."
+            )
+
+        lines = [f"Top {len(videos)} videos by comment count:"]
+        for i, v in enumerate(videos, 1):
+            lines.append(f"{i}. \"{v['title']}\" - {v['comment_count']} comments ({v['sentiment_ratio']}% positive)")
+        return "\n".join(lines)
+
+    async def _sentiment_count(self, question: str, match: re.Match, channel_id: str, user_id: Optional[str]) -> str:
+        sentiment = next(s for s in SENTIMENTS if s in match.group(0))
+        window = parse_window(question)
+
+        result = await analytics_service.get_sentiment_breakdown(channel_id, user_id, window.date_from, window.date_to)
+        count = result['breakdown'].get(sentiment, 0)
+        return (
+            f"There were {count} {sentiment} comments {window.label}, "
+            f"{result['percentages'].get(sentiment, 0)}% of {result['total']} comments."
+        )
+
+    async def _sentiment_breakdown(self, question: str, match: re.Match, channel_id: str, user_id: Optional[str]) -> str:
+        window = parse_window(question)
+
+        result = await analytics_service.get_sentiment_breakdown(channel_id, user_id, window.date_from, window.date_to)
+        if result['total'] == 0:
+            return f"There are no comments {window.label}."
+
+        parts = [f"{result['breakdown'][s]} {s} ({result['percentages'][s]}%)" for s in SENTIMENTS]
+        return f"Sentiment of {result['total']} comments {window.label}: " + ", ".join(parts) + "."
+
+    async def _sentiment_trend(self, question: str, match: re.Match, channel_id: str, user_id: Optional[str]) -> str:
+        window = parse_window(question)
+        if window.date_from is None:
+            window = Window(datetime.utcnow() - timedelta(days=30), None, "in the last 30 days")
+        elif window.days > 365:
+            window = Window(datetime.utcnow() - timedelta(days=365), None, "in the last 365 days")
+
+        series = await analytics_service.get_sentiment_over_time(
+            channel_id, user_id=user_id, date_from=window.date_from, date_to=window.date_to
+        )
+        if not series:
+            return f"There are no comments {window.label}."
+
+        def positive_share(points: List[Dict[str, Any]]) -> float:
+            total = sum(p['total'] for p in points)
+            return round(sum(p['positive'] for p in points) / total * 100, 1) if total else 0
+
+        half = len(series) // 2
+        earlier, later = series[:half], series[half:]
+        busiest = max(series, key=lambda p: p['total'])
+        most_negative = max(series, key=lambda p: p['negative'])
+
+        lines = [f"Sentiment {window.label} across {len(series)} active days:"]
+        if earlier:
+            lines.append(f"- Positive share moved from {positive_share(earlier)}% to {positive_share(later)}%.")
+        lines.append(f"- Busiest day: {busiest['date']} with {busiest['total']} comments.")
+        if most_negative['negative']:
+            lines.append(f"- Most negative day: {most_negative['date']} with {most_negative['negative']} negative comments.")
+        return "\n".join(lines)
+
+    async def _tag_breakdown(self, question: str, match: re.Match, channel_id: str, user_id: Optional[str]) -> str:
+        window = parse_window(question)
+
+        tags = await analytics_service.get_tag_breakdown(channel_id, user_id, window.date_from, window.date_to)
+        if not tags:
+            return f"No comments were tagged {window.label}."
+
+        top = list(tags.items())[:5]
+        return f"Most common tags {window.label}: " + ", ".join(f"{t} ({c})" for t, c in top) + "."
+
+    async def _commenters(self, question: str, match: re.Match, channel_id: str, user_id: Optional[str]) -> Optional[str]:
+        window = parse_window(question)
+        if window.date_from is None:
+            summary = await analytics_service.get_channel_summary(channel_id, user_id)
+            return f"{summary['unique_commenters']} unique people have commented on this channel."
+
+        count = await analytics_service.get_unique_commenters(channel_id, user_id, window.date_from, window.date_to)
+        return f"About {count} unique people commented {window.label}."
+
+    async def _comment_count(self, question: str, match: re.Match, channel_id: str, user_id: Optional[str]) -> str:
+        window = parse_window(question)
+
+        result = await analytics_service.get_sentiment_breakdown(channel_id, user_id, window.date_from, window.date_to)
+        return f"There were {result['total']} comments {window.label}."
+
+
+# Singleton instance
+intent_service = IntentService()
@@ -0,0 +1,116 @@
+"""
+Rolling conversation memory for chat. Recent turns are kept verbatim and
+older turns are folded into a summary stored in chat_history, so prompt
+size stays bounded however long the conversation runs.
+"""
+import re
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from app.config import get_settings
+from app.database import get_database
+from app.services.gemini_service import gemini_service
+
+settings = get_settings()
+
+# Openers that only make sense in light of earlier turns: ellipses ("what about
+# last week?"), a leading pronoun ("those are mostly positive?", "is it
+# positive?") or a short question about a pronoun ("why is that?")
+FOLLOW_UP_PATTERN = re.compile(
+    r"^(and|but|also|what about|how about|same for|what else)\b"
+    r"|^((is|are|was|were|do|does|did) )?(it|that|those|these|they|them|this one|the first one|the last one)\b"
+    r"|^(why|how|what|is|are|was|were|do|does|did)( \w+)? (it|that|those|these|they|them)\W*$"
+)
+
+
+def is_follow_up(question: str) -> bool:
+    """Guess whether a question depends on earlier turns."""
+    normalized = " ".join(question.lower().split())
+    return bool(FOLLOW_UP_PATTERN.search(normalized))
+
+
+class MemoryService:
+    """Service for per-channel, per-user conversation memory."""
+
+    def _query(self, channel_id: str, user_id: Optional[str]) -> Dict[str, Any]:
+        query = {"channel_id": channel_id}
+        if user_id:
+            query["user_id"] = user_id
+        return query
+
+    async def get_memory(self, channel_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get the rolling summary and the recent verbatim turns."""
+        db = get_database()
+        query = self._query(channel_id, user_id)
+
+        summary_doc = await db.chat_history.find_one({**query, "type": "summary"})
+
+        turns_query = {**query, "type": {"$ne": "summary"}}
+        if summary_doc:
+            turns_query["created_at"] = {"$gt": summary_doc['summarized_until']}
+
+        # Capped at the compaction threshold in case compaction has been failing
+        limit = settings.chat_memory_compact_after
+        recent = await db.chat_history.find(turns_query).sort(
+            "created_at", -1
+        ).limit(limit).to_list(limit)
+        recent.reverse()
+
+        return {
+            "summary": summary_doc['summary'] if summary_doc else "",
+            "recent": [
+                {"user_message": t['user_message'], "ai_response": t['ai_response']}
+                for t in recent
+            ]
+        }
+
+    async def compact(self, channel_id: str, user_id: Optional[str] = None):
+        """
+        Fold turns older than the recent window into the rolling summary.
+        Runs once enough unsummarized turns have built up.
+        """
+        db = get_database()
+        query = self._query(channel_id, user_id)
+
+        summary_doc = await db.chat_history.find_one({**query, "type": "summary"})
+
+        turns_query = {**query, "type": {"$ne": "summary"}}
+        if summary_doc:
+            turns_query["created_at"] = {"$gt": summary_doc['summarized_until']}
+
+        pending = await db.chat_history.count_documents(turns_query)
+        if pending < settings.chat_memory_compact_after:
+            return
+
+        fold_count = pending - settings.chat_memory_recent_turns
+        to_fold = await db.chat_history.find(turns_query).sort(
+            "created_at", 1
+        ).limit(fold_count).to_list(fold_count)
+        if not to_fold:
+            return
+
+        summary = await gemini_service.summarize_conversation(
+            summary_doc['summary'] if summary_doc else "",
+            to_fold,
+            settings.chat_memory_summary_chars
+        )
+        if summary is None:
+            return  # Try again after the next turn
+
+        await db.chat_history.update_one(
+            {**query, "type": "summary"},
+            {
+                "$set": {
+                    "summary": summary,
+                    "summarized_until": to_fold[-1]['created_at'],
+                    "updated_at": datetime.utcnow()
+                },
+                "$inc": {"turns_summarized": len(to_fold)},
+                "$setOnInsert": {"created_at": datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+
+# Singleton instance
+memory_service = MemoryService()
@@ -0,0 +1,93 @@
+"""
+Keyset pagination over (published_at, _id), newest first.
+
+Cursors are opaque tokens holding the sort key of the last item of a page.
+The next page seeks directly past it through a compound index, so page
+1000 costs the same as page 1. Totals are optional: exact, capped (an
+approximate lower bound that stops counting at a limit), or skipped.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+TOTAL_MODES = ("exact", "approximate", "none")
+APPROXIMATE_TOTAL_CAP = 10000
+KEYSET_SORT = [("published_at", -1), ("_id", -1)]
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursor tokens that cannot be decoded."""
+
+
+class PaginationService:
+    """Service for cursor-paginated listings."""
+
+    def encode_cursor(self, doc: Dict[str, Any]) -> str:
+        payload = {"p": doc['published_at'].isoformat(), "i": str(doc['_id'])}
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> Tuple[datetime, ObjectId]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(payload['p']), ObjectId(payload['i'])
+        except Exception:
+            raise InvalidCursor("Invalid cursor")
+
+    def after(self, query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+        """Restrict a query to documents sorted after the cursor."""
+        if not cursor:
+            return query
+
+        published_at, last_id = self.decode_cursor(cursor)
+        seek = {
+            "$or": [
+                {"published_at": {"$lt": published_at}},
+                {"published_at": published_at, "_id": {"$lt": last_id}}
+            ]
+        }
+        return {"$and": [query, seek]}
+
+    async def count(
+        self,
+        collection: AsyncIOMotorCollection,
+        query: Dict[str, Any],
+        total_mode: str
+    ) -> Tuple[Optional[int], bool]:
+        """Count matches per total_mode. Returns (total, whether it is a lower bound)."""
+        if total_mode == "none":
+            return None, False
+        if total_mode == "approximate":
+            total = await collection.count_documents(query, limit=APPROXIMATE_TOTAL_CAP)
+            return total, total >= APPROXIMATE_TOTAL_CAP
+        return await collection.count_documents(query), False
+
+    async def fetch_page(
+        self,
+        collection: AsyncIOMotorCollection,
+        query: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page newest first, seeking past the cursor (or skipping, for
+        legacy page numbers). Returns the items and the next page's cursor.
+        """
+        find = collection.find(self.after(query, cursor), projection).sort(KEYSET_SORT)
+        if skip:
+            find = find.skip(skip)
+        docs = await find.limit(limit + 1).to_list(limit + 1)
+
+        items = docs[:limit]
+        next_cursor = self.encode_cursor(items[-1]) if len(docs) > limit else None
+        return items, next_cursor
+
+
+# Singleton instance
+pagination_service = PaginationService()
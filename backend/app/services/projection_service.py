@@ -0,0 +1,79 @@
+"""
+Field selection for slim comment listings.
+
+A listing returns full documents, the compact table view, or an explicit
+comma-separated fields= selection. Selections become a Mongo projection
+that always keeps the keyset sort keys, so cursors still work. Computed
+fields are not stored; selecting one reads the fields it is derived from.
+"""
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from app.models import CommentResponse, CommentCompact
+
+# Fields a fields= selection may name; computed ones are filled in after the query
+COMMENT_FIELDS = [name for name in CommentResponse.model_fields if name != "id"]
+COMPACT_COMMENT_FIELDS = [name for name in CommentCompact.model_fields if name != "id"]
+COMPUTED_COMMENT_FIELDS = {"video_title", "search_score", "highlights"}
+
+
+class InvalidFields(ValueError):
+    """Raised for field selections naming unknown fields."""
+
+
+class ProjectionService:
+    """Service for resolving view/fields selections into projections."""
+
+    def resolve_fields(
+        self,
+        view: str,
+        fields: Optional[str],
+        allowed: Iterable[str] = COMMENT_FIELDS,
+        compact: Iterable[str] = COMPACT_COMMENT_FIELDS
+    ) -> Optional[List[str]]:
+        """
+        Fields a slim listing returns: an explicit comma-separated fields=
+        selection, the compact view's fields, or None for full documents.
+        """
+        if fields:
+            selected = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+            unknown = [f for f in selected if f not in allowed]
+            if unknown:
+                raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+            return selected
+        if view == "compact":
+            return list(compact)
+        return None
+
+    def projection(self, fields: Iterable[str]) -> Dict[str, Any]:
+        """A Mongo projection for fields that keeps the keyset sort keys, so cursors still work."""
+        projection = {field: 1 for field in fields}
+        projection["published_at"] = 1  # _id is included unless excluded
+        return projection
+
+    def comment_projection(
+        self,
+        view: str,
+        fields: Optional[str]
+    ) -> Tuple[Optional[List[str]], Optional[Dict[str, Any]]]:
+        """Resolve view/fields into the comment fields to return and the projection to read them."""
+        selected = self.resolve_fields(view, fields)
+        if selected is None:
+            return None, None
+
+        stored = {f for f in selected if f not in COMPUTED_COMMENT_FIELDS}
+        if "video_title" in selected:
+            stored.add("video_id")
+        if "highlights" in selected:
+            stored.add("text")
+        return selected, self.projection(stored)
+
+    def select(self, doc: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+        """The selected fields of a document, plus its id and sort key."""
+        item = {"_id": doc["_id"], "published_at": doc.get("published_at")}
+        for field in fields:
+            item[field] = doc.get(field)
+        return item
+
+
+# Singleton instance
+projection_service = ProjectionService()
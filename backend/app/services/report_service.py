@@ -0,0 +1,318 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.config import get_settings
+from app.database import get_database
+from app.models import ReportData
+from app.services.analytics_service import analytics_service
+from app.services.columnar_service import columnar_service
+from app.services.rollup_service import rollup_service, start_of_day, SENTIMENTS
+
+settings = get_settings()
+
+
+def _whole_days(date_from: datetime, date_to: datetime) -> bool:
+    """Whether a range starts at midnight and ends at the end of a day (UTC)."""
+    end_of_day = start_of_day(date_to) + timedelta(hours=23, minutes=59, seconds=59)
+    return date_from == start_of_day(date_from) and date_to >= end_of_day
+
+
+class ReportService:
+    """Service for generating reports in the background."""
+
+    def __init__(self):
+        # In-memory completion events for subscribers: report_id -> asyncio.Event
+        self.completion_events: Dict[str, asyncio.Event] = {}
+
+    async def find_reusable(
+        self,
+        channel_id: str,
+        user_id: str,
+        date_from: datetime,
+        date_to: datetime,
+        data_version: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find a report over the same range and data version that is done or
+        still generating. Generating reports older than the generation timeout
+        are taken to be abandoned (the task died or was frozen) and marked as
+        errored, so a new run starts instead of waiting on them forever.
+        """
+        db = get_database()
+        same_range = {
+            "channel_id": channel_id,
+            "user_id": user_id,
+            "date_from": date_from,
+            "date_to": date_to,
+            "data_version": data_version
+        }
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.report_generation_timeout_seconds)
+
+        await db.reports.update_many(
+            {**same_range, "status": "generating", "created_at": {"$lt": cutoff}},
+            {"$set": {"status": "error", "error": "Generation timed out", "completed_at": datetime.utcnow()}}
+        )
+        return await db.reports.find_one(
+            {
+                **same_range,
+                "$or": [
+                    {"status": "completed"},
+                    {"status": "generating", "created_at": {"$gte": cutoff}}
+                ]
+            },
+            sort=[("created_at", -1)]
+        )
+
+    def _fold_daily(self, daily: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, int], List[Dict[str, Any]], int]:
+        """Fold daily rollups into sentiment, tags, the daily trend and the comment total."""
+        breakdown = {s: 0 for s in SENTIMENTS}
+        tags: Dict[str, int] = {}
+        trend = []
+        for day in daily:
+            for sentiment in SENTIMENTS:
+                breakdown[sentiment] += day['sentiment'].get(sentiment, 0)
+            for tag, count in day['tags'].items():
+                tags[tag] = tags.get(tag, 0) + count
+            if day['comment_count'] > 0:
+                trend.append({
+                    "date": day['day'].strftime("%Y-%m-%d"),
+                    **{sentiment: day['sentiment'].get(sentiment, 0) for sentiment in SENTIMENTS},
+                    "total": day['comment_count']
+                })
+
+        sentiment = analytics_service._format_sentiment(breakdown)
+        tags = dict(sorted(tags.items(), key=lambda item: item[1], reverse=True))
+        return sentiment, tags, trend, sentiment['total']
+
+    async def _aggregates_from_analytics(
+        self,
+        channel_id: str,
+        user_id: Optional[str],
+        date_from: datetime,
+        date_to: datetime
+    ) -> Tuple[Dict[str, Any], Dict[str, int], List[Dict[str, Any]], int]:
+        """Sentiment, tags, trend and comment total from columns or raw comments."""
+        db = get_database()
+
+        async def count_comments() -> int:
+            columns = await columnar_service.get_columns(channel_id, user_id)
+            if columns is not None:
+                return columns.count(columns.date_mask(date_from, date_to))
+            query = {"channel_id": channel_id, "published_at": {"$gte": date_from, "$lte": date_to}}
+            if user_id:
+                query["user_id"] = user_id
+            return await db.comments.count_documents(query)
+
+        return await asyncio.gather(
+            analytics_service.get_sentiment_breakdown(channel_id, user_id, date_from, date_to),
+            analytics_service.get_tag_breakdown(channel_id, user_id, date_from, date_to),
+            analytics_service.get_sentiment_over_time(channel_id, user_id=user_id, date_from=date_from, date_to=date_to),
+            count_comments()
+        )
+
+    async def generate_many(
+        self,
+        channel_id: str,
+        ranges: List[Tuple[datetime, datetime]],
+        user_id: Optional[str] = None
+    ) -> List[ReportData]:
+        """
+        Generate report data for several date ranges of one channel, sharing
+        passes between them. Top videos and commenters are read once, and
+        comment-derived figures come from the daily rollups (refreshed by
+        sync per touched video and day): one scan over the union of the
+        ranges when they cover whole UTC days, otherwise one per range.
+        Hot channels and channels without rollups use columns or raw comments.
+        """
+        db = get_database()
+
+        base_query = {"channel_id": channel_id}
+        if user_id:
+            base_query["user_id"] = user_id
+
+        columns = await columnar_service.get_columns(channel_id, user_id)
+        use_rollups = columns is None and await rollup_service.is_ready(channel_id, user_id)
+
+        async def all_aggregates():
+            if use_rollups and (len(ranges) == 1 or all(_whole_days(f, t) for f, t in ranges)):
+                daily = await rollup_service.get_daily(
+                    channel_id, user_id, min(f for f, _ in ranges), max(t for _, t in ranges)
+                )
+                return [
+                    self._fold_daily([d for d in daily if start_of_day(f) <= d['day'] <= t])
+                    for f, t in ranges
+                ]
+            if use_rollups:
+                dailies = await asyncio.gather(*[
+                    rollup_service.get_daily(channel_id, user_id, f, t) for f, t in ranges
+                ])
+                return [self._fold_daily(daily) for daily in dailies]
+            return await asyncio.gather(*[
+                self._aggregates_from_analytics(channel_id, user_id, f, t) for f, t in ranges
+            ])
+
+        aggregates, top_videos, commenters, video_counts, unique_counts = await asyncio.gather(
+            all_aggregates(),
+            analytics_service.get_top_videos(channel_id, 10, user_id),
+            db.commenters.find(
+                base_query,
+                {"author_name": 1, "comment_count": 1, "is_repeat": 1}
+            ).sort("comment_count", -1).limit(10).to_list(10),
+            asyncio.gather(*[
+                db.videos.count_documents({**base_query, "published_at": {"$gte": f, "$lte": t}})
+                for f, t in ranges
+            ]),
+            asyncio.gather(*[
+                analytics_service.get_unique_commenters(channel_id, user_id, f, t)
+                for f, t in ranges
+            ])
+        )
+
+        top_commenters = [
+            {
+                "author_name": c['author_name'],
+                "comment_count": c['comment_count'],
+                "is_repeat": c.get('is_repeat', False)
+            }
+            for c in commenters
+        ]
+
+        return [
+            ReportData(
+                total_comments=total_comments,
+                total_videos=total_videos,
+                unique_commenters=unique_commenters,
+                sentiment_breakdown=sentiment['breakdown'],
+                sentiment_percentage=sentiment['percentages'],
+                tag_breakdown=tags,
+                top_videos=top_videos,
+                top_commenters=top_commenters,
+                comments_over_time=trends,
+                sentiment_over_time=trends
+            )
+            for (sentiment, tags, trends, total_comments), total_videos, unique_commenters
+            in zip(aggregates, video_counts, unique_counts)
+        ]
+
+    async def generate_data(
+        self,
+        channel_id: str,
+        date_from: datetime,
+        date_to: datetime,
+        user_id: Optional[str] = None
+    ) -> ReportData:
+        """Generate report data for a channel."""
+        return (await self.generate_many(channel_id, [(date_from, date_to)], user_id))[0]
+
+    async def create_pending(
+        self,
+        channel: Dict[str, Any],
+        user_id: str,
+        date_from: datetime,
+        date_to: datetime,
+        title: Optional[str] = None,
+        schedule_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Insert a report in the generating state and return its document."""
+        db = get_database()
+
+        report_doc = {
+            "channel_id": channel['channel_id'],
+            "user_id": user_id,  # Link to user
+            "title": title or f"{channel['name']} Report - {date_from.strftime('%Y-%m-%d')} to {date_to.strftime('%Y-%m-%d')}",
+            "date_from": date_from,
+            "date_to": date_to,
+            "data": ReportData().model_dump(),
+            "status": "generating",
+            "data_version": channel.get('data_version', 0),
+            "created_at": datetime.utcnow(),
+            "completed_at": None
+        }
+        if schedule_id:
+            report_doc["schedule_id"] = schedule_id
+
+        result = await db.reports.insert_one(report_doc)
+        report_doc['id'] = str(result.inserted_id)
+        return report_doc
+
+    async def run(
+        self,
+        report_id: str,
+        channel_id: str,
+        date_from: datetime,
+        date_to: datetime,
+        user_id: Optional[str] = None
+    ):
+        """Generate a report's data and store it, marking the report completed or errored."""
+        db = get_database()
+        self.completion_events.setdefault(report_id, asyncio.Event())
+
+        try:
+            report_data = await self.generate_data(channel_id, date_from, date_to, user_id)
+            update = {
+                "data": report_data.model_dump(),
+                "status": "completed",
+                "completed_at": datetime.utcnow()
+            }
+        except Exception as e:
+            print(f"Report generation failed for {report_id}: {e}")
+            update = {
+                "status": "error",
+                "error": str(e),
+                "completed_at": datetime.utcnow()
+            }
+
+        try:
+            await db.reports.update_one({"_id": ObjectId(report_id)}, {"$set": update})
+        finally:
+            self.completion_events.pop(report_id).set()
+
+    async def run_many(
+        self,
+        channel_id: str,
+        user_id: str,
+        reports: List[Dict[str, Any]]
+    ):
+        """Generate several pending reports of one channel with shared passes."""
+        db = get_database()
+
+        try:
+            results = await self.generate_many(
+                channel_id, [(r['date_from'], r['date_to']) for r in reports], user_id
+            )
+            updates = [
+                {"data": data.model_dump(), "status": "completed", "completed_at": datetime.utcnow()}
+                for data in results
+            ]
+        except Exception as e:
+            print(f"Batch report generation failed for {channel_id}: {e}")
+            updates = [
+                {"status": "error", "error": str(e), "completed_at": datetime.utcnow()}
+                for _ in reports
+            ]
+
+        await db.reports.bulk_write([
+            UpdateOne({"_id": ObjectId(r['id'])}, {"$set": update})
+            for r, update in zip(reports, updates)
+        ], ordered=False)
+
+    async def wait_for_completion(self, report_id: str, timeout: float) -> bool:
+        """Wait until a report generated by this process finishes. Returns False on timeout."""
+        event = self.completion_events.get(report_id)
+        if event is None:
+            # Not running in this process (yet); callers re-check the stored status
+            await asyncio.sleep(timeout)
+            return False
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+# Singleton instance
+report_service = ReportService()
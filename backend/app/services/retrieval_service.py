@@ -0,0 +1,237 @@
+"""
+Local BM25 retrieval over channel comments for chat context selection.
+Indexes are built lazily per (user, channel), updated incrementally during
+sync and kept in memory with LRU eviction.
+"""
+import re
+import math
+import bisect
+import asyncio
+from datetime import datetime, timezone
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import get_settings
+from app.database import get_database
+from app.services.gemini_service import estimate_tokens
+
+settings = get_settings()
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "do", "does", "for",
+    "from", "has", "have", "i", "if", "in", "is", "it", "its", "me", "my", "of",
+    "on", "or", "so", "that", "the", "their", "them", "they", "this", "to", "was",
+    "we", "what", "when", "which", "who", "why", "how", "with", "you", "your",
+}
+
+# Fields kept per indexed comment, enough to build the chat prompt
+CONTEXT_FIELDS = ["comment_id", "text", "sentiment", "like_count", "published_at"]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into index terms, dropping stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+class BM25Index:
+    """Incrementally updatable BM25 inverted index over comment texts."""
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self):
+        self.docs: Dict[str, Dict[str, Any]] = {}  # comment_id -> context fields
+        self.doc_lengths: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}  # term -> {comment_id: tf}
+        self.total_length = 0
+        self._vocabulary: Optional[List[str]] = None  # Sorted terms, rebuilt lazily after changes
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, comment: Dict[str, Any]):
+        """Add or replace a comment in the index."""
+        comment_id = comment['comment_id']
+        if comment_id in self.docs:
+            self.remove(comment_id)
+
+        terms = tokenize(comment.get('text', ''))
+        frequencies: Dict[str, int] = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+
+        for term, tf in frequencies.items():
+            if term not in self.postings:
+                self._vocabulary = None
+            self.postings.setdefault(term, {})[comment_id] = tf
+
+        doc = {field: comment.get(field) for field in CONTEXT_FIELDS}
+        published_at = doc.get('published_at')
+        if published_at is not None and published_at.tzinfo is not None:
+            # Sync passes aware datetimes; Mongo returns naive UTC. Store naive UTC so they sort together
+            doc['published_at'] = published_at.astimezone(timezone.utc).replace(tzinfo=None)
+        self.docs[comment_id] = doc
+        self.doc_lengths[comment_id] = len(terms)
+        self.total_length += len(terms)
+
+    def remove(self, comment_id: str):
+        """Remove a comment from the index."""
+        doc = self.docs.pop(comment_id, None)
+        if doc is None:
+            return
+
+        for term in set(tokenize(doc.get('text') or '')):
+            term_postings = self.postings.get(term)
+            if term_postings is not None:
+                term_postings.pop(comment_id, None)
+                if not term_postings:
+                    del self.postings[term]
+                    self._vocabulary = None
+
+        self.total_length -= self.doc_lengths.pop(comment_id, 0)
+
+    def search(self, query: str) -> List[Tuple[str, float]]:
+        """Return (comment_id, score) pairs ranked by BM25 score."""
+        if not self.docs:
+            return []
+
+        n = len(self.docs)
+        avg_length = self.total_length / n if n else 0
+        scores: Dict[str, float] = {}
+
+        for term in set(tokenize(query)):
+            term_postings = self.postings.get(term)
+            if not term_postings:
+                continue
+
+            df = len(term_postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+            for comment_id, tf in term_postings.items():
+                length_norm = 1 - self.B + self.B * (self.doc_lengths[comment_id] / avg_length if avg_length else 0)
+                scores[comment_id] = scores.get(comment_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + self.K1 * length_norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def expand_prefix(self, prefix: str, limit: int) -> List[str]:
+        """Indexed terms starting with prefix, most frequent first."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\uffff")
+        matches = self._vocabulary[start:end]
+        return sorted(matches, key=lambda term: len(self.postings[term]), reverse=True)[:limit]
+
+
+class RetrievalService:
+    """Service for selecting relevant comments as chat context."""
+
+    def __init__(self, max_indexes: Optional[int] = None):
+        self.max_indexes = max_indexes or settings.retrieval_max_channels
+        self.indexes: "OrderedDict[Tuple[str, str], BM25Index]" = OrderedDict()
+        self._build_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def _key(self, channel_id: str, user_id: Optional[str]) -> Tuple[str, str]:
+        return (user_id or "", channel_id)
+
+    def _store(self, key: Tuple[str, str], index: BM25Index):
+        """Cache an index, evicting the least recently used ones."""
+        self.indexes[key] = index
+        self.indexes.move_to_end(key)
+        while len(self.indexes) > self.max_indexes:
+            self.indexes.popitem(last=False)
+
+    async def get_index(self, channel_id: str, user_id: Optional[str] = None) -> BM25Index:
+        """Get the index for a channel, building it from the database on a miss."""
+        key = self._key(channel_id, user_id)
+
+        index = self.indexes.get(key)
+        if index is not None:
+            self.indexes.move_to_end(key)
+            return index
+
+        lock = self._build_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another request may have built it while we waited
+            index = self.indexes.get(key)
+            if index is not None:
+                return index
+
+            db = get_database()
+            query = {"channel_id": channel_id}
+            if user_id:
+                query["user_id"] = user_id
+
+            projection = {field: 1 for field in CONTEXT_FIELDS}
+            comments = await db.comments.find(query, projection).to_list(None)
+
+            loop = asyncio.get_event_loop()
+            index = await loop.run_in_executor(None, self._build_index_sync, comments)
+            self._store(key, index)
+
+        self._build_locks.pop(key, None)
+        return index
+
+    def _build_index_sync(self, comments: List[Dict[str, Any]]) -> BM25Index:
+        """Synchronous index build to run in thread pool."""
+        index = BM25Index()
+        for comment in comments:
+            index.add(comment)
+        return index
+
+    def add_comments(self, channel_id: str, user_id: Optional[str], comments: List[Dict[str, Any]]):
+        """Incrementally index freshly synced comments if the channel index is loaded."""
+        index = self.indexes.get(self._key(channel_id, user_id))
+        if index is None:
+            return  # Built lazily from the database on next use
+
+        for comment in comments:
+            index.add(comment)
+
+    def invalidate(self, channel_id: str, user_id: Optional[str] = None):
+        """Drop a cached channel index."""
+        self.indexes.pop(self._key(channel_id, user_id), None)
+
+    async def select_context(
+        self,
+        question: str,
+        channel_id: str,
+        user_id: Optional[str] = None,
+        token_budget: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Pick the comments most relevant to the question within a token budget.
+        Falls back to the most recent comments when nothing matches.
+        """
+        budget = token_budget or settings.chat_context_token_budget
+        index = await self.get_index(channel_id, user_id)
+
+        ranked_ids = [comment_id for comment_id, _ in index.search(question)]
+        if not ranked_ids:
+            recent = sorted(
+                index.docs.values(),
+                key=lambda d: d.get('published_at') or datetime.min,
+                reverse=True
+            )
+            ranked_ids = [d['comment_id'] for d in recent]
+
+        selected = []
+        used_tokens = 0
+        for comment_id in ranked_ids:
+            doc = index.docs[comment_id]
+            tokens = estimate_tokens(doc.get('text') or '')
+            if used_tokens + tokens > budget:
+                if selected:
+                    break
+                continue  # Skip a single oversized comment rather than return nothing
+            selected.append(doc)
+            used_tokens += tokens
+
+        return selected
+
+
+# Singleton instance
+retrieval_service = RetrievalService()
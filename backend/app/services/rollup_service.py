@@ -0,0 +1,382 @@
+"""
+Materialized daily rollups of comment analytics.
+
+One document per (user_id, channel_id, video_id, day) holds sentiment
+counts, tag counts, like and reply sums, and t-digests of likes and
+replies per comment. Lighter hourly rollups per (user_id, channel_id,
+video_id, hour) hold comment and sentiment counts for anomaly detection
+and hourly series. Sync refreshes the rollups of each video it touches,
+and a rebuild regenerates a channel from comments. Analytics read whole
+days from rollups and only scan raw comments for the partial days at the
+edges of a requested range.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from pymongo import ReplaceOne
+
+from app.database import get_database
+from app.services.sketch_service import TDigest
+
+SENTIMENTS = ("positive", "neutral", "negative")
+ROLLUP_VERSION = 3  # Bumped when rollup documents gain fields; older channels are rebuilt
+HOURLY_ROLLUP_VERSION = 3  # First version with hourly rollups
+DIGEST_FIELDS = {"like_digest": 0, "reply_digest": 0}
+
+
+def start_of_day(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def empty_rollup() -> Dict[str, Any]:
+    return {
+        "comment_count": 0,
+        "sentiment": {s: 0 for s in SENTIMENTS},
+        "tags": {},
+        "like_sum": 0,
+        "reply_sum": 0
+    }
+
+
+def merge_rollup(target: Dict[str, Any], source: Dict[str, Any]):
+    """Add the counts of one rollup into another."""
+    target["comment_count"] += source.get("comment_count", 0)
+    target["like_sum"] += source.get("like_sum", 0)
+    target["reply_sum"] += source.get("reply_sum", 0)
+    for sentiment, count in source.get("sentiment", {}).items():
+        target["sentiment"][sentiment] = target["sentiment"].get(sentiment, 0) + count
+    for tag, count in source.get("tags", {}).items():
+        target["tags"][tag] = target["tags"].get(tag, 0) + count
+
+
+class RollupService:
+    """Service for maintaining and reading daily analytics rollups."""
+
+    async def _aggregate_comments(self, match: Dict[str, Any], digests: bool = False) -> List[Dict[str, Any]]:
+        """Aggregate raw comments into rollup-shaped docs per (user, video, day)."""
+        db = get_database()
+
+        group_stage = {
+            "_id": {
+                "user_id": "$user_id",
+                "video_id": "$video_id",
+                "day": {
+                    "$dateFromParts": {
+                        "year": {"$year": "$published_at"},
+                        "month": {"$month": "$published_at"},
+                        "day": {"$dayOfMonth": "$published_at"}
+                    }
+                }
+            },
+            "comment_count": {"$sum": 1},
+            "positive": {"$sum": {"$cond": [{"$eq": ["$sentiment", "positive"]}, 1, 0]}},
+            "negative": {"$sum": {"$cond": [{"$eq": ["$sentiment", "negative"]}, 1, 0]}},
+            "like_sum": {"$sum": {"$ifNull": ["$like_count", 0]}},
+            "reply_sum": {"$sum": {"$ifNull": ["$reply_count", 0]}},
+            "tags": {"$push": "$tags"}
+        }
+        if digests:
+            group_stage["likes"] = {"$push": {"$ifNull": ["$like_count", 0]}}
+            group_stage["replies"] = {"$push": {"$ifNull": ["$reply_count", 0]}}
+
+        pipeline = [
+            {"$match": match},
+            {"$group": group_stage}
+        ]
+
+        results = await db.comments.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+        rollups = []
+        for result in results:
+            tag_counts: Dict[str, int] = {}
+            for tags in result['tags']:
+                for tag in tags or []:
+                    tag_counts[tag] = tag_counts.get(tag, 0) + 1
+
+            rollup = {
+                "user_id": result['_id'].get('user_id'),
+                "video_id": result['_id']['video_id'],
+                "day": result['_id']['day'],
+                "comment_count": result['comment_count'],
+                "sentiment": {
+                    "positive": result['positive'],
+                    # Unanalyzed comments count as neutral, as in raw analytics
+                    "neutral": result['comment_count'] - result['positive'] - result['negative'],
+                    "negative": result['negative']
+                },
+                "tags": tag_counts,
+                "like_sum": result['like_sum'],
+                "reply_sum": result['reply_sum']
+            }
+            if digests:
+                rollup["like_digest"] = TDigest.from_values(result['likes']).to_doc()
+                rollup["reply_digest"] = TDigest.from_values(result['replies']).to_doc()
+            rollups.append(rollup)
+
+        return rollups
+
+    async def _replace(self, channel_id: str, user_id: str, scope: Dict[str, Any]):
+        """Recompute the rollups within a scope and replace the stored ones."""
+        db = get_database()
+
+        query = {"channel_id": channel_id, "user_id": user_id, **scope}
+        rollups = await self._aggregate_comments(query, digests=True)
+
+        now = datetime.utcnow()
+        ops = [
+            ReplaceOne(
+                {"user_id": user_id, "channel_id": channel_id, "video_id": r['video_id'], "day": r['day']},
+                {**r, "user_id": user_id, "channel_id": channel_id, "updated_at": now},
+                upsert=True
+            )
+            for r in rollups
+        ]
+        if ops:
+            await db.daily_rollups.bulk_write(ops, ordered=False)
+
+        # Remove rollups for (video, day) pairs that no longer have comments
+        await db.daily_rollups.delete_many({**query, "updated_at": {"$lt": now}})
+
+    async def _replace_hourly(self, channel_id: str, user_id: str, scope: Dict[str, Any]):
+        """Recompute the hourly rollups within a scope and replace the stored ones."""
+        db = get_database()
+
+        query = {"channel_id": channel_id, "user_id": user_id, **scope}
+        pipeline = [
+            {"$match": query},
+            {
+                "$group": {
+                    "_id": {
+                        "video_id": "$video_id",
+                        "hour": {
+                            "$dateFromParts": {
+                                "year": {"$year": "$published_at"},
+                                "month": {"$month": "$published_at"},
+                                "day": {"$dayOfMonth": "$published_at"},
+                                "hour": {"$hour": "$published_at"}
+                            }
+                        }
+                    },
+                    "comment_count": {"$sum": 1},
+                    "positive": {"$sum": {"$cond": [{"$eq": ["$sentiment", "positive"]}, 1, 0]}},
+                    "negative": {"$sum": {"$cond": [{"$eq": ["$sentiment", "negative"]}, 1, 0]}}
+                }
+            }
+        ]
+
+        now = datetime.utcnow()
+        ops = []
+        async for result in db.comments.aggregate(pipeline, allowDiskUse=True):
+            key = {
+                "user_id": user_id,
+                "channel_id": channel_id,
+                "video_id": result['_id']['video_id'],
+                "hour": result['_id']['hour']
+            }
+            ops.append(ReplaceOne(
+                key,
+                {
+                    **key,
+                    "comment_count": result['comment_count'],
+                    "positive": result['positive'],
+                    "negative": result['negative'],
+                    "updated_at": now
+                },
+                upsert=True
+            ))
+        if ops:
+            await db.hourly_rollups.bulk_write(ops, ordered=False)
+
+        await db.hourly_rollups.delete_many({**query, "updated_at": {"$lt": now}})
+
+    async def rebuild_video(self, channel_id: str, user_id: str, video_id: str):
+        """Refresh the rollups of one video, e.g. after it was synced."""
+        await self._replace(channel_id, user_id, {"video_id": video_id})
+        await self._replace_hourly(channel_id, user_id, {"video_id": video_id})
+
+    async def rebuild_channel(self, channel_id: str, user_id: str):
+        """Regenerate all rollups of a channel from its comments."""
+        db = get_database()
+
+        await self._replace(channel_id, user_id, {})
+        await self._replace_hourly(channel_id, user_id, {})
+        await db.channels.update_one(
+            {"channel_id": channel_id, "user_id": user_id},
+            {"$set": {"rollups_ready": True, "rollups_version": ROLLUP_VERSION}}
+        )
+
+    async def is_ready(self, channel_id: str, user_id: Optional[str] = None) -> bool:
+        """Check that rollups have been built for the channel."""
+        db = get_database()
+
+        query = {"channel_id": channel_id, "rollups_ready": {"$ne": True}}
+        if user_id:
+            query["user_id"] = user_id
+
+        return await db.channels.find_one(query, {"_id": 1}) is None
+
+    async def hourly_ready(self, channel_id: str, user_id: Optional[str] = None) -> bool:
+        """Check that hourly rollups have been built for the channel."""
+        db = get_database()
+
+        query = {"channel_id": channel_id, "rollups_version": {"$not": {"$gte": HOURLY_ROLLUP_VERSION}}}
+        if user_id:
+            query["user_id"] = user_id
+
+        return await db.channels.find_one(query, {"_id": 1}) is None
+
+    async def get_daily(
+        self,
+        channel_id: str,
+        user_id: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        video_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get per-day totals across videos for a date range, sorted by day.
+        Whole days come from rollups; partial days at the edges of the range
+        are aggregated from raw comments so results stay exact.
+        """
+        db = get_database()
+
+        base_query = {"channel_id": channel_id}
+        if user_id:
+            base_query["user_id"] = user_id
+        if video_id:
+            base_query["video_id"] = video_id
+
+        # Whole days covered by the range: [first_day, end_day)
+        first_day = start_of_day(date_from) if date_from else None
+        if date_from and first_day < date_from:
+            first_day += timedelta(days=1)
+        end_day = start_of_day(date_to) if date_to else None
+
+        partial_days = []
+        if date_from and first_day > date_from:
+            if date_to and date_to < first_day:
+                partial_days.append({"$gte": date_from, "$lte": date_to})
+            else:
+                partial_days.append({"$gte": date_from, "$lt": first_day})
+        if date_to and (first_day is None or end_day >= first_day):
+            partial_days.append({"$gte": end_day, "$lte": date_to})
+
+        by_day: Dict[datetime, Dict[str, Any]] = {}
+
+        if first_day is None or end_day is None or first_day < end_day:
+            rollup_query = dict(base_query)
+            if first_day:
+                rollup_query.setdefault("day", {})["$gte"] = first_day
+            if end_day:
+                rollup_query.setdefault("day", {})["$lt"] = end_day
+
+            async for rollup in db.daily_rollups.find(rollup_query, DIGEST_FIELDS):
+                merge_rollup(by_day.setdefault(rollup['day'], empty_rollup()), rollup)
+
+        for published_range in partial_days:
+            for rollup in await self._aggregate_comments({**base_query, "published_at": published_range}):
+                merge_rollup(by_day.setdefault(rollup['day'], empty_rollup()), rollup)
+
+        return [{"day": day, **by_day[day]} for day in sorted(by_day)]
+
+    async def get_daily_digests(
+        self,
+        channel_id: str,
+        user_id: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        video_id: Optional[str] = None
+    ) -> Dict[datetime, Dict[str, TDigest]]:
+        """
+        Get merged like and reply digests per day since the day containing
+        date_from. Falls back to raw comments for channels whose rollups
+        predate digests.
+        """
+        db = get_database()
+
+        base_query = {"channel_id": channel_id}
+        if user_id:
+            base_query["user_id"] = user_id
+        if video_id:
+            base_query["video_id"] = video_id
+
+        outdated_query = {"channel_id": channel_id, "rollups_version": {"$not": {"$gte": ROLLUP_VERSION}}}
+        if user_id:
+            outdated_query["user_id"] = user_id
+
+        if await db.channels.find_one(outdated_query, {"_id": 1}) is None:
+            rollup_query = dict(base_query)
+            if date_from:
+                rollup_query["day"] = {"$gte": start_of_day(date_from)}
+            rollups = await db.daily_rollups.find(
+                rollup_query,
+                {"day": 1, "like_digest": 1, "reply_digest": 1}
+            ).to_list(None)
+        else:
+            comment_query = dict(base_query)
+            if date_from:
+                comment_query["published_at"] = {"$gte": start_of_day(date_from)}
+            rollups = await self._aggregate_comments(comment_query, digests=True)
+
+        # One rollup per (video, day); collect first so each day compresses once
+        by_day: Dict[datetime, Dict[str, List[TDigest]]] = {}
+        for rollup in rollups:
+            day = by_day.setdefault(rollup['day'], {"likes": [], "replies": []})
+            day["likes"].append(TDigest.from_doc(rollup.get('like_digest')))
+            day["replies"].append(TDigest.from_doc(rollup.get('reply_digest')))
+        return {
+            day: {metric: TDigest.merge_all(digests) for metric, digests in metrics.items()}
+            for day, metrics in sorted(by_day.items())
+        }
+
+    async def get_hourly(
+        self,
+        channel_id: str,
+        user_id: str,
+        hour_from: datetime,
+        hour_to: datetime
+    ) -> List[Dict[str, Any]]:
+        """Get hourly rollups per video for hours in [hour_from, hour_to)."""
+        db = get_database()
+
+        return await db.hourly_rollups.find(
+            {
+                "channel_id": channel_id,
+                "user_id": user_id,
+                "hour": {"$gte": hour_from, "$lt": hour_to}
+            },
+            {"video_id": 1, "hour": 1, "comment_count": 1, "negative": 1, "_id": 0}
+        ).to_list(None)
+
+
+    async def get_hourly_counts(
+        self,
+        channel_id: str,
+        user_id: Optional[str],
+        hour_from: datetime,
+        hour_to: datetime
+    ) -> List[Dict[str, Any]]:
+        """Get comment and sentiment counts per hour, summed over videos, for hours in [hour_from, hour_to]."""
+        db = get_database()
+
+        query = {"channel_id": channel_id, "hour": {"$gte": hour_from, "$lte": hour_to}}
+        if user_id:
+            query["user_id"] = user_id
+
+        pipeline = [
+            {"$match": query},
+            {
+                "$group": {
+                    "_id": "$hour",
+                    "comment_count": {"$sum": "$comment_count"},
+                    "positive": {"$sum": "$positive"},
+                    "negative": {"$sum": "$negative"}
+                }
+            }
+        ]
+        return [
+            {"hour": r['_id'], "comment_count": r['comment_count'], "positive": r['positive'], "negative": r['negative']}
+            async for r in db.hourly_rollups.aggregate(pipeline)
+        ]
+
+# Singleton instance
+rollup_service = RollupService()
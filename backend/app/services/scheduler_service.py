@@ -0,0 +1,167 @@
+"""
+Recurring report schedules executed in off-peak batches.
+
+Schedules (weekly or monthly per channel) become due at their next_run_at
+and are only executed inside the configured off-peak UTC window. Each tick
+claims due schedules across all tenants, groups them by channel and
+generates every report of a channel in one ReportService.run_many call so
+they share aggregation passes. Claims are atomic, so several workers can
+run the scheduler without generating a report twice.
+
+Serverless deploys have no long-lived process, so an external cron calls
+the run-due endpoint, which runs one tick to completion inside the
+request. Long-running deploys can opt in to the in-process loop with
+REPORT_SCHEDULER_IN_PROCESS.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import get_settings
+from app.database import get_database
+from app.services.report_service import report_service
+
+settings = get_settings()
+
+FREQUENCIES = ("weekly", "monthly")
+
+
+def _midnight(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _first_of_next_month(dt: datetime) -> datetime:
+    return _midnight(dt).replace(day=1, year=dt.year + (dt.month == 12), month=dt.month % 12 + 1)
+
+
+def first_run_at(frequency: str, now: datetime) -> datetime:
+    """When a new schedule first runs: the next off-peak start (weekly) or the 1st (monthly)."""
+    start_hour = settings.report_offpeak_start_hour
+    if frequency == "monthly":
+        return _first_of_next_month(now) + timedelta(hours=start_hour)
+
+    run_at = _midnight(now) + timedelta(hours=start_hour)
+    return run_at if run_at > now else run_at + timedelta(days=1)
+
+
+def next_run_after(frequency: str, run_at: datetime) -> datetime:
+    """The run following one at run_at."""
+    if frequency == "monthly":
+        return _first_of_next_month(run_at) + timedelta(hours=settings.report_offpeak_start_hour)
+    return run_at + timedelta(days=7)
+
+
+def report_range(frequency: str, run_at: datetime) -> Tuple[datetime, datetime]:
+    """The whole UTC days a run reports on: the previous 7 days or the previous calendar month."""
+    end = _midnight(run_at)
+    if frequency == "monthly":
+        start = (end - timedelta(days=1)).replace(day=1)
+    else:
+        start = end - timedelta(days=7)
+    return start, end - timedelta(milliseconds=1)
+
+
+def in_offpeak_window(now: datetime) -> bool:
+    start, end = settings.report_offpeak_start_hour, settings.report_offpeak_end_hour
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end  # Window wraps past midnight
+
+
+class SchedulerService:
+    """Service for running scheduled reports off-peak."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the scheduler loop in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def tick(self, now: Optional[datetime] = None) -> Optional[int]:
+        """Run due schedules if inside the off-peak window. Returns the number created, or None outside it."""
+        now = now or datetime.utcnow()
+        if not in_offpeak_window(now):
+            return None
+        return await self.run_due(now)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Report scheduler tick failed: {e}")
+            await asyncio.sleep(settings.report_scheduler_interval_seconds)
+
+    async def _claim(self, schedule: Dict[str, Any], now: datetime) -> bool:
+        """Advance a due schedule to its next run; False if another worker got there first."""
+        db = get_database()
+
+        next_run = next_run_after(schedule['frequency'], schedule['next_run_at'])
+        while next_run <= now:
+            next_run = next_run_after(schedule['frequency'], next_run)  # Skip runs missed while down
+
+        claimed = await db.report_schedules.find_one_and_update(
+            {"_id": schedule['_id'], "next_run_at": schedule['next_run_at']},
+            {"$set": {"next_run_at": next_run, "last_run_at": now}}
+        )
+        return claimed is not None
+
+    async def run_due(self, now: Optional[datetime] = None) -> int:
+        """Generate every due scheduled report, batched per channel. Returns the number created."""
+        db = get_database()
+        now = now or datetime.utcnow()
+
+        due = await db.report_schedules.find(
+            {"active": True, "next_run_at": {"$lte": now}}
+        ).sort("next_run_at", 1).limit(settings.report_scheduler_batch_size).to_list(None)
+
+        by_channel: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for schedule in due:
+            if await self._claim(schedule, now):
+                by_channel.setdefault((schedule['user_id'], schedule['channel_id']), []).append(schedule)
+
+        created = 0
+        for (user_id, channel_id), schedules in by_channel.items():
+            channel = await db.channels.find_one({"channel_id": channel_id, "user_id": user_id})
+            if not channel:
+                continue
+
+            pending = []
+            for schedule in schedules:
+                date_from, date_to = report_range(schedule['frequency'], schedule['next_run_at'])
+                existing = await report_service.find_reusable(
+                    channel_id, user_id, date_from, date_to, channel.get('data_version', 0)
+                )
+                if existing:
+                    continue
+
+                title = (
+                    f"{channel['name']} {schedule['frequency'].capitalize()} Report - "
+                    f"{date_from.strftime('%Y-%m-%d')} to {date_to.strftime('%Y-%m-%d')}"
+                )
+                pending.append(await report_service.create_pending(
+                    channel, user_id, date_from, date_to, title, str(schedule['_id'])
+                ))
+
+            if pending:
+                await report_service.run_many(channel_id, user_id, pending)
+                created += len(pending)
+
+        if created:
+            print(f"📅 Scheduler generated {created} report(s) for {len(by_channel)} channel(s)")
+        return created
+
+
+# Singleton instance
+scheduler_service = SchedulerService()
@@ -0,0 +1,214 @@
+"""
+Full-text comment search on a MongoDB text index.
+
+The text index is compound on channel_id, so searches only touch the
+channel's own index entries. Mongo handles English stemming, quoted
+phrases and textScore relevance. Prefix terms ("grea*") are expanded to
+the channel's most frequent matching terms from the in-memory retrieval
+index, which sync keeps current. Highlight offsets are computed for the
+returned page only, by comparing light stems of the text's tokens with
+the search terms and expanded prefixes. Faceted pages fetch the page
+with an indexed find and run a counts-only $facet aggregation alongside.
+"""
+import asyncio
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.services.pagination_service import pagination_service
+from app.services.retrieval_service import retrieval_service, tokenize, TOKEN_PATTERN
+
+PHRASE_PATTERN = re.compile(r'"([^"]+)"')
+MAX_PREFIX_EXPANSIONS = 10
+MIN_PREFIX_LENGTH = 2
+MAX_FACET_VALUES = 50  # Tag and video facets keep the most frequent values
+STEM_SUFFIXES = ("ingly", "edly", "ing", "ed", "es", "ly", "s")
+MIN_STEM_LENGTH = 3
+
+
+@dataclass
+class ParsedSearch:
+    """A search string split into its parts."""
+    terms: List[str] = field(default_factory=list)
+    phrases: List[str] = field(default_factory=list)
+    prefixes: List[str] = field(default_factory=list)
+    excluded: List[str] = field(default_factory=list)
+    expanded: List[str] = field(default_factory=list)  # Indexed terms the prefixes matched
+
+    def __bool__(self) -> bool:
+        return bool(self.terms or self.phrases or self.prefixes)
+
+
+def parse_search(search: str) -> ParsedSearch:
+    """Parse terms, "quoted phrases", prefix* terms and -excluded terms."""
+    parsed = ParsedSearch()
+
+    for phrase in PHRASE_PATTERN.findall(search):
+        words = TOKEN_PATTERN.findall(phrase.lower())
+        if words:
+            parsed.phrases.append(" ".join(words))
+
+    for raw in PHRASE_PATTERN.sub(" ", search).split():
+        excluded = raw.startswith("-")
+        prefix = raw.endswith("*")
+        words = TOKEN_PATTERN.findall(raw.lower())
+        if not words:
+            continue
+        if excluded:
+            parsed.excluded.extend(words)
+        elif prefix and len(words) == 1 and len(words[0]) >= MIN_PREFIX_LENGTH:
+            parsed.prefixes.append(words[0])
+        else:
+            parsed.terms.extend(tokenize(" ".join(words)))  # Mongo ignores stopwords too
+
+    return parsed
+
+
+def stem(word: str) -> str:
+    """
+    Strip common English inflections so forms Mongo's stemmer folds together
+    compare equal (running, runs -> run; loved, loving -> lov).
+    """
+    for suffix in STEM_SUFFIXES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < MIN_STEM_LENGTH:
+            continue
+        if suffix == "s" and word[-2] in "su":
+            continue  # class, focus
+        word = word[:-len(suffix)]
+        if len(word) > MIN_STEM_LENGTH and word[-1] == word[-2] and word[-1] not in "lsz":
+            word = word[:-1]  # running -> runn -> run
+        break
+    if word.endswith("e") and len(word) > MIN_STEM_LENGTH:
+        word = word[:-1]
+    return word
+
+
+def highlight_offsets(text: str, parsed: ParsedSearch) -> List[Tuple[int, int]]:
+    """Character spans in text matching the search, sorted and non-overlapping."""
+    lowered = text.lower()
+    spans = []
+
+    for phrase in parsed.phrases:
+        pattern = r"\b" + r"\W+".join(re.escape(word) for word in phrase.split()) + r"\b"
+        spans.extend(m.span() for m in re.finditer(pattern, lowered))
+
+    stems = {stem(term) for term in parsed.terms + parsed.expanded}
+    for m in TOKEN_PATTERN.finditer(lowered):
+        if stem(m.group()) in stems:
+            spans.append(m.span())
+
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class SearchService:
+    """Service for indexed comment search."""
+
+    async def expand_prefix(self, prefix: str, channel_id: str, user_id: Optional[str]) -> List[str]:
+        """The channel's most frequent terms starting with prefix."""
+        index = await retrieval_service.get_index(channel_id, user_id)
+        return index.expand_prefix(prefix, MAX_PREFIX_EXPANSIONS)
+
+    async def text_filter(
+        self,
+        search: str,
+        channel_id: str,
+        user_id: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], ParsedSearch]:
+        """
+        Build a $text filter for a search string. Returns (None, parsed) when
+        nothing searchable remains, e.g. a prefix with no matching terms.
+        """
+        parsed = parse_search(search)
+
+        for prefix in parsed.prefixes:
+            parsed.expanded.extend(await self.expand_prefix(prefix, channel_id, user_id))
+
+        parts = [f'"{phrase}"' for phrase in parsed.phrases]
+        parts += parsed.terms + parsed.expanded
+        if not parts:
+            return None, parsed
+        parts += [f"-{word}" for word in parsed.excluded]
+
+        return {"$search": " ".join(parts), "$language": "english"}, parsed
+
+    async def fetch_ranked_page(
+        self,
+        collection: AsyncIOMotorCollection,
+        query: Dict[str, Any],
+        limit: int,
+        skip: int = 0,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get one page of $text matches, most relevant first, with search_score set."""
+        score = {"$meta": "textScore"}
+        return await collection.find(query, {**(projection or {}), "search_score": score}).sort(
+            [("search_score", score), ("published_at", -1), ("_id", -1)]
+        ).skip(skip).limit(limit).to_list(limit)
+
+    async def faceted_page(
+        self,
+        collection: AsyncIOMotorCollection,
+        query: Dict[str, Any],
+        limit: int,
+        skip: int = 0,
+        ranked: bool = False
+    ) -> Dict[str, Any]:
+        """
+        One page of matches plus the total and sentiment, tag and video counts
+        for the same filter. The page is an indexed find; the counts come from
+        a $facet aggregation run concurrently.
+        """
+        if ranked:
+            fetch = self.fetch_ranked_page(collection, query, limit, skip)
+        else:
+            fetch = pagination_service.fetch_page(collection, query, limit, skip=skip)
+
+        pipeline = [{"$match": query}, {"$facet": {
+            "total": [{"$count": "count"}],
+            # Unanalyzed comments count as neutral, as in the analytics breakdown
+            "sentiment": [{"$group": {"_id": {"$ifNull": ["$sentiment", "neutral"]}, "count": {"$sum": 1}}}],
+            "tags": [
+                {"$unwind": "$tags"},
+                {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": MAX_FACET_VALUES}
+            ],
+            "videos": [
+                {"$group": {"_id": "$video_id", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": MAX_FACET_VALUES}
+            ]
+        }}]
+
+        page, counts = await asyncio.gather(
+            fetch,
+            collection.aggregate(pipeline, allowDiskUse=True).to_list(1)
+        )
+        items = page if ranked else page[0]
+        result = counts[0]
+        return {
+            "items": items,
+            "total": result['total'][0]['count'] if result['total'] else 0,
+            "facets": {
+                "sentiment": {r['_id']: r['count'] for r in result['sentiment'] if r['_id']},
+                "tags": {r['_id']: r['count'] for r in result['tags']},
+                "videos": [{"video_id": r['_id'], "count": r['count']} for r in result['videos'] if r['_id']]
+            }
+        }
+
+    def annotate(self, comments: List[Dict[str, Any]], parsed: ParsedSearch):
+        """Attach highlight offsets to a page of results."""
+        for comment in comments:
+            comment['highlights'] = highlight_offsets(comment.get('text') or '', parsed)
+
+
+# Singleton instance
+search_service = SearchService()
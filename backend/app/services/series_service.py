@@ -0,0 +1,266 @@
+"""
+Time-bucketed sentiment series with gap filling, creator timezones and
+previous-period comparison.
+
+UTC day/week/month series are folded from daily rollups, and hourly
+buckets or timezones with whole-hour offsets from hourly rollups, so
+multi-year ranges never touch raw comments. Only channels without
+rollups and half-hour-offset timezones (e.g. Asia/Kolkata) are grouped
+with $dateTrunc over comments. Either way the current and previous
+periods are computed in a single pass.
+"""
+from datetime import datetime, date, timedelta, timezone
+from typing import Dict, Any, List, Optional
+from zoneinfo import ZoneInfo
+
+from app.database import get_database
+from app.services.rollup_service import rollup_service
+
+BUCKETS = ("hour", "day", "week", "month")
+SENTIMENTS = ("positive", "neutral", "negative")
+MAX_BUCKETS = 5000
+
+
+def _to_utc_naive(dt: datetime) -> datetime:
+    """Normalize to naive UTC, the form stored in MongoDB."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _local_date_start(day: date, tz: ZoneInfo) -> datetime:
+    """UTC instant of local midnight on a date."""
+    return _to_utc_naive(datetime(day.year, day.month, day.day, tzinfo=tz))
+
+
+def bucket_start(dt: datetime, bucket: str, tz: ZoneInfo) -> datetime:
+    """UTC instant at which the bucket containing dt starts."""
+    local = dt.replace(tzinfo=timezone.utc).astimezone(tz)
+
+    if bucket == "hour":
+        return _to_utc_naive(local.replace(minute=0, second=0, microsecond=0))
+
+    day = local.date()
+    if bucket == "week":
+        day -= timedelta(days=day.weekday())
+    elif bucket == "month":
+        day = day.replace(day=1)
+    return _local_date_start(day, tz)
+
+
+def next_bucket(start: datetime, bucket: str, tz: ZoneInfo) -> datetime:
+    """UTC instant at which the bucket after the one starting at start begins."""
+    if bucket == "hour":
+        return start + timedelta(hours=1)
+
+    day = start.replace(tzinfo=timezone.utc).astimezone(tz).date()
+    if bucket == "day":
+        day += timedelta(days=1)
+    elif bucket == "week":
+        day += timedelta(days=7)
+    else:
+        day = date(day.year + (day.month == 12), day.month % 12 + 1, 1)
+    return _local_date_start(day, tz)
+
+
+def whole_hour_offsets(tz: ZoneInfo, date_from: datetime, date_to: datetime) -> bool:
+    """Whether local hours line up with UTC hours at both ends of a range."""
+    return all(tz.utcoffset(dt).total_seconds() % 3600 == 0 for dt in (date_from, date_to))
+
+
+def enumerate_buckets(date_from: datetime, date_to: datetime, bucket: str, tz: ZoneInfo) -> List[datetime]:
+    """All bucket starts overlapping [date_from, date_to]."""
+    starts = []
+    current = bucket_start(date_from, bucket, tz)
+    while current <= date_to:
+        starts.append(current)
+        if len(starts) > MAX_BUCKETS:
+            raise ValueError(f"Range spans more than {MAX_BUCKETS} {bucket} buckets")
+        current = next_bucket(current, bucket, tz)
+    return starts
+
+
+def _empty_counts() -> Dict[str, int]:
+    return {**{s: 0 for s in SENTIMENTS}, "total": 0}
+
+
+def _change(current: int, previous: int) -> Dict[str, Any]:
+    return {
+        "delta": current - previous,
+        "percent": round((current - previous) / previous * 100, 1) if previous else None
+    }
+
+
+class SeriesService:
+    """Service for bucketed, gap-filled sentiment series."""
+
+    async def _counts_from_rollups(
+        self,
+        channel_id: str,
+        user_id: Optional[str],
+        date_from: datetime,
+        date_to: datetime,
+        bucket: str,
+        tz: ZoneInfo
+    ) -> Dict[datetime, Dict[str, int]]:
+        daily = await rollup_service.get_daily(channel_id, user_id, date_from, date_to)
+
+        counts: Dict[datetime, Dict[str, int]] = {}
+        for d in daily:
+            bucket_counts = counts.setdefault(bucket_start(d['day'], bucket, tz), _empty_counts())
+            for sentiment in SENTIMENTS:
+                bucket_counts[sentiment] += d['sentiment'].get(sentiment, 0)
+            bucket_counts['total'] += d['comment_count']
+        return counts
+
+    async def _counts_from_hourly(
+        self,
+        channel_id: str,
+        user_id: Optional[str],
+        date_from: datetime,
+        date_to: datetime,
+        bucket: str,
+        tz: ZoneInfo
+    ) -> Dict[datetime, Dict[str, int]]:
+        hours = await rollup_service.get_hourly_counts(channel_id, user_id, date_from, date_to)
+
+        counts: Dict[datetime, Dict[str, int]] = {}
+        for h in hours:
+            bucket_counts = counts.setdefault(bucket_start(h['hour'], bucket, tz), _empty_counts())
+            bucket_counts['positive'] += h['positive']
+            bucket_counts['negative'] += h['negative']
+            bucket_counts['neutral'] += h['comment_count'] - h['positive'] - h['negative']  # Includes unanalyzed
+            bucket_counts['total'] += h['comment_count']
+        return counts
+
+    async def _counts_from_comments(
+        self,
+        channel_id: str,
+        user_id: Optional[str],
+        date_from: datetime,
+        date_to: datetime,
+        bucket: str,
+        tz: ZoneInfo
+    ) -> Dict[datetime, Dict[str, int]]:
+        db = get_database()
+
+        match_stage = {"channel_id": channel_id, "published_at": {"$gte": date_from, "$lte": date_to}}
+        if user_id:
+            match_stage["user_id"] = user_id
+
+        trunc = {"date": "$published_at", "unit": bucket, "timezone": tz.key}
+        if bucket == "week":
+            trunc["startOfWeek"] = "monday"
+
+        pipeline = [
+            {"$match": match_stage},
+            {
+                "$group": {
+                    "_id": {"bucket": {"$dateTrunc": trunc}, "sentiment": "$sentiment"},
+                    "count": {"$sum": 1}
+                }
+            }
+        ]
+
+        counts: Dict[datetime, Dict[str, int]] = {}
+        async for result in db.comments.aggregate(pipeline, allowDiskUse=True):
+            bucket_counts = counts.setdefault(result['_id']['bucket'], _empty_counts())
+            sentiment = result['_id']['sentiment'] or 'neutral'
+            bucket_counts[sentiment] = bucket_counts.get(sentiment, 0) + result['count']
+            bucket_counts['total'] += result['count']
+        return counts
+
+    async def get_series(
+        self,
+        channel_id: str,
+        user_id: Optional[str] = None,
+        bucket: str = "day",
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        tz_name: str = "UTC",
+        compare: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Get a dense sentiment series over [date_from, date_to] in the creator's
+        timezone. With compare, each bucket also carries the matching bucket
+        of the preceding period of equal length, plus overall changes.
+        Raises ValueError for an unknown bucket, timezone or oversized range.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+        try:
+            tz = ZoneInfo(tz_name)
+        except Exception:
+            raise ValueError(f"Unknown timezone: {tz_name}")
+
+        date_to = _to_utc_naive(date_to) if date_to else datetime.utcnow()
+        date_from = _to_utc_naive(date_from) if date_from else date_to - timedelta(days=30)
+        if date_from > date_to:
+            raise ValueError("date_from must be before date_to")
+
+        starts = enumerate_buckets(date_from, date_to, bucket, tz)
+        # Buckets are always whole, so the range starts on a bucket boundary
+        date_from = starts[0]
+
+        # Extend the scan back over the previous period so both come from one pass
+        query_from = date_from
+        previous_starts = []
+        if compare:
+            query_from = bucket_start(date_from - (date_to - date_from), bucket, tz)
+            previous_starts = enumerate_buckets(query_from, date_from - timedelta(microseconds=1), bucket, tz)
+
+        if bucket != "hour" and tz.key == "UTC" and await rollup_service.is_ready(channel_id, user_id):
+            counts = await self._counts_from_rollups(channel_id, user_id, query_from, date_to, bucket, tz)
+        elif whole_hour_offsets(tz, query_from, date_to) and await rollup_service.hourly_ready(channel_id, user_id):
+            counts = await self._counts_from_hourly(channel_id, user_id, query_from, date_to, bucket, tz)
+        else:
+            counts = await self._counts_from_comments(channel_id, user_id, query_from, date_to, bucket, tz)
+
+        # Align previous buckets to the end of the previous period
+        previous_starts = previous_starts[-len(starts):] if previous_starts else []
+        offset = len(starts) - len(previous_starts)
+
+        label_format = "%Y-%m-%dT%H:00" if bucket == "hour" else "%Y-%m-%d"
+        series = []
+        totals = _empty_counts()
+        previous_totals = _empty_counts()
+
+        for i, start in enumerate(starts):
+            point_counts = counts.get(start, _empty_counts())
+            point = {
+                "start": start.replace(tzinfo=timezone.utc).isoformat(),
+                "label": start.replace(tzinfo=timezone.utc).astimezone(tz).strftime(label_format),
+                **point_counts
+            }
+            for key in totals:
+                totals[key] += point_counts[key]
+
+            if compare:
+                previous = counts.get(previous_starts[i - offset], _empty_counts()) if i >= offset else _empty_counts()
+                point["previous"] = previous
+                point["change"] = _change(point_counts['total'], previous['total'])
+
+            series.append(point)
+
+        if compare:
+            for start in previous_starts:
+                for key in previous_totals:
+                    previous_totals[key] += counts.get(start, _empty_counts())[key]
+
+        result = {
+            "bucket": bucket,
+            "timezone": tz.key,
+            "date_from": date_from,
+            "date_to": date_to,
+            "series": series,
+            "totals": totals
+        }
+        if compare:
+            result["previous_totals"] = previous_totals
+            result["change"] = {key: _change(totals[key], previous_totals[key]) for key in totals}
+
+        return result
+
+
+# Singleton instance
+series_service = SeriesService()
@@ -0,0 +1,297 @@
+"""
+Mergeable sketches for analytics.
+
+HyperLogLog sketches of unique commenters are kept per (user, channel, day).
+Registers are stored sparsely as a sub-document and updated with $max,
+which makes ingest atomic under parallel video processing and idempotent
+across re-syncs. Unique commenters over any range are estimated by
+merging the daily sketches it covers (day granularity, ~2.3% error).
+
+TDigest summarizes a value distribution (likes, replies) in a bounded
+number of centroids that merge across days and videos for quantiles.
+"""
+import hashlib
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+from app.database import get_database
+
+PRECISION = 11
+REGISTERS = 1 << PRECISION
+DIGEST_COMPRESSION = 100
+
+
+def _start_of_day(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class HyperLogLog:
+    """Mergeable HyperLogLog cardinality estimator."""
+
+    def __init__(self, registers: Optional[Dict[int, int]] = None):
+        self.registers: Dict[int, int] = dict(registers or {})
+
+    @staticmethod
+    def hash_position(value: str):
+        """Return (register index, rank) for a value."""
+        h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - PRECISION)
+        remaining = h & ((1 << (64 - PRECISION)) - 1)
+        rank = (64 - PRECISION) - remaining.bit_length() + 1
+        return index, rank
+
+    def add(self, value: str):
+        index, rank = self.hash_position(value)
+        if rank > self.registers.get(index, 0):
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        for index, rank in other.registers.items():
+            if rank > self.registers.get(index, 0):
+                self.registers[index] = rank
+
+    def estimate(self) -> int:
+        m = REGISTERS
+        alpha = 0.7213 / (1 + 1.079 / m)
+        zeros = m - len(self.registers)
+        harmonic = zeros + sum(2.0 ** -rank for rank in self.registers.values())
+        raw = alpha * m * m / harmonic
+
+        # Linear counting is more accurate for small cardinalities
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "HyperLogLog":
+        return cls({int(k): v for k, v in doc.get('registers', {}).items()})
+
+
+class TDigest:
+    """Mergeable t-digest for approximate quantiles."""
+
+    def __init__(self, centroids: Optional[List[List[float]]] = None, min_value=None, max_value=None):
+        self.centroids: List[List[float]] = [list(c) for c in centroids or []]
+        self.min = min_value
+        self.max = max_value
+
+    @property
+    def count(self) -> int:
+        return int(sum(weight for _, weight in self.centroids))
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> "TDigest":
+        values = sorted(values)
+        if not values:
+            return cls()
+        digest = cls([[float(v), 1] for v in values], values[0], values[-1])
+        digest.compress()
+        return digest
+
+    @staticmethod
+    def _scale(q: float) -> float:
+        """k1 scale function: small centroids near the tails, large in the middle."""
+        return DIGEST_COMPRESSION / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    @staticmethod
+    def _inverse_scale(k: float) -> float:
+        """Quantile at which the k1 scale reaches k."""
+        if k >= DIGEST_COMPRESSION / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / DIGEST_COMPRESSION) + 1) / 2
+
+    def compress(self):
+        """Merge adjacent centroids while each spans at most one unit of k."""
+        if not self.centroids:
+            return
+
+        data = np.asarray(self.centroids, dtype=float)
+        data = data[np.argsort(data[:, 0], kind="stable")]
+        cumulative = np.cumsum(data[:, 1])
+        total = cumulative[-1]
+
+        # Each centroid absorbs the following ones up to its k limit, so jump straight there
+        starts = []
+        start = 0
+        while start < len(data):
+            starts.append(start)
+            weight_before = cumulative[start - 1] if start else 0.0
+            limit = self._inverse_scale(self._scale(weight_before / total) + 1) * total
+            start = max(start, int(np.searchsorted(cumulative, limit, side="right")) - 1) + 1
+
+        weights = np.add.reduceat(data[:, 1], starts)
+        means = np.add.reduceat(data[:, 0] * data[:, 1], starts) / weights
+        self.centroids = [[float(mean), float(weight)] for mean, weight in zip(means, weights)]
+
+    def merge(self, other: "TDigest"):
+        if not other.centroids:
+            return
+        self.centroids.extend(other.centroids)
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.compress()
+
+    @classmethod
+    def merge_all(cls, digests: Iterable["TDigest"]) -> "TDigest":
+        """Merge many digests with a single compression pass."""
+        merged = cls()
+        for digest in digests:
+            if not digest.centroids:
+                continue
+            merged.centroids.extend(digest.centroids)
+            merged.min = digest.min if merged.min is None else min(merged.min, digest.min)
+            merged.max = digest.max if merged.max is None else max(merged.max, digest.max)
+        merged.compress()
+        return merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the value at quantile q by interpolating between centroid centers."""
+        if not self.centroids:
+            return None
+
+        target = q * self.count
+        previous_position, previous_value = 0.0, self.min
+        position = 0.0
+        for mean, weight in self.centroids:
+            center = position + weight / 2
+            if target < center:
+                span = center - previous_position
+                fraction = (target - previous_position) / span if span else 0
+                return previous_value + (mean - previous_value) * fraction
+            previous_position, previous_value = center, mean
+            position += weight
+
+        span = self.count - previous_position
+        fraction = (target - previous_position) / span if span else 1
+        return previous_value + (self.max - previous_value) * min(fraction, 1)
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {"centroids": self.centroids, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_doc(cls, doc: Optional[Dict[str, Any]]) -> "TDigest":
+        if not doc:
+            return cls()
+        return cls(doc.get('centroids'), doc.get('min'), doc.get('max'))
+
+
+class SketchService:
+    """Service for maintaining and querying unique-commenter sketches."""
+
+    def _daily_updates(self, channel_id: str, user_id: str, comments: Iterable[Dict[str, Any]]) -> List[UpdateOne]:
+        """Build $max register updates per day for a set of comments."""
+        by_day: Dict[datetime, HyperLogLog] = {}
+        for comment in comments:
+            author = comment.get('author_channel_id')
+            if not author or not comment.get('published_at'):
+                continue
+            by_day.setdefault(_start_of_day(comment['published_at']), HyperLogLog()).add(author)
+
+        return [
+            UpdateOne(
+                {"user_id": user_id, "channel_id": channel_id, "day": day},
+                {"$max": {f"registers.{index}": rank for index, rank in sketch.registers.items()}},
+                upsert=True
+            )
+            for day, sketch in by_day.items()
+        ]
+
+    async def add_comments(self, channel_id: str, user_id: str, comments: List[Dict[str, Any]]):
+        """Fold ingested comments into the daily sketches."""
+        ops = self._daily_updates(channel_id, user_id, comments)
+        if ops:
+            db = get_database()
+            await db.commenter_sketches.bulk_write(ops, ordered=False)
+
+    async def rebuild_channel(self, channel_id: str, user_id: str):
+        """Regenerate a channel's sketches from its comments."""
+        db = get_database()
+
+        await db.commenter_sketches.delete_many({"channel_id": channel_id, "user_id": user_id})
+
+        cursor = db.comments.find(
+            {"channel_id": channel_id, "user_id": user_id},
+            {"author_channel_id": 1, "published_at": 1, "_id": 0}
+        ).batch_size(10000)
+
+        batch = []
+        async for comment in cursor:
+            batch.append(comment)
+            if len(batch) >= 10000:
+                await self.add_comments(channel_id, user_id, batch)
+                batch = []
+        await self.add_comments(channel_id, user_id, batch)
+
+        await db.channels.update_one(
+            {"channel_id": channel_id, "user_id": user_id},
+            {"$set": {"sketches_ready": True}}
+        )
+
+    async def is_ready(self, channel_id: str, user_id: Optional[str] = None) -> bool:
+        """Check that sketches have been built for the channel."""
+        db = get_database()
+
+        query = {"channel_id": channel_id, "sketches_ready": {"$ne": True}}
+        if user_id:
+            query["user_id"] = user_id
+
+        return await db.channels.find_one(query, {"_id": 1}) is None
+
+    async def unique_commenters(
+        self,
+        channel_id: str,
+        user_id: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> int:
+        """Estimate distinct commenters over the days overlapping [date_from, date_to]."""
+        db = get_database()
+
+        query = {"channel_id": channel_id}
+        if user_id:
+            query["user_id"] = user_id
+        if date_from:
+            query.setdefault("day", {})["$gte"] = _start_of_day(date_from)
+        if date_to:
+            query.setdefault("day", {})["$lte"] = date_to
+
+        merged = HyperLogLog()
+        async for doc in db.commenter_sketches.find(query, {"registers": 1}):
+            merged.merge(HyperLogLog.from_doc(doc))
+
+        return merged.estimate()
+
+    async def daily_unique_commenters(
+        self,
+        channel_id: str,
+        user_id: Optional[str] = None,
+        days: int = 30
+    ) -> List[Dict[str, Any]]:
+        """Estimated distinct commenters per day, gap-filled, for the last N days."""
+        db = get_database()
+
+        first_day = _start_of_day(datetime.utcnow()) - timedelta(days=days - 1)
+        query = {"channel_id": channel_id, "day": {"$gte": first_day}}
+        if user_id:
+            query["user_id"] = user_id
+
+        by_day: Dict[datetime, HyperLogLog] = {}
+        async for doc in db.commenter_sketches.find(query, {"day": 1, "registers": 1}):
+            by_day.setdefault(doc['day'], HyperLogLog()).merge(HyperLogLog.from_doc(doc))
+
+        return [
+            {
+                "date": (first_day + timedelta(days=i)).strftime("%Y-%m-%d"),
+                "unique_commenters": by_day[first_day + timedelta(days=i)].estimate()
+                if first_day + timedelta(days=i) in by_day else 0
+            }
+            for i in range(days)
+        ]
+
+
+# Singleton instance
+sketch_service = SketchService()
@@ -5,6 +5,13 @@ from typing import Optional, List
 from app.database import get_database
 from app.services.youtube_service import youtube_service
 from app.services.local_analysis_service import local_analysis_service
+from app.services.retrieval_service import retrieval_service
+from app.services.chat_cache_service import chat_cache_service
+from app.services.rollup_service import rollup_service, ROLLUP_VERSION
+from app.services.sketch_service import sketch_service
+from app.services.columnar_service import columnar_service
+from app.services.analytics_cache_service import analytics_cache_service
+from app.services.anomaly_service import anomaly_service
 
 
 class SyncService:
@@ -13,6 +20,9 @@ class SyncService:
     # Number of videos to process in parallel
     PARALLEL_BATCH_SIZE = 50
     
+    # Anomaly alerts pushed to the log stream per sync
+    MAX_ALERTS_LOGGED = 5
+    
     def __init__(self):
         # In-memory listeners for SSE: channel_id -> list of asyncio.Queue
         self.listeners: dict[str, list[asyncio.Queue]] = {}
@@ -31,6 +41,18 @@ class SyncService:
             if not self.listeners[channel_id]:
                 del self.listeners[channel_id]
 
+    @staticmethod
+    def _describe_anomaly(anomaly: dict) -> str:
+        """Format an anomaly as a log stream alert."""
+        target = f"\"{anomaly.get('title') or anomaly['video_id']}\"" if anomaly['video_id'] else "the channel"
+        kind = "Negative wave" if anomaly['metric'] == "negative" else "Comment spike"
+        noun = "negative comments" if anomaly['metric'] == "negative" else "comments"
+        return (
+            f"🚨 alert: {kind} on {target}: {anomaly['value']} {noun} "
+            f"at {anomaly['hour'].strftime('%Y-%m-%d %H:00')} UTC "
+            f"(baseline {anomaly['expected']}, z={anomaly['zscore']})"
+        )
+    
     async def _log_event(self, channel_id: str, user_id: str, message: str, level: str = "info"):
         """Log a sync event to the database and broadcast to listeners."""
         # 1. Save to DB (Persistence)
@@ -100,6 +122,7 @@ class SyncService:
             
             total_comments = 0
             total_videos = 0
+            synced_video_ids = []
             
             print(f"🚀 Starting parallel sync for {len(videos)} videos (batch size: {self.PARALLEL_BATCH_SIZE})")
             
@@ -121,7 +144,7 @@ class SyncService:
                 
                 # Collect results
                 batch_comments = 0
-                for result in results:
+                for video, result in zip(batch, results):
                     if isinstance(result, Exception):
                         print(f"   ❌ Error processing video: {result}")
                         await self._log_event(channel_id, user_id, f"❌ error: Analysis failed for video segment: {str(result)}", "error")
@@ -130,11 +153,34 @@ class SyncService:
                         batch_comments += comments
                         total_comments += comments
                         total_videos += 1
+                        synced_video_ids.append(video['video_id'])
                 
                 await self._log_event(channel_id, user_id, f"✅ memory: Integrated {batch_comments} new data points from batch {batch_num}.", "success")
                 print(f"   ✅ Batch complete! Total: {total_videos} videos, {total_comments} comments")
             
-            # Update channel stats
+            # Backfill rollups for channels synced before they (or their current fields) existed
+            channel = await db.channels.find_one(
+                {"channel_id": channel_id, "user_id": user_id},
+                {"rollups_ready": 1, "rollups_version": 1, "sketches_ready": 1}
+            )
+            if channel and (not channel.get('rollups_ready') or channel.get('rollups_version', 0) < ROLLUP_VERSION):
+                await self._log_event(channel_id, user_id, "📊 memory: Building analytics rollups...", "info")
+                await rollup_service.rebuild_channel(channel_id, user_id)
+            if channel and not channel.get('sketches_ready'):
+                await self._log_event(channel_id, user_id, "📊 memory: Building commenter sketches...", "info")
+                await sketch_service.rebuild_channel(channel_id, user_id)
+            
+            # Scan the hourly series for spikes up to the last complete hour
+            try:
+                anomalies = await anomaly_service.detect(channel_id, user_id, synced_video_ids)
+                for anomaly in anomalies[:self.MAX_ALERTS_LOGGED]:
+                    await self._log_event(channel_id, user_id, self._describe_anomaly(anomaly), "warning")
+                if len(anomalies) > self.MAX_ALERTS_LOGGED:
+                    await self._log_event(channel_id, user_id, f"🚨 alert: {len(anomalies) - self.MAX_ALERTS_LOGGED} more spikes detected. See channel alerts.", "warning")
+            except Exception as e:
+                print(f"   ⚠️ Anomaly detection failed: {e}")
+            
+            # Update channel stats and bump the data version
             await db.channels.update_one(
                 {"channel_id": channel_id, "user_id": user_id},
                 {
@@ -143,9 +189,13 @@ class SyncService:
                         "total_comments": total_comments,
                         "total_videos_analyzed": total_videos,
                         "last_synced": datetime.utcnow()
-                    }
+                    },
+                    "$inc": {"data_version": 1}
                 }
             )
+            chat_cache_service.invalidate(channel_id, user_id)
+            columnar_service.invalidate(channel_id, user_id)
+            analytics_cache_service.invalidate(channel_id, user_id)
             
             success_msg = f"🎉 completion: Sync successful. Knowledge base expanded by {total_videos} videos & {total_comments} comments."
             print(f"\n{success_msg}")
@@ -230,10 +280,19 @@ class SyncService:
             ]
             await db.comments.bulk_write(bulk_ops)
             
+            # Keep the chat retrieval index current
+            retrieval_service.add_comments(channel_id, user_id, comments_to_save)
+            
+            # Fold commenters into the daily unique-commenter sketches
+            await sketch_service.add_comments(channel_id, user_id, comments_to_save)
+            
             # Update commenters (batch) with user_id
             for comment in comments_to_save:
                 await self._update_commenter(comment, user_id)
         
+        # Refresh this video's daily rollups
+        await rollup_service.rebuild_video(channel_id, user_id, video['video_id'])
+        
         # Update video analyzed count
         await db.videos.update_one(
             {"video_id": video['video_id'], "user_id": user_id},
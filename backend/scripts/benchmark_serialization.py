@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import CommentResponse, CommentCompact, CommentsPaginated
+from app.responses import FastJSONResponse, trusted_dump
+
+SENTIMENTS = ["positive", "neutral", "negative"]
+WORDS = ["great", "video", "love", "tutorial", "thanks", "audio", "music", "editing", "camera", "lighting"]
+
+
+def make_documents(count: int) -> list:
+    """Comment documents as Motor returns them: ObjectIds, datetimes and every stored field."""
+    now = datetime.utcnow().replace(microsecond=0)
+    return [
+        {
+            "_id": ObjectId(),
+            "comment_id": f"comment{i}",
+            "video_id": f"video{i % 20}",
+            "channel_id": "UCbenchmarkchannel000000",
+            "user_id": "benchmark-user",
+            "author_name": f"Author {i}",
+            "author_channel_id": f"author{i}",
+            "author_profile_image": f"https://yt3.ggpht.com/ytc/{ObjectId()}=s48-c-k-c0x00ffffff-no-rj",
+            "text": " ".join(random.choices(WORDS, k=random.randrange(5, 60))),
+            "like_count": random.randrange(500),
+            "reply_count": random.randrange(20),
+            "published_at": now - timedelta(seconds=random.randrange(365 * 86400)),
+            "updated_at": now,
+            "parent_id": None,
+            "sentiment": random.choice(SENTIMENTS),
+            "sentiment_score": round(random.uniform(-1, 1), 3),
+            "tags": random.sample(["question", "feedback", "praise"], k=random.randrange(3)),
+            "is_bookmarked": random.random() < 0.05,
+            "is_reply": False,
+            "created_at": now,
+            "video_title": f"Video {i % 20}"
+        }
+        for i in range(count)
+    ]
+
+
+async def validated_page(documents: list, field) -> bytes:
+    """The previous path: a model per document, then FastAPI re-validates and json.dumps the page."""
+    docs = [dict(d, _id=str(d["_id"])) for d in documents]
+    page = CommentsPaginated(items=[CommentResponse(**c) for c in docs], total=len(docs), page=1, limit=len(docs), pages=1)
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+def trusted_page(documents: list, model=CommentResponse) -> bytes:
+    """The fast path: shape trusted documents without validation and encode with orjson."""
+    return FastJSONResponse({
+        "items": [trusted_dump(model, c) for c in documents],
+        "total": len(documents),
+        "page": 1,
+        "limit": len(documents),
+        "pages": 1,
+        "next_cursor": None,
+        "total_is_lower_bound": False
+    }).body
+
+
+def measure(label: str, fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    median = statistics.median(timings)
+    print(f"   {label:<34} median {median:7.3f} ms   min {min(timings):7.3f} ms   {len(body):>8,} bytes")
+    return median
+
+
+def benchmark(args):
+    documents = make_documents(args.items)
+    field = create_response_field(name="response", type_=CommentsPaginated)
+    loop = asyncio.new_event_loop()
+
+    def before():
+        return loop.run_until_complete(validated_page(documents, field))
+
+    # Same response either way
+    assert json.loads(before()) == json.loads(trusted_page(documents)), "Fast path output differs"
+
+    print(f"⏱️  Serializing a {args.items}-item comment page ({args.runs} runs):")
+    slow = measure("validate + stdlib json", before, args.runs)
+    fast = measure("trusted_dump + orjson", lambda: trusted_page(documents), args.runs)
+    compact = measure("compact view + orjson", lambda: trusted_page(documents, CommentCompact), args.runs)
+    print(f"   speedup: {slow / fast:.1f}x full, {slow / compact:.1f}x compact")
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark comment page serialization")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=200)
+    benchmark(parser.parse_args())
@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import app.database as database
+from app.config import get_settings
+from app.services.analytics_service import analytics_service
+
+CHANNEL_ID = "UCbenchmarkchannel000000"
+USER_ID = "benchmark-user"
+SENTIMENTS = ["positive", "neutral", "negative"]
+
+
+async def seed(db, comments: int, videos: int, commenters: int):
+    """Insert a synthetic channel with the given number of comments."""
+    print(f"🌱 Seeding {comments:,} comments across {videos} videos...")
+    now = datetime.utcnow()
+
+    await db.videos.insert_many([
+        {"video_id": f"video{v}", "channel_id": CHANNEL_ID, "user_id": USER_ID, "title": f"Video {v}"}
+        for v in range(videos)
+    ])
+    await db.commenters.insert_many([
+        {"author_channel_id": f"author{a}", "channel_id": CHANNEL_ID, "user_id": USER_ID, "comment_count": 1}
+        for a in range(commenters)
+    ])
+
+    batch_size = 10000
+    for start in range(0, comments, batch_size):
+        await db.comments.insert_many([
+            {
+                "comment_id": f"comment{i}",
+                "video_id": f"video{i % videos}",
+                "channel_id": CHANNEL_ID,
+                "user_id": USER_ID,
+                "author_channel_id": f"author{random.randrange(commenters)}",
+                "text": "benchmark comment",
+                "like_count": random.randrange(50),
+                "published_at": now - timedelta(seconds=random.randrange(365 * 86400)),
+                "sentiment": random.choice(SENTIMENTS),
+                "tags": [],
+                "is_bookmarked": random.random() < 0.01
+            }
+            for i in range(start, min(start + batch_size, comments))
+        ])
+        print(f"   {min(start + batch_size, comments):,} / {comments:,}", end="\r")
+    print()
+
+
+async def sequential_summary(db) -> dict:
+    """The previous implementation: six sequential round trips."""
+    base_query = {"channel_id": CHANNEL_ID, "user_id": USER_ID}
+
+    total_comments = await db.comments.count_documents(base_query)
+    total_videos = await db.videos.count_documents(base_query)
+    unique_commenters = await db.commenters.count_documents(base_query)
+    bookmarked = await db.comments.count_documents({**base_query, "is_bookmarked": True})
+    sentiment = await db.comments.aggregate([
+        {"$match": base_query},
+        {"$group": {"_id": "$sentiment", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    recent = await db.comments.count_documents({
+        **base_query,
+        "published_at": {"$gte": datetime.utcnow() - timedelta(days=7)}
+    })
+
+    return {
+        "total_comments": total_comments,
+        "total_videos": total_videos,
+        "unique_commenters": unique_commenters,
+        "bookmarked_comments": bookmarked,
+        "sentiment": sentiment,
+        "recent_comments_7d": recent
+    }
+
+
+async def measure(label: str, fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    median = statistics.median(timings)
+    print(f"   {label:<28} median {median:8.1f} ms   min {min(timings):8.1f} ms")
+    return median
+
+
+async def benchmark(args):
+    settings = get_settings()
+    db_name = f"{settings.mongodb_db_name}_benchmark"
+
+    print(f"🔌 Connecting to benchmark database {db_name}...")
+    client = AsyncIOMotorClient(settings.mongodb_uri)
+    await client.drop_database(db_name)
+    database.client = client
+    database.db = client[db_name]
+    await database.create_indexes()
+
+    await seed(database.db, args.comments, args.videos, args.commenters)
+
+    # Warm up caches once so both variants start from the same state
+    await sequential_summary(database.db)
+
+    print(f"⏱️  Channel summary over {args.comments:,} comments ({args.runs} runs):")
+    before = await measure("sequential (6 round trips)", lambda: sequential_summary(database.db), args.runs)
+    after = await measure("$facet + gather", lambda: analytics_service.get_channel_summary(CHANNEL_ID, USER_ID), args.runs)
+    print(f"   speedup: {before / after:.2f}x")
+
+    if not args.keep:
+        await client.drop_database(db_name)
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the channel summary queries")
+    parser.add_argument("--comments", type=int, default=1_000_000)
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--commenters", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded database")
+    asyncio.run(benchmark(parser.parse_args()))
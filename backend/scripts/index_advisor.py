@@ -0,0 +1,495 @@
+"""
+Query-shape index advisor and explain-plan regression check.
+
+Seeds a scratch database with the app's own indexes, runs explain() in
+executionStats mode for every query shape the routes issue, and reports
+collection scans, in-memory sorts and how many keys/documents each query
+examines per document it needs. For flagged shapes it proposes a
+compound index ordered Equality, Sort, Range.
+
+    python scripts/index_advisor.py                    # report
+    python scripts/index_advisor.py --write-baseline   # accept the current plans
+    python scripts/index_advisor.py --check            # exit 1 on plan regressions
+
+--profile-db explains the shapes recorded by the MongoDB profiler in an
+existing database instead (enable it first with db.setProfilingLevel(2)).
+
+No baseline is committed and nothing runs --check automatically: plans
+depend on the MongoDB version and need a live server, and the repo has no
+test suite or CI to hook into. Until one exists, generate the baseline
+against the same MongoDB version as production with --write-baseline,
+commit scripts/index_baseline.json, and run --check by hand before
+changing indexes or the routes' queries. --check fails when the baseline
+is missing rather than passing on an empty one.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Tuple
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import app.database as database
+from app.config import get_settings
+from app.routes.comments import _build_comment_query
+from app.services.pagination_service import pagination_service, KEYSET_SORT
+from app.services.rollup_service import rollup_service
+
+CHANNEL_ID = "UCindexadvisorchannel000"
+USER_ID = "advisor-user"
+OTHER_USER_ID = "advisor-other-user"  # Second tenant tracking the same channel
+SENTIMENTS = ["positive", "neutral", "negative"]
+TAGS = ["question", "feedback", "spam", "praise", "bug"]
+WORDS = [
+    "great", "video", "love", "tutorial", "thanks", "audio", "music", "editing",
+    "camera", "lighting", "script", "intro", "ending", "sponsor", "subscribe",
+]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_baseline.json")
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$exists", "$regex"}
+
+
+@dataclass
+class QueryShape:
+    """One query a route issues, with representative values."""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: List[Tuple[str, Any]] = field(default_factory=list)
+    limit: int = 0
+    skip: int = 0
+    kind: str = "find"  # find | count | aggregate
+    pipeline_tail: List[Dict[str, Any]] = field(default_factory=list)
+    allow_sort: bool = False  # Relevance-ranked searches sort by textScore in memory
+
+
+async def seed(db, comments: int, videos: int):
+    """Insert a synthetic channel shared by two tenants."""
+    print(f"🌱 Seeding {comments:,} comments across {videos} videos...")
+    now = datetime.utcnow()
+
+    for user_id in (USER_ID, OTHER_USER_ID):
+        await db.channels.insert_one({"channel_id": CHANNEL_ID, "user_id": user_id, "name": "Advisor", "data_version": 1})
+        await db.videos.insert_many([
+            {
+                "video_id": f"video{v}", "channel_id": CHANNEL_ID, "user_id": user_id,
+                "title": f"Video {v}", "published_at": now - timedelta(days=v)
+            }
+            for v in range(videos)
+        ])
+
+    batch_size = 10000
+    for start in range(0, comments, batch_size):
+        await db.comments.insert_many([
+            {
+                "comment_id": f"comment{i}",
+                "video_id": f"video{i % videos}",
+                "channel_id": CHANNEL_ID,
+                "user_id": USER_ID if i % 2 else OTHER_USER_ID,
+                "author_channel_id": f"author{random.randrange(comments // 20 or 1)}",
+                "author_name": "Advisor",
+                "text": " ".join(random.choices(WORDS, k=8)),
+                "like_count": random.randrange(50),
+                "reply_count": random.randrange(5),
+                "published_at": now - timedelta(seconds=random.randrange(365 * 86400)),
+                "sentiment": random.choice(SENTIMENTS),
+                "tags": [random.choice(TAGS)] if random.random() < 0.05 else [],
+                "is_bookmarked": random.random() < 0.01
+            }
+            for i in range(start, min(start + batch_size, comments))
+        ])
+        print(f"   {min(start + batch_size, comments):,} / {comments:,}", end="\r")
+    print()
+
+    await db.commenters.insert_many([
+        {"author_channel_id": f"author{a}", "channel_id": CHANNEL_ID, "user_id": USER_ID, "comment_count": random.randrange(100)}
+        for a in range(comments // 20 or 1)
+    ])
+    await rollup_service.rebuild_channel(CHANNEL_ID, USER_ID)
+
+
+async def route_shapes(db) -> List[QueryShape]:
+    """The query shapes issued by the routes, built with the routes' own helpers where they exist."""
+    now = datetime.utcnow()
+    user = SimpleNamespace(google_id=USER_ID)
+    base = {"channel_id": CHANNEL_ID, "user_id": USER_ID}
+
+    # A cursor from deep in the listing, as a client paging forward would send
+    deep = await db.comments.find(base, {"published_at": 1}).sort(KEYSET_SORT).skip(5000).limit(1).to_list(1)
+    cursor = pagination_service.encode_cursor(deep[0]) if deep else None
+
+    def comments_query(**filters) -> Dict[str, Any]:
+        return _build_comment_query(CHANNEL_ID, user, **filters)
+
+    return [
+        QueryShape("comments.list", "comments", comments_query(), KEYSET_SORT, 51),
+        QueryShape("comments.list.cursor", "comments", pagination_service.after(comments_query(), cursor), KEYSET_SORT, 51),
+        QueryShape("comments.list.sentiment", "comments", comments_query(sentiment="negative"), KEYSET_SORT, 51),
+        QueryShape("comments.list.tags", "comments", comments_query(tags="question,bug"), KEYSET_SORT, 51),
+        QueryShape("comments.list.video", "comments", comments_query(video_id="video3"), KEYSET_SORT, 51),
+        QueryShape("comments.list.bookmarked", "comments", comments_query(is_bookmarked=True), KEYSET_SORT, 51),
+        QueryShape(
+            "comments.list.date_range", "comments",
+            comments_query(date_from=now - timedelta(days=30), date_to=now), KEYSET_SORT, 51
+        ),
+        QueryShape(
+            "comments.search", "comments",
+            comments_query(text_search={"$search": "tutorial lighting", "$language": "english"}),
+            [("search_score", {"$meta": "textScore"})], 50, allow_sort=True
+        ),
+        QueryShape("comments.count", "comments", comments_query(), kind="count"),
+        QueryShape("comments.count.sentiment", "comments", comments_query(sentiment="negative"), kind="count"),
+        QueryShape("comments.export", "comments", comments_query(), [("published_at", 1)]),
+        QueryShape(
+            "comments.video", "comments", {"video_id": "video3", "user_id": USER_ID}, KEYSET_SORT, 51
+        ),
+        QueryShape(
+            "comments.commenter_recent", "comments",
+            {"author_channel_id": "author7", "channel_id": CHANNEL_ID, "user_id": USER_ID},
+            [("published_at", -1)], 20
+        ),
+        QueryShape(
+            "comments.sentiment_breakdown", "comments", base, kind="aggregate",
+            pipeline_tail=[{"$group": {"_id": "$sentiment", "count": {"$sum": 1}}}]
+        ),
+        QueryShape("videos.list", "videos", base, [("published_at", -1)], 50),
+        QueryShape("commenters.top", "commenters", base, [("comment_count", -1)], 10),
+        QueryShape(
+            "daily_rollups.range", "daily_rollups",
+            {**base, "day": {"$gte": now - timedelta(days=90), "$lt": now}}, [("day", 1)]
+        ),
+        QueryShape("reports.list", "reports", base, [("created_at", -1)], 50),
+        QueryShape(
+            "reports.reusable", "reports",
+            {**base, "date_from": now - timedelta(days=7), "date_to": now, "data_version": 1,
+             "status": {"$in": ["completed", "generating"]}},
+            [("created_at", -1)], 1
+        ),
+        QueryShape(
+            "report_schedules.due", "report_schedules",
+            {"active": True, "next_run_at": {"$lte": now}}, [("next_run_at", 1)], 500
+        ),
+        QueryShape("anomalies.alerts", "anomalies", base, [("hour", -1)], 50),
+        QueryShape(
+            "chat_history.recent", "chat_history",
+            {"channel_id": CHANNEL_ID, "type": {"$ne": "summary"}, "user_id": USER_ID},
+            [("created_at", -1)], 20
+        ),
+        QueryShape("channel_logs.recent", "channel_logs", base, [("created_at", -1)], 50),
+    ]
+
+
+def _shape_of(value: Any) -> Any:
+    """Replace concrete values with their type names, keeping operators and field names."""
+    if isinstance(value, dict):
+        return {k: _shape_of(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_shape_of(v) for v in value[:1]]
+    return type(value).__name__
+
+
+async def recorded_shapes(db, top: int) -> List[QueryShape]:
+    """Distinct query shapes from system.profile, most frequent first, each with its first example."""
+    shapes: Dict[str, QueryShape] = {}
+    counts: Dict[str, int] = {}
+
+    async for entry in db["system.profile"].find({"op": {"$in": ["query", "command"]}}):
+        command = entry.get("command", {})
+        if "find" in command:
+            shape = QueryShape(
+                "", command["find"], command.get("filter", {}), list(command.get("sort", {}).items()),
+                command.get("limit", 0), command.get("skip", 0)
+            )
+        elif "count" in command:
+            shape = QueryShape("", command["count"], command.get("query", {}), kind="count")
+        elif "aggregate" in command and command.get("pipeline") and "$match" in command["pipeline"][0]:
+            shape = QueryShape(
+                "", command["aggregate"], command["pipeline"][0]["$match"], kind="aggregate",
+                pipeline_tail=command["pipeline"][1:]
+            )
+        else:
+            continue
+
+        key = json.dumps({
+            "kind": shape.kind, "collection": shape.collection, "filter": _shape_of(shape.filter),
+            "sort": shape.sort, "tail": [list(stage)[0] for stage in shape.pipeline_tail]
+        }, sort_keys=True, default=str)
+        if key not in shapes:
+            shape.name = f"{shape.collection}.{shape.kind}#{len(shapes) + 1}"
+            shapes[key] = shape
+        counts[key] = counts.get(key, 0) + 1
+
+    ranked = sorted(shapes, key=lambda k: counts[k], reverse=True)[:top]
+    for key in ranked:
+        shapes[key].name += f" (x{counts[key]})"
+    return [shapes[key] for key in ranked]
+
+
+def _explain_command(shape: QueryShape) -> Dict[str, Any]:
+    sort = dict(shape.sort)
+    if shape.kind == "count":
+        return {"count": shape.collection, "query": shape.filter}
+    if shape.kind == "aggregate":
+        pipeline = [{"$match": shape.filter}]
+        if sort:
+            pipeline.append({"$sort": sort})
+        if shape.limit:
+            pipeline.append({"$limit": shape.limit})
+        return {"aggregate": shape.collection, "pipeline": pipeline + shape.pipeline_tail, "cursor": {}}
+
+    command = {"find": shape.collection, "filter": shape.filter}
+    if sort:
+        command["sort"] = sort
+        # Sorting on textScore needs the score projected under the same name
+        meta = {name: key for name, key in shape.sort if isinstance(key, dict)}
+        if meta:
+            command["projection"] = meta
+    if shape.skip:
+        command["skip"] = shape.skip
+    if shape.limit:
+        command["limit"] = shape.limit
+    return command
+
+
+def _first(node: Any, key: str) -> Optional[Any]:
+    """The first value stored under key anywhere in an explain document, skipping rejected plans."""
+    if isinstance(node, dict):
+        if key in node:
+            return node[key]
+        for name, child in node.items():
+            if name != "rejectedPlans":
+                found = _first(child, key)
+                if found is not None:
+                    return found
+    elif isinstance(node, list):
+        for child in node:
+            found = _first(child, key)
+            if found is not None:
+                return found
+    return None
+
+
+def _stages(plan: Any) -> List[Dict[str, Any]]:
+    """Plan stages from the root down."""
+    if isinstance(plan, dict):
+        own = [plan] if "stage" in plan else []
+        return own + [s for name, child in plan.items() if name != "stage" for s in _stages(child)]
+    if isinstance(plan, list):
+        return [s for child in plan for s in _stages(child)]
+    return []
+
+
+def _needed(shape: QueryShape, matched: int) -> int:
+    """How many documents the query genuinely has to read."""
+    if shape.kind == "find" and shape.limit:
+        return min(matched, shape.skip + shape.limit)
+    return matched
+
+
+async def analyze(db, shape: QueryShape, max_ratio: float) -> Dict[str, Any]:
+    """Explain a shape and flag collection scans, in-memory sorts and excessive examination."""
+    explain = await db.command("explain", _explain_command(shape), verbosity="executionStats")
+    stages = _stages(_first(explain, "winningPlan"))
+    stats = _first(explain, "executionStats") or {}
+
+    keys = stats.get("totalKeysExamined", 0)
+    docs = stats.get("totalDocsExamined", 0)
+    matched = await db[shape.collection].count_documents(shape.filter)
+    ratio = max(keys, docs) / max(_needed(shape, matched), 1)
+
+    names = [s["stage"] for s in stages]
+    indexes = sorted({s["indexName"] for s in stages if s.get("indexName")})
+
+    flags = []
+    if "COLLSCAN" in names:
+        flags.append("COLLSCAN")
+    if "SORT" in names and not shape.allow_sort:
+        flags.append("SORT")
+    if ratio > max_ratio and max(keys, docs) > 100:
+        flags.append("RATIO")
+
+    return {
+        "plan": " <- ".join(names),
+        "indexes": indexes,
+        "keys_examined": keys,
+        "docs_examined": docs,
+        "matched": matched,
+        "ratio": round(ratio, 2),
+        "flags": flags,
+    }
+
+
+def _conditions(query: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """(field, condition) pairs of a filter, flattening $and and treating $or branches as ranges."""
+    pairs = []
+    for key, value in query.items():
+        if key == "$and":
+            for clause in value:
+                pairs.extend(_conditions(clause))
+        elif key == "$or":
+            for clause in value:
+                pairs.extend((f, {"$gt": None}) for f, _ in _conditions(clause))
+        elif not key.startswith("$"):
+            pairs.append((key, value))
+    return pairs
+
+
+def propose_index(shape: QueryShape) -> Optional[List[Tuple[str, int]]]:
+    """A compound index for a shape: equality fields, then the sort, then range fields."""
+    if "$text" in shape.filter:
+        return None  # Served by the text index
+
+    equality, multi, ranges = [], [], []
+    for name, condition in _conditions(shape.filter):
+        operators = set(condition) if isinstance(condition, dict) else set()
+        if not operators or operators == {"$eq"}:
+            equality.append(name)
+        elif operators == {"$in"}:
+            multi.append(name)
+        elif operators & RANGE_OPERATORS:
+            ranges.append(name)
+
+    keys: List[Tuple[str, int]] = []
+    for name in equality + multi:
+        keys.append((name, 1))
+    for name, direction in shape.sort:
+        if isinstance(direction, int):
+            keys.append((name, direction))
+    for name in ranges:
+        keys.append((name, 1))
+
+    seen, unique = set(), []
+    for name, direction in keys:
+        if name not in seen:
+            seen.add(name)
+            unique.append((name, direction))
+    return unique or None
+
+
+def _format_index(keys: List[Tuple[str, int]]) -> str:
+    return "[" + ", ".join(f'("{name}", {direction})' for name, direction in keys) + "]"
+
+
+def regressions(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Shapes whose plans got worse than the accepted baseline (or are flagged without one)."""
+    problems = []
+    for name, result in results.items():
+        accepted = baseline.get(name)
+        if accepted is None:
+            if result["flags"]:
+                problems.append(f"{name}: {', '.join(result['flags'])} (no baseline)")
+            continue
+        new_flags = [f for f in result["flags"] if f not in accepted["flags"]]
+        if new_flags:
+            problems.append(f"{name}: new {', '.join(new_flags)} (was {accepted['plan']})")
+        elif result["ratio"] > accepted["ratio"] * tolerance + 1:
+            problems.append(f"{name}: examines {result['ratio']}x per needed document (baseline {accepted['ratio']}x)")
+    return problems
+
+
+async def unused_indexes(db, shapes: List[QueryShape], results: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Non-unique, non-TTL indexes that no explained shape used."""
+    used = {(s.collection, index) for s in shapes for index in results[s.name]["indexes"]}
+    unused = []
+    for collection in sorted({s.collection for s in shapes}):
+        async for index in db[collection].list_indexes():
+            if index["name"] == "_id_" or index.get("unique") or "expireAfterSeconds" in index:
+                continue
+            if (collection, index["name"]) not in used:
+                unused.append(f"{collection}.{index['name']}")
+    return unused
+
+
+def report(shapes: List[QueryShape], results: Dict[str, Dict[str, Any]]):
+    print(f"\n{'shape':<34} {'flags':<18} {'ratio':>8} {'keys':>9} {'docs':>9}  plan")
+    for shape in shapes:
+        r = results[shape.name]
+        flags = ",".join(r["flags"]) or "ok"
+        print(f"{shape.name:<34} {flags:<18} {r['ratio']:>8} {r['keys_examined']:>9} {r['docs_examined']:>9}  {r['plan']}")
+
+    proposals = {}
+    for shape in shapes:
+        if results[shape.name]["flags"]:
+            keys = propose_index(shape)
+            if keys:
+                proposals.setdefault((shape.collection, _format_index(keys)), []).append(shape.name)
+
+    if proposals:
+        print("\n💡 Proposed compound indexes:")
+        for (collection, keys), names in proposals.items():
+            print(f"   db.{collection}.create_index({keys})  # {', '.join(names)}")
+
+
+async def main(args) -> int:
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongodb_uri)
+
+    if args.profile_db:
+        db = client[args.profile_db]
+        shapes = await recorded_shapes(db, args.top)
+        print(f"📼 {len(shapes)} recorded query shape(s) from {args.profile_db}.system.profile")
+    else:
+        db_name = f"{settings.mongodb_db_name}_index_advisor"
+        print(f"🔌 Connecting to scratch database {db_name}...")
+        await client.drop_database(db_name)
+        database.client = client
+        database.db = db = client[db_name]
+        await database.create_indexes()
+        await seed(db, args.comments, args.videos)
+        shapes = await route_shapes(db)
+
+    results = {shape.name: await analyze(db, shape, args.max_ratio) for shape in shapes}
+    report(shapes, results)
+
+    if not args.profile_db:
+        unused = await unused_indexes(db, shapes, results)
+        if unused:
+            print("\n🧹 Indexes no route query used: " + ", ".join(unused))
+
+    status = 0
+    if args.write_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\n📝 Baseline written to {args.baseline}")
+    elif args.check and not os.path.exists(args.baseline):
+        print(f"\n❌ No baseline at {args.baseline}; run with --write-baseline first")
+        status = 1
+    elif args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = regressions(results, baseline, args.tolerance)
+        if problems:
+            print("\n❌ Query plan regressions:")
+            for problem in problems:
+                print(f"   {problem}")
+            status = 1
+        else:
+            print("\n✅ No query plan regressions")
+
+    if not args.profile_db and not args.keep:
+        await client.drop_database(db.name)
+    client.close()
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explain route query shapes and propose compound indexes")
+    parser.add_argument("--comments", type=int, default=200_000)
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--max-ratio", type=float, default=10.0, help="Examined per needed document before flagging")
+    parser.add_argument("--check", action="store_true", help="Exit 1 when plans regress against the baseline")
+    parser.add_argument("--write-baseline", action="store_true", help="Accept the current plans as the baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=2.0, help="Allowed growth of the examined ratio in --check")
+    parser.add_argument("--profile-db", help="Explain shapes recorded by the profiler in this database instead")
+    parser.add_argument("--top", type=int, default=30, help="Recorded shapes to explain with --profile-db")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded database")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,41 @@
+import asyncio
+import os
+import sys
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import connect_to_mongo, get_database, close_mongo_connection
+from app.services.rollup_service import rollup_service
+from app.services.sketch_service import sketch_service
+
+async def rebuild_rollups(channel_id: str = None):
+    print("🔌 Connecting to database...")
+    await connect_to_mongo()
+    db = get_database()
+    
+    query = {"channel_id": channel_id} if channel_id else {}
+    channels = await db.channels.find(query, {"channel_id": 1, "user_id": 1, "name": 1}).to_list(None)
+    print(f"📊 Rebuilding daily rollups and commenter sketches for {len(channels)} channel(s)...")
+    
+    for channel in channels:
+        try:
+            await rollup_service.rebuild_channel(channel['channel_id'], channel['user_id'])
+            await sketch_service.rebuild_channel(channel['channel_id'], channel['user_id'])
+            count = await db.daily_rollups.count_documents({
+                "channel_id": channel['channel_id'],
+                "user_id": channel['user_id']
+            })
+            sketches = await db.commenter_sketches.count_documents({
+                "channel_id": channel['channel_id'],
+                "user_id": channel['user_id']
+            })
+            print(f"   ✅ {channel.get('name', channel['channel_id'])} ({channel['user_id']}): {count} rollups, {sketches} sketches")
+        except Exception as e:
+            print(f"   ❌ {channel['channel_id']} ({channel['user_id']}): {e}")
+
+    await close_mongo_connection()
+    print("✨ Rebuild complete!")
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_rollups(sys.argv[1] if len(sys.argv) > 1 else None))